@@ -0,0 +1,40 @@
+# Alembic 스크립트 템플릿
+"""add_attendance_day_and_unique_scan_key
+
+Revision ID: 5b8e21c4d9a7
+Revises: 173b7c98740b
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e21c4d9a7'
+down_revision = '173b7c98740b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('attendance', sa.Column('day', sa.Date(), nullable=True))
+    # 기존 기록 채우기 (기존 조회의 func.date(date)와 같은 기준)
+    op.execute("UPDATE attendance SET day = CAST(date AS DATE) WHERE day IS NULL")
+    op.alter_column('attendance', 'day', nullable=False)
+
+    # 스캔 경쟁 조건으로 생긴 중복 기록은 가장 최근 것만 남김
+    op.execute("""
+        DELETE FROM attendance a
+        USING attendance b
+        WHERE a.student_id = b.student_id
+          AND a.day = b.day
+          AND a.room_id = b.room_id
+          AND a.id < b.id
+    """)
+    op.create_index('uq_attendance_student_day_room', 'attendance', ['student_id', 'day', 'room_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_attendance_student_day_room', table_name='attendance')
+    op.drop_column('attendance', 'day')
@@ -0,0 +1,32 @@
+# Alembic 스크립트 템플릿
+"""add_attendance_day_composite_indexes
+
+Revision ID: 8d3f6a0e7c12
+Revises: 5b8e21c4d9a7
+Create Date: 2026-10-19 11:03:27.540918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3f6a0e7c12'
+down_revision = '5b8e21c4d9a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 출석 테이블은 1년 내내 커지므로 쓰기를 막지 않도록 CONCURRENTLY로 생성
+    with op.get_context().autocommit_block():
+        op.create_index('ix_attendance_room_day_status', 'attendance', ['room_id', 'day', 'status'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_attendance_teacher_day', 'attendance', ['teacher_id', 'day'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_attendance_teacher_day', table_name='attendance', postgresql_concurrently=True)
+        op.drop_index('ix_attendance_room_day_status', table_name='attendance', postgresql_concurrently=True)
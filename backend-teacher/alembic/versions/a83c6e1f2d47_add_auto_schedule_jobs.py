@@ -0,0 +1,48 @@
+# Alembic 스크립트 템플릿
+"""add_auto_schedule_jobs
+
+Revision ID: a83c6e1f2d47
+Revises: f2a94c7d1e58
+Create Date: 2026-10-19 17:42:13.905127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a83c6e1f2d47'
+down_revision = 'f2a94c7d1e58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('auto_schedule_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('schedule_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('engine', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('time_limit_seconds', sa.Float(), nullable=True),
+    sa.Column('total_blocks', sa.Integer(), nullable=True),
+    sa.Column('progress', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('cancel_requested', sa.Boolean(), nullable=True),
+    sa.Column('worker', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['schedule_id'], ['schedule_metadata.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_auto_schedule_jobs_id'), 'auto_schedule_jobs', ['id'], unique=False)
+    op.create_index('ix_auto_schedule_jobs_schedule_status', 'auto_schedule_jobs', ['schedule_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_auto_schedule_jobs_schedule_status', table_name='auto_schedule_jobs')
+    op.drop_index(op.f('ix_auto_schedule_jobs_id'), table_name='auto_schedule_jobs')
+    op.drop_table('auto_schedule_jobs')
@@ -0,0 +1,30 @@
+# Alembic 스크립트 템플릿
+"""add_attendance_fraud_keyset_index
+
+Revision ID: c41a9e27b6f3
+Revises: 8d3f6a0e7c12
+Create Date: 2026-10-19 13:27:05.112846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41a9e27b6f3'
+down_revision = '8d3f6a0e7c12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 부정행위 의심 기록만 담는 부분 인덱스 (최신순 keyset 페이지네이션)
+    with op.get_context().autocommit_block():
+        op.create_index('ix_attendance_fraud_teacher_created', 'attendance', ['teacher_id', 'created_at', 'id'],
+                        unique=False, postgresql_where=sa.text('is_fraud_detected'),
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_attendance_fraud_teacher_created', table_name='attendance', postgresql_concurrently=True)
@@ -0,0 +1,34 @@
+# Alembic 스크립트 템플릿
+"""add_night_study_roster
+
+Revision ID: e7b2d5c8a913
+Revises: c41a9e27b6f3
+Create Date: 2026-10-19 14:02:48.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b2d5c8a913'
+down_revision = 'c41a9e27b6f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('night_study_roster',
+    sa.Column('room_id', sa.String(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['room_id'], ['location_settings.room_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('room_id', 'student_id')
+    )
+    op.create_index(op.f('ix_night_study_roster_student_id'), 'night_study_roster', ['student_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_night_study_roster_student_id'), table_name='night_study_roster')
+    op.drop_table('night_study_roster')
@@ -0,0 +1,43 @@
+# Alembic 스크립트 템플릿
+"""add_batch_job_runs
+
+Revision ID: f2a94c7d1e58
+Revises: e7b2d5c8a913
+Create Date: 2026-10-19 15:21:07.318462
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a94c7d1e58'
+down_revision = 'e7b2d5c8a913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('batch_job_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_name', sa.String(), nullable=False),
+    sa.Column('room_id', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('duration_ms', sa.Integer(), nullable=True),
+    sa.Column('rows_processed', sa.Integer(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('worker', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_batch_job_runs_id'), 'batch_job_runs', ['id'], unique=False)
+    op.create_index('ix_batch_job_runs_job_room_started', 'batch_job_runs', ['job_name', 'room_id', 'started_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_batch_job_runs_job_room_started', table_name='batch_job_runs')
+    op.drop_index(op.f('ix_batch_job_runs_id'), table_name='batch_job_runs')
+    op.drop_table('batch_job_runs')
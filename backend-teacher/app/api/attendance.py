@@ -1,21 +1,31 @@
 # 출석 API 라우터
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional
-from app.database import get_db
+import asyncio
+import json
+from app.database import get_db, SessionLocal
 from app.schemas.attendance import (
     AttendanceResponse, AttendanceCreate, AttendanceUpdate,
     QRScanRequest, QRScanResponse, QRCodeTokenResponse, QRCodeImageResponse,
     LocationSettingCreate, LocationSettingUpdate, LocationSettingResponse,
     FraudRecordResponse, AttendanceMonitoringResponse,
-    EarlyLeaveRequest, EarlyLeaveRequestResponse
+    EarlyLeaveRequest, EarlyLeaveRequestResponse,
+    NightStudyRosterUpdate, NightStudyRosterResponse, BatchJobRunResponse
 )
 from app.services.attendance_service import AttendanceService
 from app.services.auth_service import AuthService
 from app.services.qr_service import QRCodeService
+from app.services.qr_rotation_service import get_qr_rotation_service
 from app.services.attendance_validation_service import AttendanceValidationService
-from app.models.attendance import LocationSetting, AttendanceStatus
+from app.services.attendance_ingest_service import get_scan_buffer
+from app.services.room_policy_cache import get_room_policy_cache
+from app.services.attendance_counter_service import get_attendance_counters
+from app.services.attendance_event_service import get_attendance_events
+from app.models.attendance import Attendance, LocationSetting, AttendanceStatus, BatchJobRun
 from app.models.student import Student
 
 router = APIRouter()
@@ -99,25 +109,121 @@ async def get_qr_token(
     )
 
 
+# SSE 연결 유지용 주석 전송 간격 (프록시 유휴 타임아웃 방지)
+SSE_HEARTBEAT_SECONDS = 15
+
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def _qr_cache_headers(frame) -> dict:
+    """다음 교체 시각까지 캐시 가능 (교체 후에는 ETag로 재검증)"""
+    return {
+        "ETag": frame.etag,
+        "Cache-Control": f"public, max-age={frame.seconds_until_rotation()}",
+        "X-QR-Rotates-At": frame.rotates_at.isoformat(),
+    }
+
+
 @router.get("/qr/image/{room_id}", response_model=QRCodeImageResponse)
 async def get_qr_code_image(
     room_id: str,
-    expires_in: int = Query(default=1, description="토큰 유효 기간 (분)", ge=1, le=60),
+    request: Request,
+    expires_in: Optional[int] = Query(default=None, description="토큰 유효 기간 (분, 지정하면 요청마다 새로 생성)", ge=1, le=60),
     db: Session = Depends(get_db)
 ):
     """
-    동적 QR 코드 이미지 생성 (명세서 F-01)
-    태블릿/모니터에서 1분마다 호출하여 QR 코드 이미지 갱신
+    동적 QR 코드 이미지 조회 (명세서 F-01)
+    미리 렌더링해 둔 현재 QR 코드를 돌려주며, If-None-Match가 같으면 304
+    (키오스크는 /qr/stream/{room_id}로 교체 알림을 받으면 폴링할 필요 없음)
     """
-    qr_service = QRCodeService()
-    qr_data = qr_service.generate_qr_code_with_image(room_id, expires_in)
+    if expires_in is not None:
+        qr_service = QRCodeService()
+        qr_data = qr_service.generate_qr_code_with_image(room_id, expires_in)
+        
+        return QRCodeImageResponse(
+            qr_code_image=qr_data["qr_code_image"],
+            token=qr_data["token"],
+            expires_at=qr_data["expires_at"],
+            room_id=qr_data["room_id"]
+        )
+    
+    frame = get_qr_rotation_service().get_frame(room_id)
+    headers = _qr_cache_headers(frame)
+    if request.headers.get("if-none-match") == frame.etag:
+        return Response(status_code=304, headers=headers)
     
-    return QRCodeImageResponse(
-        qr_code_image=qr_data["qr_code_image"],
-        token=qr_data["token"],
-        expires_at=qr_data["expires_at"],
-        room_id=qr_data["room_id"]
+    body = QRCodeImageResponse(
+        qr_code_image=frame.png_base64,
+        token=frame.token,
+        expires_at=frame.expires_at,
+        room_id=room_id
     )
+    return Response(content=body.model_dump_json(), media_type="application/json", headers=headers)
+
+
+@router.get("/qr/image/{room_id}/raw")
+async def get_qr_code_image_raw(
+    room_id: str,
+    request: Request,
+    format: str = Query(default="png", pattern="^(png|svg)$")
+):
+    """현재 QR 코드 이미지 파일 (PNG/SVG, <img src>로 바로 사용)"""
+    frame = get_qr_rotation_service().get_frame(room_id)
+    headers = _qr_cache_headers(frame)
+    if request.headers.get("if-none-match") == frame.etag:
+        return Response(status_code=304, headers=headers)
+    
+    if format == "svg":
+        return Response(content=frame.svg, media_type="image/svg+xml", headers=headers)
+    return Response(content=frame.png, media_type="image/png", headers=headers)
+
+
+@router.get("/qr/stream/{room_id}")
+async def stream_qr_code(
+    room_id: str,
+    request: Request,
+    include_image: bool = Query(default=True, description="false면 이미지 없이 토큰/ETag만 전송")
+):
+    """
+    QR 코드 교체 스트림 (Server-Sent Events)
+    연결 직후 현재 QR 코드를, 이후 교체될 때마다 qr 이벤트를 보냄
+    """
+    rotation_service = get_qr_rotation_service()
+    subscription = rotation_service.subscribe(room_id)
+    frame = rotation_service.get_frame(room_id)
+    
+    async def event_stream():
+        try:
+            yield _sse("qr", frame.to_event(include_image))
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                if not include_image:
+                    event = {k: v for k, v in event.items() if k != "qr_code_image"}
+                yield _sse(event["type"], event)
+        finally:
+            subscription.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _persist_scan(values: dict) -> int:
+    """
+    스캔 기록을 일괄 저장 버퍼에 넣고 해당 배치가 commit될 때까지 대기
+    (야자 시작 시 스캔이 몰려도 요청마다 트랜잭션을 열지 않음)
+    """
+    try:
+        return await asyncio.wrap_future(get_scan_buffer().submit(values))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"출석 기록 저장 실패: {str(e)}")
 
 
 @router.post("/qr/scan", response_model=QRScanResponse)
@@ -131,7 +237,6 @@ async def scan_qr_code(
     """
     qr_service = QRCodeService()
     validation_service = AttendanceValidationService(db)
-    attendance_service = AttendanceService(db)
     
     # 1. 토큰 검증
     token_payload = qr_service.verify_token(scan_request.dynamic_token)
@@ -173,7 +278,7 @@ async def scan_qr_code(
         fraud_detected = True
         
         # 부정행위 기록 생성
-        attendance_record = attendance_service.create_qr_attendance_record(
+        attendance_id = await _persist_scan(AttendanceService.build_qr_attendance_values(
             student_id=scan_request.student_id,
             teacher_id=teacher_id,
             room_id=room_id or "UNKNOWN",
@@ -183,13 +288,13 @@ async def scan_qr_code(
             check_in_time=scan_request.timestamp,
             status=attendance_status,
             is_fraud=True
-        )
+        ))
         
         return QRScanResponse(
             success=False,
             status=attendance_status,
             message=f"출석 실패: {failure_reason}",
-            attendance_id=attendance_record.id,
+            attendance_id=attendance_id,
             fraud_detected=True,
             failure_reason=failure_reason
         )
@@ -197,7 +302,7 @@ async def scan_qr_code(
     # 6. 검증 성공 시 출석 기록
     attendance_status = AttendanceStatus.PRESENT if status_str == "present" else AttendanceStatus.LATE
     
-    attendance_record = attendance_service.create_qr_attendance_record(
+    attendance_id = await _persist_scan(AttendanceService.build_qr_attendance_values(
         student_id=scan_request.student_id,
         teacher_id=teacher_id,
         room_id=room_id,
@@ -207,7 +312,7 @@ async def scan_qr_code(
         check_in_time=scan_request.timestamp,
         status=attendance_status,
         is_fraud=False
-    )
+    ))
     
     status_message = "출석 완료" if attendance_status == AttendanceStatus.PRESENT else "지각 처리"
     
@@ -215,7 +320,7 @@ async def scan_qr_code(
         success=True,
         status=attendance_status,
         message=status_message,
-        attendance_id=attendance_record.id,
+        attendance_id=attendance_id,
         fraud_detected=False
     )
 
@@ -230,7 +335,9 @@ async def create_location_setting(
     """정독실 위치 설정 생성"""
     location_setting = LocationSetting(**location_data.dict())
     db.add(location_setting)
+    get_room_policy_cache().notify_change(db, location_setting.room_id)
     db.commit()
+    get_room_policy_cache().invalidate()
     db.refresh(location_setting)
     return location_setting
 
@@ -274,11 +381,69 @@ async def update_location_setting(
     for field, value in location_update.dict(exclude_unset=True).items():
         setattr(location_setting, field, value)
     
+    get_room_policy_cache().notify_change(db, room_id)
     db.commit()
+    get_room_policy_cache().invalidate()
     db.refresh(location_setting)
     return location_setting
 
 
+@router.get("/location-settings/{room_id}/roster", response_model=NightStudyRosterResponse)
+async def get_night_study_roster(
+    room_id: str,
+    current_user: dict = Depends(AuthService.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """야자 참여 학생 명단 조회 (자동 결석 처리 대상)"""
+    if not db.query(LocationSetting.room_id).filter(LocationSetting.room_id == room_id).first():
+        raise HTTPException(status_code=404, detail="위치 설정을 찾을 수 없습니다")
+    
+    attendance_service = AttendanceService(db)
+    return NightStudyRosterResponse(room_id=room_id, student_ids=attendance_service.get_roster(room_id))
+
+
+@router.put("/location-settings/{room_id}/roster", response_model=NightStudyRosterResponse)
+async def update_night_study_roster(
+    room_id: str,
+    roster_update: NightStudyRosterUpdate,
+    current_user: dict = Depends(AuthService.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """야자 참여 학생 명단 전체 교체"""
+    if not db.query(LocationSetting.room_id).filter(LocationSetting.room_id == room_id).first():
+        raise HTTPException(status_code=404, detail="위치 설정을 찾을 수 없습니다")
+    
+    student_ids = set(roster_update.student_ids)
+    if student_ids:
+        found = {row.id for row in db.query(Student.id).filter(Student.id.in_(student_ids)).all()}
+        missing = sorted(student_ids - found)
+        if missing:
+            raise HTTPException(status_code=400, detail=f"존재하지 않는 학생이 포함되어 있습니다: {missing}")
+    
+    attendance_service = AttendanceService(db)
+    return NightStudyRosterResponse(
+        room_id=room_id,
+        student_ids=attendance_service.replace_roster(room_id, list(student_ids))
+    )
+
+
+@router.get("/batch-runs", response_model=list[BatchJobRunResponse])
+async def get_batch_runs(
+    job_name: Optional[str] = None,
+    room_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(AuthService.get_current_user),
+    db: Session = Depends(get_db)
+):
+    """야자 자동 퇴실/결석 배치 실행 기록 조회 (최신순)"""
+    query = db.query(BatchJobRun)
+    if job_name:
+        query = query.filter(BatchJobRun.job_name == job_name)
+    if room_id:
+        query = query.filter(BatchJobRun.room_id == room_id)
+    return query.order_by(BatchJobRun.started_at.desc()).limit(limit).all()
+
+
 # 관리자 모니터링 API (명세서 F-05)
 @router.get("/monitoring", response_model=AttendanceMonitoringResponse)
 async def get_attendance_monitoring(
@@ -311,42 +476,138 @@ async def get_attendance_monitoring(
     )
 
 
+@router.get("/monitoring/stream")
+async def stream_attendance_monitoring(
+    request: Request,
+    room_id: Optional[str] = None,
+    current_user: dict = Depends(AuthService.get_current_user)
+):
+    """
+    실시간 출석 현황 스트림 (Server-Sent Events)
+    연결 직후 오늘 현황(snapshot)을 보내고, 이후 QR 스캔이 저장될 때마다 scan 이벤트를 보냄
+    room_id를 주면 해당 정독실, 없으면 담임 학생 기준
+    (/monitoring, /fraud-records 폴링 대체)
+    스트림이 열려 있는 동안 DB 연결을 잡고 있지 않도록 snapshot은 별도 세션으로 읽고 바로 닫음
+    snapshot을 읽는 동안 저장된 스캔이 빠지지 않도록 먼저 구독하고,
+    그 사이 도착한 이벤트는 구독 큐에 쌓아 두었다가 snapshot 다음에 보냄
+    """
+    from app.models.existing_db import User
+    
+    def resolve():
+        db = SessionLocal()
+        try:
+            user = db.query(User).filter(User.email == current_user["email"]).first()
+            if not user:
+                raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다")
+            return ("room", room_id) if room_id else ("teacher", user.id)
+        finally:
+            db.close()
+    
+    def load():
+        db = SessionLocal()
+        try:
+            today = datetime.now().date()
+            if room_id:
+                stats = AttendanceService(db).get_monitoring_stats(target_date=today, room_id=room_id)
+            else:
+                stats = AttendanceService(db).get_monitoring_stats(teacher_id=topic[1], target_date=today)
+            return AttendanceMonitoringResponse(**stats).model_dump(mode="json")
+        finally:
+            db.close()
+    
+    topic = await run_in_threadpool(resolve)
+    
+    subscription = get_attendance_events().subscribe([topic])
+    try:
+        snapshot = await run_in_threadpool(load)
+    except BaseException:
+        subscription.close()
+        raise
+    
+    async def event_stream():
+        try:
+            yield _sse("snapshot", snapshot)
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(event["type"], event)
+        finally:
+            subscription.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _parse_fraud_cursor(cursor: str):
+    """'<created_at ISO>_<id>' 형식의 cursor를 (created_at, id)로 변환"""
+    try:
+        # URL 인코딩 없이 전달되면 시간대의 '+'가 공백으로 바뀌므로 복원
+        created_at, attendance_id = cursor.replace(" ", "+").rsplit("_", 1)
+        return datetime.fromisoformat(created_at), int(attendance_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="잘못된 cursor 값입니다")
+
+
 @router.get("/fraud-records", response_model=list[FraudRecordResponse])
 async def get_fraud_records(
+    response: Response,
     limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None, description="이전 응답의 X-Next-Cursor 헤더 값"),
+    room_id: Optional[str] = None,
+    date: Optional[str] = Query(default=None, description="YYYY-MM-DD"),
+    device_id: Optional[str] = None,
     current_user: dict = Depends(AuthService.get_current_user),
     db: Session = Depends(get_db)
 ):
-    """부정행위 의심 기록 조회"""
+    """
+    부정행위 의심 기록 조회 (최신순)
+    다음 페이지가 있으면 X-Next-Cursor 헤더의 값을 cursor로 넘겨 이어서 조회
+    """
     # 이메일로 User 객체 조회하여 ID 가져오기
     from app.models.existing_db import User
     user = db.query(User).filter(User.email == current_user["email"]).first()
     if not user:
         raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다")
     
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d").date() if date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="날짜 형식이 올바르지 않습니다 (YYYY-MM-DD)")
+    
     attendance_service = AttendanceService(db)
     fraud_records = attendance_service.get_fraud_records(
         teacher_id=user.id,
-        limit=limit
+        limit=limit,
+        room_id=room_id,
+        day=day,
+        device_id=device_id,
+        before=_parse_fraud_cursor(cursor) if cursor else None
     )
     
-    # 학생 이름 포함하여 응답 생성
-    result = []
-    for record in fraud_records:
-        student = db.query(Student).filter(Student.id == record.student_id).first()
-        result.append(FraudRecordResponse(
+    if len(fraud_records) == limit:
+        last = fraud_records[-1]
+        response.headers["X-Next-Cursor"] = f"{last.created_at.isoformat()}_{last.id}"
+    
+    # 학생 이름 포함하여 응답 생성 (학생 정보는 같은 쿼리에서 함께 조회됨)
+    return [
+        FraudRecordResponse(
             attendance_id=record.id,
             student_id=record.student_id,
-            student_name=student.name if student else None,
+            student_name=record.student.name if record.student else None,
             room_id=record.room_id,
             check_in_time=record.check_in_time,
             failure_reason="검증 실패" if record.is_fraud_detected else "알 수 없음",
             geo_data=record.geo_data,
             device_id=record.device_id,
             created_at=record.created_at
-        ))
-    
-    return result
+        )
+        for record in fraud_records
+    ]
 
 
 @router.post("/fraud-records/{attendance_id}/approve", response_model=AttendanceResponse)
@@ -366,6 +627,7 @@ async def approve_fraud_record(
         attendance.status = AttendanceStatus.PRESENT.value
     
     db.commit()
+    get_attendance_counters().invalidate(attendance.day)
     db.refresh(attendance)
     return attendance
 
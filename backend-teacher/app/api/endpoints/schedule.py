@@ -1,13 +1,20 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+import asyncio
+import json
+from sqlalchemy import desc
+from sqlalchemy.exc import IntegrityError
 
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.api.deps import get_current_user
-from app.models.existing_db import LectureBlock, LectureGroup, Teacher, Facility, ScheduleMetadata
+from app.services.auth_service import AuthService
+from app.models.existing_db import LectureBlock, LectureGroup, Teacher, Facility, ScheduleMetadata, User
 from app.schemas.schedule import (
     LectureBlockCreate,
+    LectureBlockUpdate,
     LectureBlockResponse,
     LectureGroupCreate,
     LectureGroupCreateBatch,
@@ -15,10 +22,22 @@ from app.schemas.schedule import (
     ValidationResult,
     ValidationError,
     ScheduleMetadataCreate,
-    ScheduleMetadataResponse
+    ScheduleMetadataResponse,
+    AutoScheduleJobCreate,
+    AutoScheduleJobResponse,
+    AutoScheduleJobResult,
+    TimetableRepairRequest,
+    TimetableRepairResponse
 )
 from app.services.validator import ScheduleValidator
-from app.services.scheduler import AutoScheduler
+from app.services.schedule_occupancy_cache import get_schedule_occupancy_cache
+from app.services.scheduler import AutoScheduler, SchedulingError
+from app.services.schedule_problem import load_scheduling_problem
+from app.services.timetable_repair import repair_timetable, apply_repair
+from app.config import settings
+from app.services.auto_schedule_job_service import (
+    get_auto_schedule_job_service, AutoScheduleJobError, RUNNING
+)
 
 router = APIRouter()
 
@@ -50,77 +69,93 @@ def create_schedule_metadata(schedule_in: ScheduleMetadataCreate, db: Session =
     return new_schedule
 
 # --- Validator Engine ---
-def validate_assignment(db: Session, block_in: LectureBlockCreate) -> ValidationResult:
+def _room_conflict_error(db: Session, block_in: LectureBlockCreate, block_ids: List[int]) -> ValidationError:
+    room = db.query(Facility.name).filter(Facility.id == block_in.room_id).first()
+    room_name = room.name if room else "Unknown"
+    return ValidationError(
+        type="DOUBLE_BOOKING_ROOM",
+        description=f"특별실 중복: {room_name}은(는) 이미 사용 중입니다.",
+        block_ids=block_ids,
+        room_id=block_in.room_id,
+        day=block_in.day,
+        period=block_in.period
+    )
+
+def _save_conflict(db: Session, block_in: LectureBlockCreate, e: IntegrityError) -> HTTPException:
+    """검사와 저장 사이에 같은 특별실 칸이 채워진 경우 (고유 인덱스 위반) 검증 실패로 응답"""
+    db.rollback()
+    if not block_in.room_id:
+        raise e
+    return HTTPException(
+        status_code=400,
+        detail={
+            "message": "Validation Failed",
+            "errors": [_room_conflict_error(db, block_in, [])],
+            "warnings": []
+        }
+    )
+
+def validate_assignment(db: Session, block_in: LectureBlockCreate, block_id: Optional[int] = None) -> ValidationResult:
+    """
+    블록을 해당 칸에 놓을 수 있는지 검사 (같은 시간표 안의 교사/학급/특별실 중복)
+    시간표별 점유 캐시에서 바로 답하며, block_id는 옮기는 중인 블록 자신 (검사에서 제외)
+    """
     errors = []
     warnings = []
     
-    # 1. Fetch Context (LectureGroup -> Teacher, Grade, Class)
-    group = db.query(LectureGroup).filter(LectureGroup.id == block_in.group_id).first()
-    if not group:
+    # 1. 그룹의 시간표 점유 인덱스에서 같은 칸의 블록 조회
+    check = get_schedule_occupancy_cache().check(
+        db, block_in.group_id, block_in.day, block_in.period, block_in.room_id, ignore_block_id=block_id
+    )
+    if check is None:
         return ValidationResult(
             is_valid=False, 
             errors=[ValidationError(type="INVALID_GROUP", description="Invalid group_id: Lecture Group not found")]
         )
+    group = check.group
 
-    # 2. Hard Constraint: Teacher Double Booking
+    # Hard Constraint: Teacher Double Booking
     # 같은 요일(day), 교시(period)에 해당 교사(teacher_id)가 이미 다른 블록에 있는지 확인
-    conflict_block = (
-        db.query(LectureBlock)
-        .join(LectureGroup)
-        .filter(
-            LectureBlock.day == block_in.day,
-            LectureBlock.period == block_in.period,
-            LectureGroup.teacher_id == group.teacher_id,
-            LectureBlock.id != 0 # Skip self if updating (not handled here yet)
-        )
-        .first()
-    )
-    
-    if conflict_block:
-        teacher_name = group.teacher.name if group.teacher else "Unknown"
+    if check.teacher_conflicts:
+        teacher_name = group.teacher_name or "Unknown"
         errors.append(ValidationError(
             type="DOUBLE_BOOKING_TEACHER",
-            description=f"교사 중복 배정: {teacher_name} 선생님은 이미 {conflict_block.day} {conflict_block.period}교시에 수업이 있습니다.",
-            block_ids=[conflict_block.id],
+            description=f"교사 중복 배정: {teacher_name} 선생님은 이미 {block_in.day} {block_in.period}교시에 수업이 있습니다.",
+            block_ids=check.teacher_conflicts,
             teacher_id=group.teacher_id,
             day=block_in.day,
             period=block_in.period
         ))
 
+    # 2. Hard Constraint: Class Double Booking
+    if check.class_conflicts:
+        errors.append(ValidationError(
+            type="DOUBLE_BOOKING_CLASS",
+            description=f"학급 중복: {group.grade}학년 {group.class_num}반은 이미 {block_in.day} {block_in.period}교시에 수업이 있습니다.",
+            block_ids=check.class_conflicts,
+            day=block_in.day,
+            period=block_in.period
+        ))
+
     # 3. Hard Constraint: Room Double Booking
-    if block_in.room_id:
-        room_conflict = (
-            db.query(LectureBlock)
-            .filter(
-                LectureBlock.day == block_in.day,
-                LectureBlock.period == block_in.period,
-                LectureBlock.room_id == block_in.room_id
-            )
-            .first()
+    # 특별실 칸은 DB 고유 인덱스(ix_lecture_block_unique_room_slot)로 모든 시간표에 걸쳐 하나뿐이므로
+    # 같은 시간표(캐시)에 없으면 다른 시간표의 블록도 조회 (인덱스 조회 한 번)
+    room_conflicts = check.room_conflicts
+    if block_in.room_id and not room_conflicts:
+        query = db.query(LectureBlock.id).filter(
+            LectureBlock.day == block_in.day,
+            LectureBlock.period == block_in.period,
+            LectureBlock.room_id == block_in.room_id
         )
-        if room_conflict:
-            room = db.query(Facility).filter(Facility.id == block_in.room_id).first()
-            room_name = room.name if room else "Unknown"
-            errors.append(ValidationError(
-                type="DOUBLE_BOOKING_ROOM",
-                description=f"특별실 중복: {room_name}은(는) 이미 사용 중입니다.",
-                block_ids=[room_conflict.id],
-                room_id=block_in.room_id,
-                day=block_in.day,
-                period=block_in.period
-            ))
+        if block_id is not None:
+            query = query.filter(LectureBlock.id != block_id)
+        room_conflicts = [r.id for r in query.all()]
+    if room_conflicts:
+        errors.append(_room_conflict_error(db, block_in, room_conflicts))
 
     # 4. Soft Constraint: Max Daily Hours (Example)
-    # 해당 교사의 오늘 수업 시수 계산
-    daily_count = (
-        db.query(LectureBlock)
-        .join(LectureGroup)
-        .filter(
-            LectureBlock.day == block_in.day,
-            LectureGroup.teacher_id == group.teacher_id
-        )
-        .count()
-    )
+    # 해당 교사의 오늘 수업 시수 (교사 마스크에서 해당 요일 비트 수)
+    daily_count = check.teacher_daily_count
     if daily_count >= 4: # 예: 하루 4시간 이상이면 경고
         warnings.append(f"피로도 경고: 해당 교사는 {block_in.day}요일에 이미 {daily_count}시간 수업이 있습니다.")
 
@@ -192,12 +227,71 @@ def create_lecture_block(block_in: LectureBlockCreate, db: Session = Depends(get
             }
         )
 
+    cache = get_schedule_occupancy_cache()
+    schedule_id = _block_schedule_id(db, block_in.group_id)
     block = LectureBlock(**block_in.dict())
     db.add(block)
-    db.commit()
+    try:
+        db.flush()
+        cache.notify_change(db, schedule_id)
+        db.commit()
+    except IntegrityError as e:
+        raise _save_conflict(db, block_in, e)
     db.refresh(block)
+    cache.block_saved(schedule_id, block.id, block.group_id, block.day, block.period, block.room_id)
     return block
 
+def _block_schedule_id(db: Session, group_id: int) -> Optional[int]:
+    row = db.query(LectureGroup.schedule_id).filter(LectureGroup.id == group_id).first()
+    return row.schedule_id if row else None
+
+@router.put("/blocks/{block_id}", response_model=LectureBlockResponse)
+def update_lecture_block(block_id: int, block_in: LectureBlockUpdate, db: Session = Depends(get_db)):
+    """수업 블록 이동/수정 (드래그 앤 드롭 저장) - Validator 포함"""
+    block = db.query(LectureBlock).filter(LectureBlock.id == block_id).first()
+    if not block:
+        raise HTTPException(status_code=404, detail="Lecture block not found")
+
+    target = LectureBlockCreate(group_id=block.group_id, **block_in.dict())
+    validation = validate_assignment(db, target, block_id=block_id)
+    if not validation.is_valid:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Validation Failed",
+                "errors": validation.errors,
+                "warnings": validation.warnings
+            }
+        )
+
+    cache = get_schedule_occupancy_cache()
+    schedule_id = _block_schedule_id(db, block.group_id)
+    for key, value in block_in.dict().items():
+        setattr(block, key, value)
+    try:
+        db.flush()
+        cache.notify_change(db, schedule_id)
+        db.commit()
+    except IntegrityError as e:
+        raise _save_conflict(db, target, e)
+    db.refresh(block)
+    cache.block_saved(schedule_id, block.id, block.group_id, block.day, block.period, block.room_id)
+    return block
+
+@router.delete("/blocks/{block_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_lecture_block(block_id: int, db: Session = Depends(get_db)):
+    """수업 블록 삭제"""
+    block = db.query(LectureBlock).filter(LectureBlock.id == block_id).first()
+    if not block:
+        raise HTTPException(status_code=404, detail="Lecture block not found")
+
+    cache = get_schedule_occupancy_cache()
+    schedule_id = _block_schedule_id(db, block.group_id)
+    db.delete(block)
+    cache.notify_change(db, schedule_id)
+    db.commit()
+    cache.block_deleted(schedule_id, block_id)
+
 @router.get("/groups", response_model=List[LectureGroupResponse])
 def get_lecture_groups(schedule_id: int, db: Session = Depends(get_db)):
     """특정 시간표의 모든 수업 그룹 조회"""
@@ -247,18 +341,202 @@ def run_auto_scheduler(schedule_id: int, db: Session = Depends(get_db), current_
         # Bulk insert
         for block in new_blocks:
             db.add(block)
+        get_schedule_occupancy_cache().notify_change(db, schedule_id)
         db.commit()
+        get_schedule_occupancy_cache().invalidate(schedule_id)
         
         # Refresh to get IDs
         for block in new_blocks:
             db.refresh(block)
             
         return new_blocks
+    except SchedulingError as e:
+        # 시간/탐색 제한 또는 배정 불가: 배정하지 못한 그룹 목록을 함께 반환
+        db.rollback()
+        raise HTTPException(status_code=400, detail=e.to_detail())
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Scheduling failed: {str(e)}")
 
+# --- Auto-Schedule Jobs (background) ---
+
+JOB_STREAM_POLL_SECONDS = 1.0
+JOB_STREAM_HEARTBEAT_SECONDS = 15
+
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+
+def _get_job(db: Session, job_id: int, user_id: int):
+    try:
+        return get_auto_schedule_job_service().get(db, job_id, user_id)
+    except AutoScheduleJobError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+
+@router.post("/{schedule_id}/auto-schedule/jobs", response_model=AutoScheduleJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def submit_auto_schedule_job(
+    schedule_id: int,
+    job_in: AutoScheduleJobCreate,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    자동 배정 작업 등록 (별도 프로세스에서 제한 시간 안에 풀이)
+    진행 상황은 GET /auto-schedule/jobs/{job_id} 또는 /stream으로 확인하고,
+    성공하면 /apply로 결과를 시간표에 저장
+    """
+    try:
+        return get_auto_schedule_job_service().submit(
+            db, schedule_id, current_user.id, engine=job_in.engine, time_limit=job_in.time_limit_seconds
+        )
+    except AutoScheduleJobError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@router.get("/auto-schedule/jobs/{job_id}", response_model=AutoScheduleJobResponse)
+def get_auto_schedule_job(job_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    """자동 배정 작업 상태/진행 상황 조회"""
+    return _get_job(db, job_id, current_user.id)
+
+@router.get("/auto-schedule/jobs/{job_id}/stream")
+async def stream_auto_schedule_job(job_id: int, request: Request, current_user: dict = Depends(AuthService.get_current_user)):
+    """
+    자동 배정 진행 상황 스트림 (Server-Sent Events)
+    진행 상황이 바뀔 때마다 progress 이벤트, 작업이 끝나면 done 이벤트 후 종료
+    스트림 동안 DB 연결을 잡고 있지 않도록 토큰만 검증하고, 사용자/작업은 조회할 때마다 짧은 세션 사용
+    """
+    user_id = None
+
+    def load():
+        nonlocal user_id
+        db = SessionLocal()
+        try:
+            if user_id is None:
+                user = db.query(User.id).filter(User.email == current_user["email"]).first()
+                if user is None:
+                    raise HTTPException(status_code=401, detail="Could not validate credentials")
+                user_id = user.id
+            return AutoScheduleJobResponse.model_validate(_get_job(db, job_id, user_id)).model_dump(mode="json")
+        finally:
+            db.close()
+
+    job = await run_in_threadpool(load)
+
+    async def event_stream():
+        nonlocal job
+        last_progress = None
+        idle = 0.0
+        while True:
+            if job["status"] != RUNNING:
+                yield _sse("done", job)
+                return
+            if job["progress"] != last_progress:
+                last_progress = job["progress"]
+                idle = 0.0
+                yield _sse("progress", job)
+            elif idle >= JOB_STREAM_HEARTBEAT_SECONDS:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(JOB_STREAM_POLL_SECONDS)
+            idle += JOB_STREAM_POLL_SECONDS
+            if await request.is_disconnected():
+                return
+            job = await run_in_threadpool(load)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/auto-schedule/jobs/{job_id}/cancel", response_model=AutoScheduleJobResponse)
+def cancel_auto_schedule_job(job_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    """자동 배정 작업 취소 요청"""
+    job = _get_job(db, job_id, current_user.id)
+    try:
+        return get_auto_schedule_job_service().cancel(db, job)
+    except AutoScheduleJobError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@router.get("/auto-schedule/jobs/{job_id}/result", response_model=AutoScheduleJobResult)
+def get_auto_schedule_job_result(job_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    """자동 배정 결과 조회 (저장 전 미리보기, 실패 시 배정하지 못한 그룹과 중간 결과)"""
+    job = _get_job(db, job_id, current_user.id)
+    if job.status == RUNNING:
+        raise HTTPException(status_code=409, detail="작업이 아직 실행 중입니다.")
+    result = job.result or {}
+    return AutoScheduleJobResult(
+        job_id=job.id,
+        status=job.status,
+        placements=result.get("placements") or result.get("partial_placements") or [],
+        unplaced_groups=result.get("unplaced_groups", []),
+        blocked_groups=result.get("blocked_groups", []),
+        stats=result.get("stats", {}),
+        error=job.error
+    )
+
+@router.post("/auto-schedule/jobs/{job_id}/apply", response_model=List[LectureBlockResponse])
+def apply_auto_schedule_job(job_id: int, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    """성공한 자동 배정 결과를 수업 블록으로 저장 (전부 저장하거나 하나도 저장하지 않음)"""
+    job = _get_job(db, job_id, current_user.id)
+    try:
+        return get_auto_schedule_job_service().apply(db, job)
+    except AutoScheduleJobError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@router.post("/{schedule_id}/repair", response_model=TimetableRepairResponse)
+def repair_schedule(
+    schedule_id: int,
+    repair_in: TimetableRepairRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    시간표 부분 수정 (교사 불가 시간 추가, 시수 변경 후)
+    위반 블록과 그 주변만 다시 배치하고 고정 블록은 그대로 둠. apply=true면 바로 저장
+    """
+    if repair_in.apply:
+        # 자동 배정 결과 적용과 동시에 같은 시간표를 바꾸지 않도록 잠금
+        schedule = db.query(ScheduleMetadata.id).filter(ScheduleMetadata.id == schedule_id).with_for_update().first()
+    else:
+        schedule = db.query(ScheduleMetadata.id).filter(ScheduleMetadata.id == schedule_id).first()
+    if schedule is None:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+
+    problem = load_scheduling_problem(db, schedule_id, current_user.id)
+    result = repair_timetable(problem, time_limit=repair_in.time_limit_seconds or settings.AUTO_SCHEDULE_REPAIR_SECONDS)
+    response = TimetableRepairResponse(
+        status=result.status,
+        moves=[vars(m) for m in result.moves],
+        added=[vars(p) for p in result.added],
+        removed_block_ids=result.removed,
+        unplaced_groups=[{"group_id": g, "missing_blocks": n} for g, n in result.unplaced.items()],
+        unresolved=result.unresolved,
+        violations=result.violations,
+        freed_blocks=result.freed,
+        elapsed_ms=round(result.elapsed * 1000, 1),
+    )
+    if not repair_in.apply:
+        return response
+    if not result.solved:
+        db.rollback()
+        raise HTTPException(status_code=409, detail={
+            "message": "Could not repair the schedule without moving fixed blocks or within the time limit.",
+            **response.model_dump(),
+        })
+    try:
+        apply_repair(db, result)
+        get_schedule_occupancy_cache().notify_change(db, schedule_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Repair failed: {str(e)}")
+    get_schedule_occupancy_cache().invalidate(schedule_id)
+    response.applied = True
+    return response
+
 @router.post("/validate-check", response_model=ValidationResult)
-def check_validation_only(block_in: LectureBlockCreate, db: Session = Depends(get_db)):
-    """저장하지 않고 유효성 검사만 수행 (드래그 앤 드롭 미리보기용)"""
-    return validate_assignment(db, block_in)
+def check_validation_only(block_in: LectureBlockCreate, block_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """저장하지 않고 유효성 검사만 수행 (드래그 앤 드롭 미리보기용, 기존 블록을 옮기는 중이면 block_id 전달)"""
+    return validate_assignment(db, block_in, block_id=block_id)
@@ -1,8 +1,19 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import tempfile
 import os
 import shutil
-from pdf2image import convert_from_path
+import threading
+import queue
+import json
+import asyncio
+import hashlib
+import io
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pdf2image import convert_from_path, pdfinfo_from_path
 import pytesseract
 from PIL import Image, ImageEnhance
 import cv2
@@ -10,117 +21,402 @@ import numpy as np
 import time
 import pdfplumber
 import re
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.config import settings
+
+# tesserocr (Tesseract C-API 바인딩)는 선택 의존성
+# 설치되어 있지 않으면 pytesseract(서브프로세스 방식)로 대체
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
 
 router = APIRouter()
 
+# Tesseract OCR 설정 (한글 최적화: PSM 6 - Single uniform block)
+# PSM 3(Auto)는 단순 문서에서 오인식 발생 가능성이 있어 PSM 6으로 변경
+OCR_LANG = "kor+eng"
+OCR_PSM = 6
+OCR_OEM = 3
+
 # preprocess_image 함수 제거됨 (Tesseract 내부 전처리 사용)
 
-@router.post("/extract")
-def extract_text_from_pdf(file: UploadFile = File(...)):
+
+class OCRBackend:
+    """OCR 엔진 공통 인터페이스 (PIL 이미지 -> 텍스트)"""
+
+    name = "base"
+
+    def __init__(self, lang: str = OCR_LANG, psm: int = OCR_PSM, oem: int = OCR_OEM):
+        self.lang = lang
+        self.psm = psm
+        self.oem = oem
+
+    def image_to_string(self, image: Image.Image) -> str:
+        raise NotImplementedError
+
+
+class PytesseractBackend(OCRBackend):
+    """
+    pytesseract 백엔드 (Fallback)
+    페이지마다 tesseract 프로세스를 새로 띄우고 이미지를 임시 파일로 전달합니다.
+    """
+
+    name = "pytesseract"
+
+    def image_to_string(self, image: Image.Image) -> str:
+        return pytesseract.image_to_string(
+            image,
+            lang=self.lang,
+            config=f"--oem {self.oem} --psm {self.psm}"
+        )
+
+
+class TesserocrBackend(OCRBackend):
+    """
+    tesserocr 백엔드 (C-API 직접 호출)
+    스레드마다 PyTessBaseAPI 엔진을 한 번만 초기화해 kor+eng 언어 모델을 메모리에 유지하고,
+    이미지를 임시 파일 없이 메모리에서 바로 전달합니다.
+    PyTessBaseAPI는 스레드 안전하지 않으므로 엔진을 스레드별로 분리합니다.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str = OCR_LANG, psm: int = OCR_PSM, oem: int = OCR_OEM):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr가 설치되어 있지 않습니다.")
+        super().__init__(lang, psm, oem)
+        self._local = threading.local()
+        # 초기화가 가능한지(traineddata 존재 여부) 미리 확인
+        self._get_api()
+
+    def _get_api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            kwargs = {"lang": self.lang, "psm": self.psm, "oem": self.oem}
+            if settings.TESSDATA_PREFIX:
+                kwargs["path"] = settings.TESSDATA_PREFIX
+            api = tesserocr.PyTessBaseAPI(**kwargs)
+            self._local.api = api
+        return api
+
+    def image_to_string(self, image: Image.Image) -> str:
+        api = self._get_api()
+        api.SetImage(image)
+        return api.GetUTF8Text()
+
+
+OCR_BACKENDS = {
+    PytesseractBackend.name: PytesseractBackend,
+    TesserocrBackend.name: TesserocrBackend,
+}
+
+# 워커 프로세스 내에서 재사용되는 백엔드 인스턴스 ((이름, PSM) -> 백엔드)
+_backend_instances = {}
+_backend_lock = threading.Lock()
+
+
+def get_ocr_backend(name: str = None, psm: int = OCR_PSM) -> OCRBackend:
+    """
+    OCR 백엔드 인스턴스를 반환합니다 (프로세스 내 싱글톤).
+
+    Args:
+        name: "tesserocr", "pytesseract" 또는 "auto" (None이면 settings.OCR_BACKEND)
+        psm: Tesseract Page Segmentation Mode
+
+    Returns:
+        OCRBackend: tesserocr 초기화에 실패하면 pytesseract 백엔드
+    """
+    name = (name or settings.OCR_BACKEND or "auto").lower()
+    if name == "auto":
+        name = TesserocrBackend.name if tesserocr is not None else PytesseractBackend.name
+    if name not in OCR_BACKENDS:
+        raise ValueError(f"지원하지 않는 OCR 백엔드입니다: {name}")
+
+    key = (name, psm)
+    with _backend_lock:
+        backend = _backend_instances.get(key)
+        if backend is None:
+            try:
+                backend = OCR_BACKENDS[name](psm=psm)
+            except Exception as e:
+                if name == PytesseractBackend.name:
+                    raise
+                print(f"{name} 백엔드 초기화 실패, pytesseract로 대체합니다: {e}")
+                backend = PytesseractBackend(psm=psm)
+            _backend_instances[key] = backend
+    return backend
+
+
+# --- 레이아웃 기반 영역 분할 (OpenCV) ---
+# 기준 해상도: A4 300 DPI 폭(2480px). 커널 크기 등은 이 폭을 기준으로 비례 조정
+LAYOUT_REFERENCE_WIDTH = 2480
+# Tesseract 인식률이 가장 좋은 글자 높이(px). 이보다 큰 글자는 축소해도 정확도 손실이 거의 없음
+OCR_TARGET_CHAR_HEIGHT = 32
+
+
+def detect_text_regions(gray: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """
+    페이지에서 텍스트 블록 영역을 검출합니다.
+    표 괘선(세부능력 및 특기사항 표 등)을 형태학 연산으로 분리한 뒤,
+    남은 글자를 블록 단위로 팽창시켜 윤곽선을 찾습니다.
+    괘선을 경계로 블록이 나뉘므로 표 안에서는 칸(cell)마다 별도 영역이 됩니다.
+
+    Args:
+        gray: 그레이스케일 페이지 이미지
+
+    Returns:
+        읽기 순서(위->아래, 왼쪽->오른쪽)로 정렬된 (x, y, w, h) 목록
+    """
+    height, width = gray.shape
+    scale = width / LAYOUT_REFERENCE_WIDTH
+
+    # 1. 이진화 (글자/괘선 = 255)
+    binary = cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 31, 15
+    )
+
+    # 2. 긴 가로/세로 선 추출 (표 괘선) 후 글자 마스크에서 제거
+    horizontal = cv2.morphologyEx(
+        binary, cv2.MORPH_OPEN,
+        cv2.getStructuringElement(cv2.MORPH_RECT, (max(width // 30, 1), 1))
+    )
+    vertical = cv2.morphologyEx(
+        binary, cv2.MORPH_OPEN,
+        cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(height // 30, 1)))
+    )
+    table_lines = cv2.bitwise_or(horizontal, vertical)
+    text_mask = cv2.bitwise_and(binary, cv2.bitwise_not(table_lines))
+    # 잉크 밀도 계산용 전역 이진화 (적응형 이진화는 속이 찬 도장을 테두리만 남기므로 별도 계산)
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    ink = cv2.bitwise_and(ink, cv2.bitwise_not(table_lines))
+    # 작은 점 잡음 제거
+    text_mask = cv2.morphologyEx(
+        text_mask, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+    )
+
+    # 3. 글자 -> 줄 -> 문단 블록으로 병합 (가로는 넓게, 세로는 줄 간격 정도)
+    block_kernel = cv2.getStructuringElement(
+        cv2.MORPH_RECT, (int(45 * scale) + 1, int(25 * scale) + 1)
+    )
+    blocks = cv2.dilate(text_mask, block_kernel, iterations=1)
+    # 괘선을 넘어 인접 칸끼리 합쳐지지 않도록 괘선 위치는 끊어줌
+    blocks[cv2.dilate(table_lines, np.ones((3, 3), np.uint8)) > 0] = 0
+
+    contours, _ = cv2.findContours(blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    min_height = int(12 * scale)
+    min_area = int(1500 * scale * scale)
+    padding = int(8 * scale)
+    regions = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h < min_height or w * h < min_area:
+            continue
+        # 도장/사진처럼 잉크 밀도가 매우 높은 영역은 텍스트가 아니므로 제외
+        density = cv2.countNonZero(ink[y:y + h, x:x + w]) / float(w * h)
+        if density > 0.45:
+            continue
+        x0, y0 = max(x - padding, 0), max(y - padding, 0)
+        x1, y1 = min(x + w + padding, width), min(y + h + padding, height)
+        regions.append((x0, y0, x1 - x0, y1 - y0))
+
+    # 같은 줄(행)에 있는 블록은 왼쪽부터 읽도록 시작 y가 가까운 블록끼리 행으로 묶어서 정렬
+    row_tolerance = int(20 * scale)
+    regions.sort(key=lambda r: r[1])
+    rows = []
+    for region in regions:
+        if rows and region[1] - rows[-1][0][1] <= row_tolerance:
+            rows[-1].append(region)
+        else:
+            rows.append([region])
+    return [region for row in rows for region in sorted(row, key=lambda r: r[0])]
+
+
+def _estimate_char_height(region: np.ndarray) -> Optional[float]:
+    """영역 내 글자(연결 요소) 높이의 중앙값을 추정합니다."""
+    _, binary = cv2.threshold(region, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    heights = [
+        stats[i, cv2.CC_STAT_HEIGHT] for i in range(1, count)
+        if stats[i, cv2.CC_STAT_AREA] >= 10 and stats[i, cv2.CC_STAT_HEIGHT] >= 5
+    ]
+    if len(heights) < 3:
+        return None
+    return float(np.median(heights))
+
+
+def ocr_page(image: Image.Image, backend: OCRBackend, layout: bool = True, downsample: bool = True) -> str:
+    """
+    한 페이지를 OCR합니다.
+
+    Args:
+        image: 페이지 이미지
+        backend: OCR 백엔드
+        layout: True이면 텍스트 블록만 잘라서 인식 (여백/괘선/도장 제외)
+        downsample: True이면 글자가 충분히 큰 영역은 축소 후 인식
+
+    Returns:
+        영역별 텍스트를 빈 줄로 구분해 합친 문자열
+    """
+    # 전처리: 흑백 변환(Grayscale)만 적용하여 노이즈 감소 (이진화는 제외하여 글자 획 보존)
+    gray_image = image.convert('L')
+    if not layout:
+        return backend.image_to_string(gray_image)
+
+    gray = np.array(gray_image)
+    regions = detect_text_regions(gray)
+    if not regions:
+        # 영역 검출 실패 시 페이지 전체 인식
+        return backend.image_to_string(gray_image)
+
+    texts = []
+    for x, y, w, h in regions:
+        crop = gray[y:y + h, x:x + w]
+        if downsample:
+            char_height = _estimate_char_height(crop)
+            if char_height and char_height > OCR_TARGET_CHAR_HEIGHT * 1.3:
+                factor = OCR_TARGET_CHAR_HEIGHT / char_height
+                crop = cv2.resize(crop, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        text = backend.image_to_string(Image.fromarray(crop)).strip()
+        if text:
+            texts.append(text)
+    return "\n\n".join(texts)
+
+# 디지털 PDF 판단 기준 (pdfplumber로 추출한 텍스트 글자 수)
+DIGITAL_PDF_MIN_CHARS = 50
+# PDF -> 이미지 변환 해상도 (DPI 300 - 한글 인식률 향상)
+OCR_DPI = 300
+
+
+def clean_extracted_text(text: str) -> str:
+    """
+    스마트 공백 정리 (문단 보존 + 줄바꿈 해제)
+    빈 줄로 문단을 나누고, 문단 내 줄바꿈은 공백으로 바꾼 뒤 다중 공백을 정규화합니다.
+    """
+    paragraphs = re.split(r'\n\s*\n', text)
+    cleaned_paragraphs = []
+    for para in paragraphs:
+        # 문단 내 줄바꿈 -> 공백
+        para = para.replace('\n', ' ')
+        # 다중 공백 정규화
+        para = re.sub(r'[ \t]+', ' ', para).strip()
+        if para:
+            cleaned_paragraphs.append(para)
+    return '\n\n'.join(cleaned_paragraphs)
+
+
+def _extract_digital_pages(pdf_path: str) -> Optional[List[str]]:
+    """
+    pdfplumber를 이용한 텍스트 직접 추출 시도 (광학 인식 아님)
+
+    Returns:
+        디지털 PDF이면 페이지별 텍스트 목록, 아니면 None
+    """
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            # layout=True는 시각적 여백을 공백 문자로 채우므로 제거
+            # 기본 extract_text()를 사용하여 자연스러운 텍스트 흐름 추출
+            page_texts = [page.extract_text() or "" for page in pdf.pages]
+    except Exception as e:
+        print(f"pdfplumber extraction failed: {e}")
+        # 실패하면 OCR로 넘어감
+        return None
+
+    # 유효한 텍스트가 일정량 이상이면 디지털 PDF로 판단
+    if len("".join(page_texts).strip()) > DIGITAL_PDF_MIN_CHARS:
+        return page_texts
+    return None
+
+
+def ocr_pdf_page(pdf_path: str, page_number: int, backend: OCRBackend = None, dpi: int = OCR_DPI,
+                 layout: bool = None) -> str:
+    """PDF의 한 페이지만 이미지로 변환해 OCR합니다. (워커 풀에서 페이지 단위로 실행 가능)"""
+    backend = backend or get_ocr_backend()
+    if layout is None:
+        layout = settings.OCR_LAYOUT_CROP
+    image = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)[0]
+    # OCR 실행 (레이아웃 분석으로 텍스트 영역만 인식)
+    return ocr_page(image, backend, layout=layout)
+
+
+def _get_page_count(pdf_path: str) -> int:
+    try:
+        return pdfinfo_from_path(pdf_path)["Pages"]
+    except Exception as e:
+        # pdf2image 관련 오류는 대부분 파일 문제이므로 400 반환
+        print(f"PDF Conversion Error: {str(e)}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"PDF 파일 변환 실패. 올바른 PDF 파일인지 확인해주세요. ({str(e)})"
+        )
+
+
+def iter_page_texts(pdf_path: str, backend: OCRBackend = None, dpi: int = OCR_DPI,
+                    stop_event: threading.Event = None) -> Iterator[Tuple[int, str, str]]:
+    """
+    PDF를 페이지 단위로 추출합니다.
+    디지털 PDF는 pdfplumber 결과를, 스캔 PDF는 페이지를 하나씩 이미지로 변환해 OCR한 결과를
+    완료되는 대로 내보냅니다. (전체 페이지를 한꺼번에 변환하지 않으므로 첫 페이지가 빨리 나옴)
+
+    Args:
+        pdf_path: PDF 파일 경로
+        backend: OCR 백엔드 (None이면 get_ocr_backend())
+        dpi: 이미지 변환 해상도
+        stop_event: 설정되면 다음 페이지부터 처리 중단
+
+    Yields:
+        (페이지 번호(1부터), 원본 텍스트, 추출 방식("direct" | "ocr"))
+    """
+    digital_pages = _extract_digital_pages(pdf_path)
+    if digital_pages is not None:
+        print(f"Digital PDF Detected. Extracted with pdfplumber: {len(digital_pages)} pages")
+        for idx, page_text in enumerate(digital_pages):
+            yield idx + 1, page_text, "direct"
+        return
+
+    # 디지털 PDF가 아니거나 추출 실패 시 OCR 실행 (Fallback)
+    print("Scanned PDF or insufficient text detected. Falling back to OCR.")
+    page_count = _get_page_count(pdf_path)
+
+    backend = backend or get_ocr_backend()
+    print(f"OCR 백엔드: {backend.name}, {page_count} 페이지")
+
+    for page_number in range(1, page_count + 1):
+        if stop_event is not None and stop_event.is_set():
+            return
+        page_start = time.time()
+        text = ocr_pdf_page(pdf_path, page_number, backend, dpi)
+        print(f"페이지 {page_number} 처리 완료: {time.time() - page_start:.2f}초")
+        yield page_number, text, "ocr"
+
+
+def _save_upload_to_temp(file: UploadFile) -> str:
+    """업로드된 PDF를 임시 파일로 저장하고 경로를 반환합니다."""
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="PDF 파일만 업로드 가능합니다.")
-    
-    start_time = time.time()
-    
-    # 임시 파일 생성 및 저장
     with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
         shutil.copyfileobj(file.file, temp_pdf)
-        temp_pdf_path = temp_pdf.name
+        return temp_pdf.name
+
+
+@router.post("/extract")
+def extract_text_from_pdf(file: UploadFile = File(...)):
+    temp_pdf_path = _save_upload_to_temp(file)
+    start_time = time.time()
 
     try:
-        extracted_text = ""
-        is_digital_pdf = False
-        
-        # ... inside extract_text_from_pdf function ...
+        methods = set()
+        page_texts = []
+        for _, page_text, method in iter_page_texts(temp_pdf_path):
+            methods.add(method)
+            page_texts.append(page_text)
 
-        # 1단계: pdfplumber를 이용한 텍스트 직접 추출 시도 (광학 인식 아님)
-        try:
-            with pdfplumber.open(temp_pdf_path) as pdf:
-                plumber_text = ""
-                for page in pdf.pages:
-                    # layout=True는 시각적 여백을 공백 문자로 채우므로 제거
-                    # 기본 extract_text()를 사용하여 자연스러운 텍스트 흐름 추출
-                    page_text = page.extract_text()
-                    if page_text:
-                        plumber_text += page_text + "\n"
-                
-                # 유효한 텍스트가 일정량 이상이면 디지털 PDF로 판단
-                if len(plumber_text.strip()) > 50:
-                    # 스마트 공백 정리 (문단 보존 + 줄바꿈 해제)
-                    # 1. 문단 분리 (\n\n+)
-                    paragraphs = re.split(r'\n\s*\n', plumber_text)
-                    cleaned_paragraphs = []
-                    for para in paragraphs:
-                        # 문단 내 줄바꿈 -> 공백
-                        para = para.replace('\n', ' ')
-                        # 다중 공백 정규화
-                        para = re.sub(r'[ \t]+', ' ', para).strip()
-                        if para:
-                            cleaned_paragraphs.append(para)
-                    
-                    extracted_text = '\n\n'.join(cleaned_paragraphs)
-                    
-                    is_digital_pdf = True
-                    print(f"Digital PDF Detected. Extracted with pdfplumber: {len(extracted_text)} chars")
-        except Exception as e:
-            print(f"pdfplumber extraction failed: {e}")
-            # 실패하면 OCR로 넘어감
+        # 페이지 텍스트를 합친 뒤 스마트 공백 정리
+        extracted_text = clean_extracted_text("\n".join(page_texts))
 
-        # 2단계: 디지털 PDF가 아니거나 추출 실패 시 OCR 실행 (Fallback)
-        if not is_digital_pdf:
-            print("Scanned PDF or insufficient text detected. Falling back to OCR.")
-            
-            # PDF -> 이미지 변환 (DPI 300으로 조정 - 한글 인식률 향상)
-            try:
-                images = convert_from_path(temp_pdf_path, dpi=300)
-                print(f"PDF 변환 완료: {len(images)} 페이지, {time.time() - start_time:.2f}초")
-            except Exception as e:
-                # pdf2image 관련 오류는 대부분 파일 문제이므로 400 반환
-                print(f"PDF Conversion Error: {str(e)}")
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"PDF 파일 변환 실패. 올바른 PDF 파일인지 확인해주세요. ({str(e)})"
-                )
-            
-            # Tesseract OCR 설정 (한글 최적화: PSM 6 - Single uniform block)
-            # PSM 3(Auto)는 단순 문서에서 오인식 발생 가능성이 있어 PSM 6으로 변경
-            custom_config = r'--oem 3 --psm 6'
-            
-            ocr_accumulated_text = ""
-            
-            # 각 이미지에서 텍스트 추출 (한글+영어)
-            for idx, image in enumerate(images):
-                page_start = time.time()
-                
-                # OCR 실행
-                # 전처리: 흑백 변환(Grayscale)만 적용하여 노이즈 감소 (이진화는 제외하여 글자 획 보존)
-                gray_image = image.convert('L')
-                
-                # 텍스트 추출 및 후처리 (오른쪽 공백 제거)
-                text = pytesseract.image_to_string(
-                    gray_image, 
-                    lang='kor+eng',
-                    config=custom_config
-                )
-                
-                # 각 줄의 오른쪽 공백 제거 후 합치기
-                ocr_accumulated_text += text + "\n"
-                
-                print(f"페이지 {idx + 1} 처리 완료: {time.time() - page_start:.2f}초")
-            
-            # OCR 결과도 동일하게 스마트 공백 정리
-            paragraphs = re.split(r'\n\s*\n', ocr_accumulated_text)
-            cleaned_paragraphs = []
-            for para in paragraphs:
-                para = para.replace('\n', ' ')
-                para = re.sub(r'[ \t]+', ' ', para).strip()
-                if para:
-                    cleaned_paragraphs.append(para)
-            
-            extracted_text = '\n\n'.join(cleaned_paragraphs)
-        
         total_time = time.time() - start_time
-        print(f"전체 추출 완료 ({'Direct' if is_digital_pdf else 'OCR'}): {total_time:.2f}초")
+        print(f"전체 추출 완료 ({'Direct' if methods == {'direct'} else 'OCR'}): {total_time:.2f}초")
             
         return {"text": extracted_text}
         
@@ -133,3 +429,373 @@ def extract_text_from_pdf(file: UploadFile = File(...)):
         # 임시 파일 삭제
         if os.path.exists(temp_pdf_path):
             os.remove(temp_pdf_path)
+
+
+# 페이지 추출 스레드 -> 필터 단계로 전달되는 종료 표시
+_PIPELINE_DONE = object()
+# LLM 점검 입력 최대 길이 (/check/setuek 요청 제한과 동일)
+LLM_CHECK_MAX_CHARS = 2000
+
+
+def _ndjson(payload: dict) -> str:
+    return json.dumps(payload, ensure_ascii=False, default=str) + "\n"
+
+
+@router.post("/extract-and-check")
+async def extract_and_check(
+    file: UploadFile = File(...),
+    llm: bool = Query(default=False, description="마지막에 LLM 점검(/check/setuek)까지 수행할지 여부")
+):
+    """
+    PDF 텍스트 추출과 규칙 기반 세특 점검을 한 번에 수행합니다.
+    OCR이 끝난 페이지부터 바로 규칙 필터(RuleBasedFilterService.filter_text)를 적용하고,
+    결과를 페이지 단위 NDJSON 스트림으로 내보냅니다.
+
+    스트림 이벤트:
+        {"type": "page", "page", "method", "offset", "text", "detections"}
+            offset: 전체 텍스트(페이지를 빈 줄로 연결)에서 해당 페이지의 시작 위치
+        {"type": "llm", "errors"} 또는 {"type": "llm", "skipped": true, "reason"}  (llm=true인 경우)
+        {"type": "done", "pages", "text", "elapsed"}
+        {"type": "error", "detail"}
+    """
+    try:
+        from app.services.filter_service import get_filter_service
+        filter_service = get_filter_service()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"규칙 기반 필터를 사용할 수 없습니다: {str(e)}")
+
+    temp_pdf_path = await run_in_threadpool(_save_upload_to_temp, file)
+    pages: "queue.Queue" = queue.Queue()
+    stop_event = threading.Event()
+
+    def produce_pages():
+        # OCR은 별도 스레드에서 진행하고, 이벤트 루프 쪽에서는 완료된 페이지를 바로 필터링
+        try:
+            for item in iter_page_texts(temp_pdf_path, stop_event=stop_event):
+                pages.put(item)
+        except Exception as e:
+            pages.put(e)
+        finally:
+            pages.put(_PIPELINE_DONE)
+
+    producer = threading.Thread(target=produce_pages, daemon=True)
+    producer.start()
+
+    async def stream():
+        start_time = time.time()
+        page_texts = []
+        offset = 0
+        try:
+            while True:
+                item = await run_in_threadpool(pages.get)
+                if item is _PIPELINE_DONE:
+                    break
+                if isinstance(item, Exception):
+                    detail = item.detail if isinstance(item, HTTPException) else f"OCR 처리 중 오류 발생: {str(item)}"
+                    print(f"OCR Error: {detail}")
+                    yield _ndjson({"type": "error", "detail": detail})
+                    return
+
+                page_number, raw_text, method = item
+                page_text = clean_extracted_text(raw_text)
+                result = await run_in_threadpool(filter_service.filter_text, page_text)
+                yield _ndjson({
+                    "type": "page",
+                    "page": page_number,
+                    "method": method,
+                    "offset": offset,
+                    "text": page_text,
+                    "detections": result.get("detections", []),
+                })
+                if page_text:
+                    page_texts.append(page_text)
+                    offset += len(page_text) + 2  # 페이지 구분자 "\n\n"
+
+            full_text = "\n\n".join(page_texts)
+
+            if llm:
+                yield _ndjson(await _run_llm_check(full_text))
+
+            elapsed = time.time() - start_time
+            print(f"추출+점검 완료: {len(page_texts)} 페이지, {elapsed:.2f}초")
+            yield _ndjson({"type": "done", "pages": len(page_texts), "text": full_text, "elapsed": elapsed})
+        finally:
+            stop_event.set()
+            await run_in_threadpool(producer.join)
+            # 임시 파일 삭제
+            if os.path.exists(temp_pdf_path):
+                os.remove(temp_pdf_path)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+async def _run_llm_check(text: str) -> dict:
+    """추출이 끝난 전체 텍스트에 대해 LLM 점검(/check/setuek와 동일)을 수행합니다."""
+    if not text:
+        return {"type": "llm", "skipped": True, "reason": "추출된 텍스트가 없습니다."}
+    if len(text) > LLM_CHECK_MAX_CHARS:
+        return {
+            "type": "llm",
+            "skipped": True,
+            "reason": f"LLM 점검은 {LLM_CHECK_MAX_CHARS}자 이하만 가능합니다. (현재: {len(text)}자)"
+        }
+    try:
+        from app.api.content_filter import check_setuek, SetuekCheckRequest
+        response = await check_setuek(SetuekCheckRequest(text=text))
+    except ImportError as e:
+        return {"type": "llm", "skipped": True, "reason": f"LLM 점검 모듈을 불러올 수 없습니다: {e}"}
+    except HTTPException as e:
+        return {"type": "llm", "skipped": True, "reason": str(e.detail)}
+    return {"type": "llm", "errors": [error.model_dump() for error in response.errors]}
+
+
+# --- 다중 문서 일괄 OCR ---
+# 한 번에 처리할 수 있는 최대 문서 수 (ZIP 내부 PDF 포함, 중복 제거 전)
+OCR_BATCH_MAX_DOCUMENTS = 200
+# 문서 하나(ZIP 내부 항목은 압축 해제 크기)와 요청 전체의 최대 크기 (압축 폭탄 방지)
+OCR_BATCH_MAX_FILE_BYTES = 50 * 1024 * 1024
+OCR_BATCH_MAX_TOTAL_BYTES = 500 * 1024 * 1024
+
+# 모든 요청이 공유하는 페이지 OCR 워커 풀
+_ocr_executor: Optional[ThreadPoolExecutor] = None
+_ocr_executor_lock = threading.Lock()
+
+
+def get_ocr_executor() -> ThreadPoolExecutor:
+    """
+    페이지 OCR용 공유 워커 풀을 반환합니다 (싱글톤).
+    tesserocr/OpenCV는 연산 중 GIL을 해제하고 pytesseract는 별도 프로세스를 띄우므로
+    스레드 풀로도 CPU 코어를 모두 사용할 수 있습니다.
+    """
+    global _ocr_executor
+    with _ocr_executor_lock:
+        if _ocr_executor is None:
+            workers = settings.OCR_WORKERS or os.cpu_count() or 1
+            # 페이지 단위로 병렬 처리하므로 Tesseract 내부 OpenMP 스레드는 1개로 제한 (과다 구독 방지)
+            os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+            _ocr_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr")
+            print(f"OCR 워커 풀 생성: {workers}개")
+        return _ocr_executor
+
+
+@dataclass
+class _BatchDocument:
+    filename: str
+    sha256: str
+    path: Optional[str] = None
+    method: Optional[str] = None
+    page_texts: List[Optional[str]] = field(default_factory=list)
+    remaining: int = 0
+    error: Optional[str] = None
+    duplicates: List[str] = field(default_factory=list)
+    start_time: float = field(default_factory=time.time)
+
+
+def _zip_entry_name(info: zipfile.ZipInfo) -> str:
+    """ZIP 항목 이름 복원 (UTF-8 플래그가 없으면 Windows 압축기의 CP949로 간주)"""
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode("cp437").decode("cp949")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+def _read_batch_uploads(files: List[UploadFile]) -> List[Tuple[str, bytes]]:
+    """업로드된 PDF/ZIP 파일에서 (파일명, PDF 내용) 목록을 만듭니다."""
+    documents = []
+    total_bytes = 0
+
+    def reserve(name: str, size: int):
+        # 읽기 전에 크기 확인 (ZIP 항목은 헤더의 압축 해제 크기, 실제 해제도 이 크기에서 멈춤)
+        nonlocal total_bytes
+        if size > OCR_BATCH_MAX_FILE_BYTES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"파일 하나는 최대 {OCR_BATCH_MAX_FILE_BYTES // (1024 * 1024)}MB까지 처리할 수 있습니다: {name}"
+            )
+        total_bytes += size
+        if total_bytes > OCR_BATCH_MAX_TOTAL_BYTES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"한 번에 최대 {OCR_BATCH_MAX_TOTAL_BYTES // (1024 * 1024)}MB까지 처리할 수 있습니다."
+            )
+
+    def check_count(count: int):
+        if count > OCR_BATCH_MAX_DOCUMENTS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"한 번에 최대 {OCR_BATCH_MAX_DOCUMENTS}개 문서까지 처리할 수 있습니다."
+            )
+
+    for upload in files:
+        filename = upload.filename or ""
+        lower = filename.lower()
+        if lower.endswith(".pdf"):
+            content = upload.file.read(OCR_BATCH_MAX_FILE_BYTES + 1)
+            reserve(filename, len(content))
+            documents.append((filename, content))
+        elif lower.endswith(".zip"):
+            content = upload.file.read(OCR_BATCH_MAX_TOTAL_BYTES + 1)
+            if len(content) > OCR_BATCH_MAX_TOTAL_BYTES:
+                reserve(filename, len(content))
+            try:
+                with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                    for info in archive.infolist():
+                        name = _zip_entry_name(info)
+                        if info.is_dir() or not name.lower().endswith(".pdf"):
+                            continue
+                        # macOS 압축 시 생기는 메타데이터 파일 제외
+                        if name.startswith("__MACOSX/") or os.path.basename(name).startswith("._"):
+                            continue
+                        check_count(len(documents) + 1)
+                        reserve(name, info.file_size)
+                        documents.append((name, archive.read(info)))
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"올바른 ZIP 파일이 아닙니다: {filename}")
+        else:
+            raise HTTPException(status_code=400, detail=f"PDF 또는 ZIP 파일만 업로드 가능합니다: {filename}")
+
+        check_count(len(documents))
+
+    if not documents:
+        raise HTTPException(status_code=400, detail="처리할 PDF 파일이 없습니다.")
+    return documents
+
+
+def _inspect_document(pdf_path: str) -> Tuple[Optional[List[str]], int]:
+    """디지털 PDF이면 (페이지 텍스트, 페이지 수), 스캔 PDF이면 (None, 페이지 수)를 반환합니다."""
+    digital_pages = _extract_digital_pages(pdf_path)
+    if digital_pages is not None:
+        return digital_pages, len(digital_pages)
+    return None, _get_page_count(pdf_path)
+
+
+def _document_result(doc: _BatchDocument, filename: str = None) -> dict:
+    result = {
+        "type": "document",
+        "filename": filename or doc.filename,
+        "sha256": doc.sha256,
+        "method": doc.method,
+        "pages": len(doc.page_texts),
+    }
+    if filename:
+        result["duplicate_of"] = doc.filename
+    if doc.error:
+        result["error"] = doc.error
+    else:
+        result["text"] = clean_extracted_text("\n".join(text or "" for text in doc.page_texts))
+        result["elapsed"] = time.time() - doc.start_time
+    return result
+
+
+@router.post("/extract-batch")
+async def extract_text_from_batch(files: List[UploadFile] = File(...)):
+    """
+    여러 PDF(또는 PDF가 담긴 ZIP)를 한 번에 텍스트로 추출합니다.
+    내용이 같은 파일은 SHA-256으로 한 번만 처리하고, 모든 문서의 모든 페이지를
+    하나의 공유 워커 풀에 올려 코어를 최대한 활용합니다.
+    문서가 끝나는 순서대로 NDJSON 스트림으로 결과를 내보냅니다.
+
+    스트림 이벤트:
+        {"type": "document", "filename", "sha256", "method", "pages", "text", "elapsed"}
+            중복 파일은 "duplicate_of"(원본 파일명)가 추가되고, 실패한 문서는 "text" 대신 "error"
+        {"type": "done", "documents", "unique_documents", "pages", "elapsed"}
+    """
+    uploads = await run_in_threadpool(_read_batch_uploads, files)
+
+    # 1. 내용 해시로 중복 제거 후 임시 파일로 저장
+    unique_docs: Dict[str, _BatchDocument] = {}
+    for filename, content in uploads:
+        digest = hashlib.sha256(content).hexdigest()
+        if digest in unique_docs:
+            unique_docs[digest].duplicates.append(filename)
+            continue
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_pdf:
+            temp_pdf.write(content)
+        unique_docs[digest] = _BatchDocument(filename=filename, sha256=digest, path=temp_pdf.name)
+    del uploads
+
+    executor = get_ocr_executor()
+    backend = get_ocr_backend()
+
+    async def stream():
+        start_time = time.time()
+        total_pages = 0
+        pending = set()
+        inspect_tasks = {}
+        page_tasks = {}
+        try:
+            # 2. 문서별 디지털/스캔 판별 (워커 풀에서 병렬)
+            for doc in unique_docs.values():
+                task = asyncio.wrap_future(executor.submit(_inspect_document, doc.path))
+                inspect_tasks[task] = doc
+                pending.add(task)
+
+            # 3. 판별이 끝난 스캔 문서의 페이지를 모두 같은 풀에 투입, 문서 완료 순으로 결과 전송
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    finished = None
+                    if task in inspect_tasks:
+                        doc = inspect_tasks.pop(task)
+                        try:
+                            digital_pages, page_count = task.result()
+                        except Exception as e:
+                            doc.error = e.detail if isinstance(e, HTTPException) else str(e)
+                            finished = doc
+                        else:
+                            if digital_pages is not None:
+                                doc.method = "direct"
+                                doc.page_texts = digital_pages
+                                finished = doc
+                            else:
+                                doc.method = "ocr"
+                                doc.page_texts = [None] * page_count
+                                doc.remaining = page_count
+                                for page_number in range(1, page_count + 1):
+                                    page_task = asyncio.wrap_future(
+                                        executor.submit(ocr_pdf_page, doc.path, page_number, backend)
+                                    )
+                                    page_tasks[page_task] = (doc, page_number)
+                                    pending.add(page_task)
+                                if page_count == 0:
+                                    finished = doc
+                    else:
+                        doc, page_number = page_tasks.pop(task)
+                        try:
+                            doc.page_texts[page_number - 1] = task.result()
+                        except Exception as e:
+                            doc.error = f"{page_number} 페이지 OCR 실패: {str(e)}"
+                        doc.remaining -= 1
+                        if doc.remaining == 0:
+                            finished = doc
+
+                    if finished is not None:
+                        total_pages += len(finished.page_texts)
+                        print(f"문서 처리 완료: {finished.filename} ({finished.method}, {len(finished.page_texts)} 페이지)")
+                        yield _ndjson(_document_result(finished))
+                        for duplicate in finished.duplicates:
+                            yield _ndjson(_document_result(finished, filename=duplicate))
+
+            elapsed = time.time() - start_time
+            print(f"일괄 추출 완료: {len(unique_docs)}개 문서, {total_pages} 페이지, {elapsed:.2f}초")
+            yield _ndjson({
+                "type": "done",
+                "documents": sum(1 + len(doc.duplicates) for doc in unique_docs.values()),
+                "unique_documents": len(unique_docs),
+                "pages": total_pages,
+                "elapsed": elapsed,
+            })
+        finally:
+            # 클라이언트 연결이 끊긴 경우 아직 시작되지 않은 페이지 작업 취소
+            for task in pending:
+                task.cancel()
+            for doc in unique_docs.values():
+                try:
+                    if doc.path and os.path.exists(doc.path):
+                        os.remove(doc.path)
+                except OSError:
+                    pass
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
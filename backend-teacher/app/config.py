@@ -268,6 +268,42 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     LOG_FILE: str = os.getenv("LOG_FILE", "logs/app.log")
     
+    # OCR 설정
+    # auto: tesserocr가 설치되어 있으면 사용, 없으면 pytesseract
+    OCR_BACKEND: str = os.getenv("OCR_BACKEND", "auto")
+    TESSDATA_PREFIX: str = os.getenv("TESSDATA_PREFIX", "")  # traineddata 경로 (비우면 기본 경로)
+    OCR_LAYOUT_CROP: bool = os.getenv("OCR_LAYOUT_CROP", "true").lower() == "true"  # 텍스트 영역만 잘라서 인식
+    OCR_WORKERS: int = int(os.getenv("OCR_WORKERS", "0"))  # 일괄 OCR 워커 수 (0이면 CPU 코어 수)
+
+    # QR 출석 스캔 일괄 저장 설정
+    ATTENDANCE_SCAN_BATCH_SIZE: int = int(os.getenv("ATTENDANCE_SCAN_BATCH_SIZE", "100"))  # 한 번에 저장할 최대 스캔 수
+    ATTENDANCE_SCAN_FLUSH_MS: int = int(os.getenv("ATTENDANCE_SCAN_FLUSH_MS", "50"))  # 배치를 모으는 최대 대기 시간
+    # 모니터링 대시보드 실시간 집계 (true면 교사별 당일 현황을 메모리 집계로 응답)
+    ATTENDANCE_LIVE_COUNTERS: bool = os.getenv("ATTENDANCE_LIVE_COUNTERS", "false").lower() == "true"
+    ATTENDANCE_COUNTER_TTL: int = int(os.getenv("ATTENDANCE_COUNTER_TTL", "30"))  # 집계를 DB에서 다시 읽는 주기 (초)
+    # 출석 이벤트를 pg_notify로 모든 워커에 전달 (워커가 여러 개일 때 true)
+    ATTENDANCE_EVENTS_PG_NOTIFY: bool = os.getenv("ATTENDANCE_EVENTS_PG_NOTIFY", "false").lower() == "true"
+    ROOM_POLICY_CACHE_TTL: int = int(os.getenv("ROOM_POLICY_CACHE_TTL", "300"))  # 정독실 정책 캐시 유지 시간 (초, 변경 알림 누락 대비)
+    # 야자 자동 퇴실/결석 스케줄러 (워커 중 advisory lock을 잡은 하나만 실행)
+    SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    SCHEDULER_TIMEZONE: str = os.getenv("SCHEDULER_TIMEZONE", "Asia/Seoul")  # 정독실 시간 설정의 기준 시간대
+    SCHEDULER_JOB_DELAY_MIN: int = int(os.getenv("SCHEDULER_JOB_DELAY_MIN", "5"))  # 종료/마감 시간 후 처리까지 대기 (분)
+    SCHEDULER_LEADER_CHECK_SECONDS: int = int(os.getenv("SCHEDULER_LEADER_CHECK_SECONDS", "30"))  # 리더 확인 및 작업 동기화 주기 (초)
+    # 키오스크 QR 코드 순환 (토큰 유효 시간 = 순환 주기 + 여유 시간)
+    QR_ROTATION_SECONDS: int = int(os.getenv("QR_ROTATION_SECONDS", "50"))  # QR 코드 교체 주기 (초)
+    QR_TOKEN_GRACE_SECONDS: int = int(os.getenv("QR_TOKEN_GRACE_SECONDS", "10"))  # 교체 후에도 토큰을 받아주는 시간 (초)
+    QR_IDLE_SECONDS: int = int(os.getenv("QR_IDLE_SECONDS", "600"))  # 요청/구독이 없으면 순환을 멈추는 시간 (초)
+    # 시간표 자동 배정 탐색 제한 (0이면 제한 없음, 제한에 걸리면 배정하지 못한 그룹을 알려줌)
+    AUTO_SCHEDULE_TIME_LIMIT_SECONDS: float = float(os.getenv("AUTO_SCHEDULE_TIME_LIMIT_SECONDS", "30"))
+    AUTO_SCHEDULE_NODE_LIMIT: int = int(os.getenv("AUTO_SCHEDULE_NODE_LIMIT", "0"))
+    # 자동 배정 백그라운드 작업 (워커마다 동시에 실행할 수 있는 작업 수, 요청별 제한 시간 상한)
+    AUTO_SCHEDULE_MAX_JOBS: int = int(os.getenv("AUTO_SCHEDULE_MAX_JOBS", "2"))
+    AUTO_SCHEDULE_JOB_MAX_SECONDS: float = float(os.getenv("AUTO_SCHEDULE_JOB_MAX_SECONDS", "600"))
+    AUTO_SCHEDULE_OPTIMIZE_SECONDS: float = float(os.getenv("AUTO_SCHEDULE_OPTIMIZE_SECONDS", "5"))  # 배정 후 소프트 제약(schedule_constraints) 개선 시간 (0이면 점수만 계산)
+    AUTO_SCHEDULE_REPAIR_SECONDS: float = float(os.getenv("AUTO_SCHEDULE_REPAIR_SECONDS", "1"))  # 시간표 부분 수정 탐색 제한 (초)
+    AUTO_SCHEDULE_PORTFOLIO_WORKERS: int = int(os.getenv("AUTO_SCHEDULE_PORTFOLIO_WORKERS", "0"))  # portfolio 엔진 프로세스 수 (0이면 CPU 수)
+    SCHEDULE_OCCUPANCY_CACHE_TTL: int = int(os.getenv("SCHEDULE_OCCUPANCY_CACHE_TTL", "300"))  # 시간표 점유 캐시 유지 시간 (초, 변경 알림 누락 대비)
+
     # OpenAI API 설정 (Secrets Manager 또는 환경변수에서 읽기)
     # __init__에서 Secrets Manager를 통해 읽어옴
     OPENAI_API_KEY: str = ""
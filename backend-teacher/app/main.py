@@ -87,7 +87,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],  # 모든 헤더 허용
-    expose_headers=["*"],
+    expose_headers=["*", "X-Next-Cursor"],  # credentials 사용 시 "*"는 무시되므로 페이지네이션 헤더는 명시
     max_age=3600,
 )
 
@@ -277,9 +277,15 @@ app.include_router(wizard.router, prefix="/api/wizard", tags=["학교 설정 마
 async def startup_event():
     """애플리케이션 시작 시 스케줄러 시작 및 필터 서비스 초기화"""
     try:
-        # scheduler = get_scheduler_service()
-        # scheduler.start()
-        logger.info("야자 출석 스케줄러가 일시적으로 비활성화되었습니다 (디버깅)")
+        if settings.SCHEDULER_ENABLED:
+            from app.services.pg_listener import get_pg_listener
+            from app.services.scheduler_service import get_scheduler_service
+            scheduler = get_scheduler_service()
+            # 위치 설정 변경 알림으로 작업 재설정 (DB 알림 수신 시작 전에 등록)
+            scheduler.register(get_pg_listener())
+            scheduler.start()
+        else:
+            logger.info("야자 출석 스케줄러가 비활성화되어 있습니다 (SCHEDULER_ENABLED=false)")
     except Exception as e:
         logger.error(f"스케줄러 시작 중 오류 발생: {str(e)}")
     
@@ -297,10 +303,25 @@ async def startup_event():
                 logger.info(f"환경부 패턴 확인: {env_patterns[0].pattern}")
     except Exception as e:
         logger.error(f"필터 서비스 초기화 중 오류 발생: {str(e)}")
+    
+    # 워커 간 DB 알림 수신 (정책/시간표 점유 캐시 무효화, 실시간 출석 이벤트)
+    try:
+        from app.database import engine
+        from app.services.pg_listener import get_pg_listener
+        from app.services.room_policy_cache import get_room_policy_cache
+        from app.services.schedule_occupancy_cache import get_schedule_occupancy_cache
+        from app.services.attendance_event_service import get_attendance_events
+        listener = get_pg_listener()
+        get_room_policy_cache().register(listener)
+        get_schedule_occupancy_cache().register(listener)
+        get_attendance_events().register(listener)
+        listener.start(engine)
+    except Exception as e:
+        logger.error(f"DB 알림 수신 시작 중 오류 발생: {str(e)}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """애플리케이션 종료 시 스케줄러 종료"""
+    """애플리케이션 종료 시 스케줄러 종료 및 출석 스캔 버퍼 비우기"""
     try:
         from app.services.scheduler_service import get_scheduler_service
         scheduler = get_scheduler_service()
@@ -308,6 +329,31 @@ async def shutdown_event():
         logger.info("야자 출석 스케줄러가 종료되었습니다")
     except Exception as e:
         logger.error(f"스케줄러 종료 중 오류 발생: {str(e)}")
+    
+    try:
+        from app.services.pg_listener import get_pg_listener
+        get_pg_listener().stop()
+    except Exception as e:
+        logger.error(f"DB 알림 수신 종료 중 오류 발생: {str(e)}")
+    
+    try:
+        from app.services.qr_rotation_service import get_qr_rotation_service
+        get_qr_rotation_service().shutdown()
+    except Exception as e:
+        logger.error(f"QR 코드 순환 종료 중 오류 발생: {str(e)}")
+    
+    try:
+        from app.services.auto_schedule_job_service import get_auto_schedule_job_service
+        get_auto_schedule_job_service().shutdown()
+    except Exception as e:
+        logger.error(f"자동 배정 작업 종료 중 오류 발생: {str(e)}")
+    
+    # 대기 중인 QR 출석 스캔 저장
+    try:
+        from app.services.attendance_ingest_service import get_scan_buffer
+        get_scan_buffer().shutdown()
+    except Exception as e:
+        logger.error(f"출석 스캔 버퍼 종료 중 오류 발생: {str(e)}")
 
 @app.get("/")
 async def root():
@@ -1,6 +1,6 @@
 # 출석 모델
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Enum, Text, JSON, DECIMAL
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Boolean, Enum, Text, JSON, DECIMAL, Index
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 import enum
@@ -14,8 +14,25 @@ class AttendanceStatus(str, enum.Enum):
     COMPLETED = "completed"  # 정상 완료 (야자 종료 시 자동 처리)
     EXCUSED = "excused"  # 공결
 
+def _attendance_day_default(context):
+    """date 컬럼 값에서 출석 일자를 계산 (ORM 저장 시 day 미지정이면 사용)"""
+    value = context.get_current_parameters().get("date")
+    return value.date() if value is not None else None
+
+
 class Attendance(Base):
     __tablename__ = "attendance"
+    __table_args__ = (
+        # 학생 x 일자 x 정독실 당 출석 기록은 하나 (QR 스캔 일괄 upsert의 ON CONFLICT 대상)
+        Index("uq_attendance_student_day_room", "student_id", "day", "room_id", unique=True),
+        # 정독실별 당일 현황, 자동 퇴실/결석 처리
+        Index("ix_attendance_room_day_status", "room_id", "day", "status"),
+        # 교사별 날짜 조회, 모니터링
+        Index("ix_attendance_teacher_day", "teacher_id", "day"),
+        # 부정행위 의심 기록 최신순 keyset 페이지네이션
+        Index("ix_attendance_fraud_teacher_created", "teacher_id", "created_at", "id",
+              postgresql_where=text("is_fraud_detected")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
@@ -29,6 +46,7 @@ class Attendance(Base):
     
     # 출석 정보
     date = Column(DateTime(timezone=True), nullable=False)
+    day = Column(Date, nullable=False, default=_attendance_day_default)  # 출석 일자 (date의 날짜 부분을 저장)
     # 실제 DB에서는 VARCHAR로 저장되므로 String 사용, Enum은 값 검증용
     status = Column(String(20), nullable=False, default=AttendanceStatus.ABSENT.value)
     note = Column(String)  # 비고
@@ -67,3 +85,36 @@ class LocationSetting(Base):
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class NightStudyRoster(Base):
+    """야자 참여 학생 명단 (자동 결석 처리 대상)"""
+    __tablename__ = "night_study_roster"
+    
+    room_id = Column(String, ForeignKey("location_settings.room_id", ondelete="CASCADE"), primary_key=True)
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True, index=True)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class BatchJobRun(Base):
+    """야자 자동 처리 배치 실행 기록"""
+    __tablename__ = "batch_job_runs"
+    __table_args__ = (
+        # 작업/정독실별 최근 실행 조회
+        Index("ix_batch_job_runs_job_room_started", "job_name", "room_id", "started_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String, nullable=False)  # night_study_checkout, night_study_absent
+    room_id = Column(String)  # 처리한 정독실 (전체 처리면 null)
+    status = Column(String, nullable=False)  # success, failed
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True))
+    duration_ms = Column(Integer)  # 실행 시간 (밀리초)
+    rows_processed = Column(Integer, default=0)  # 변경/생성된 출석 기록 수
+    result = Column(JSON)  # 정독실별 처리 결과
+    error = Column(Text)  # 실패 시 오류 메시지
+    worker = Column(String)  # 실행한 워커 (hostname:pid)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,5 +1,5 @@
 # 기존 데이터베이스 테이블에 맞는 모델 (교사용)
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Date, UniqueConstraint, Index
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Date, UniqueConstraint, Index, Float, JSON
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -302,6 +302,36 @@ class ScheduleConstraint(Base):
     user = relationship("User") # Link to user
 
 
+class AutoScheduleJob(Base):
+    """
+    자동 배정 백그라운드 작업.
+    작업을 받은 워커가 별도 프로세스에서 풀고 진행 상황/결과를 기록하므로
+    다른 워커에서도 상태 조회, 취소 요청, 결과 적용이 가능합니다.
+    """
+    __tablename__ = "auto_schedule_jobs"
+    __table_args__ = (
+        # 시간표별 최근 작업 / 진행 중인 작업 조회
+        Index("ix_auto_schedule_jobs_schedule_status", "schedule_id", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    schedule_id = Column(Integer, ForeignKey("schedule_metadata.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    engine = Column(String(20), nullable=False)
+    status = Column(String(20), nullable=False)  # running, succeeded, failed, cancelled, applied
+    time_limit_seconds = Column(Float)
+    total_blocks = Column(Integer, default=0)  # 배정해야 할 블록 수
+    progress = Column(JSON)  # 최근 진행 상황 (placed, best_placed, total, nodes)
+    result = Column(JSON)  # placements, unplaced_groups, stats
+    error = Column(Text)
+    cancel_requested = Column(Boolean, default=False)
+    worker = Column(String)  # 실행한 워커 (hostname:pid)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+
 
 
 
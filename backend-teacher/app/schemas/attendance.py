@@ -108,6 +108,34 @@ class LocationSettingResponse(LocationSettingBase):
         from_attributes = True
 
 
+class NightStudyRosterUpdate(BaseModel):
+    """야자 참여 학생 명단 (전체 교체)"""
+    student_ids: List[int]
+
+
+class NightStudyRosterResponse(BaseModel):
+    room_id: str
+    student_ids: List[int]
+
+
+class BatchJobRunResponse(BaseModel):
+    """야자 자동 처리 배치 실행 기록"""
+    id: int
+    job_name: str
+    room_id: Optional[str] = None
+    status: str
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[int] = None
+    rows_processed: Optional[int] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    worker: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+
 # 관리자 모니터링 스키마 (명세서 F-05)
 class FraudRecordResponse(BaseModel):
     """부정행위 의심 기록"""
@@ -1,4 +1,5 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+from datetime import datetime
 from pydantic import BaseModel, Field
 
 # --- Validation Response ---
@@ -79,3 +80,67 @@ class ScheduleMetadataResponse(ScheduleMetadataBase):
     
     class Config:
         from_attributes = True
+
+# --- Auto-Schedule Job Schemas ---
+class AutoScheduleJobCreate(BaseModel):
+    engine: str = "mrv"
+    time_limit_seconds: Optional[float] = Field(default=None, gt=0, description="풀이 제한 시간 (초, 비우면 기본값)")
+
+class AutoScheduleJobResponse(BaseModel):
+    id: int
+    schedule_id: int
+    engine: str
+    status: str  # running, succeeded, failed, cancelled, applied
+    time_limit_seconds: Optional[float] = None
+    total_blocks: Optional[int] = None
+    progress: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_requested: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class PlacementResponse(BaseModel):
+    group_id: int
+    day: str
+    period: int
+    room_id: Optional[int] = None
+
+class AutoScheduleJobResult(BaseModel):
+    job_id: int
+    status: str
+    placements: List[PlacementResponse] = []  # 성공 시 전체 배정, 실패 시 가장 많이 배정한 중간 결과
+    unplaced_groups: List[Dict[str, Any]] = []
+    blocked_groups: List[int] = []
+    stats: Dict[str, Any] = {}
+    error: Optional[str] = None
+
+# --- Timetable Repair Schemas ---
+class TimetableRepairRequest(BaseModel):
+    apply: bool = False  # False면 변경안만 반환
+    time_limit_seconds: Optional[float] = Field(default=None, gt=0, description="탐색 제한 시간 (초, 비우면 기본값)")
+
+class BlockMoveResponse(BaseModel):
+    block_id: int
+    group_id: int
+    from_day: str
+    from_period: int
+    day: str
+    period: int
+    room_id: Optional[int] = None
+    reason: str  # time_off, double_booking, outside_grid, neighborhood
+
+class TimetableRepairResponse(BaseModel):
+    status: str  # solved, infeasible, time_limit
+    applied: bool = False
+    moves: List[BlockMoveResponse] = []
+    added: List[PlacementResponse] = []
+    removed_block_ids: List[int] = []
+    unplaced_groups: List[Dict[str, Any]] = []
+    unresolved: List[Dict[str, Any]] = []  # 고정 블록의 위반 (자동으로 고치지 않음)
+    violations: int = 0
+    freed_blocks: int = 0
+    elapsed_ms: float = 0
@@ -0,0 +1,134 @@
+# 출석 현황 실시간 집계 (모니터링 대시보드 폴링 시 DB 조회 제거)
+from collections import Counter
+from datetime import date as date_type
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+import heapq
+import logging
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.attendance import Attendance, AttendanceStatus
+
+logger = logging.getLogger(__name__)
+
+RECENT_LIMIT = 20
+
+# 집계 범위: ("teacher", teacher_id) 또는 ("room", room_id)
+Scope = Tuple[str, Hashable]
+
+
+def attendance_to_dict(attendance: Attendance) -> Dict[str, Any]:
+    return {column.name: getattr(attendance, column.name) for column in Attendance.__table__.columns}
+
+
+class _ScopeCounters:
+    """한 범위 x 하루치 출석 기록과 상태별 집계"""
+
+    def __init__(self, rows: Iterable[Dict[str, Any]]):
+        self.rows: Dict[int, Dict[str, Any]] = {}
+        self.counts: Counter = Counter()
+        self.loaded_at = time.monotonic()
+        for row in rows:
+            self.apply(row)
+
+    def apply(self, row: Dict[str, Any]):
+        previous = self.rows.get(row["id"])
+        if previous is not None:
+            self._count(previous, -1)
+        self.rows[row["id"]] = row
+        self._count(row, 1)
+
+    def _count(self, row: Dict[str, Any], delta: int):
+        self.counts["total"] += delta
+        self.counts[row["status"]] += delta
+        if row.get("is_fraud_detected"):
+            self.counts["fraud"] += delta
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "total_students": self.counts["total"],
+            "present_count": self.counts[AttendanceStatus.PRESENT.value],
+            "late_count": self.counts[AttendanceStatus.LATE.value],
+            "absent_count": self.counts[AttendanceStatus.ABSENT.value],
+            "fraud_suspected_count": self.counts["fraud"],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        recent = heapq.nlargest(
+            RECENT_LIMIT, self.rows.values(),
+            key=lambda row: (row["check_in_time"] is not None, row["check_in_time"] or 0)
+        )
+        return {**self.summary(), "recent_attendance": recent}
+
+
+class AttendanceCounters:
+    """
+    정독실별 / 교사별 일일 출석 집계
+
+    처음 조회할 때 해당 범위의 당일 기록을 한 번 읽고, 이후에는 QR 스캔 저장 경로가
+    저장된 행을 apply()로 넘겨 증분 갱신합니다. 대시보드를 보는 교사 수와 무관하게
+    범위당 TTL마다 한 번만 DB를 읽습니다. 스캔 외 경로(자동 처리, 조퇴 승인 등)의 변경은
+    invalidate()로, 다른 워커의 스캔은 출석 이벤트(pg_notify 사용 시) 또는 TTL 만료 후 반영합니다.
+    """
+
+    def __init__(self, ttl_seconds: int = None):
+        self.ttl = ttl_seconds if ttl_seconds is not None else settings.ATTENDANCE_COUNTER_TTL
+        self._scopes: Dict[Tuple[Scope, date_type], _ScopeCounters] = {}
+        self._lock = threading.Lock()
+
+    def get_stats(self, db: Session, scope: Scope, day: date_type) -> Dict[str, Any]:
+        key = (scope, day)
+        with self._lock:
+            counters = self._scopes.get(key)
+            if counters is not None and time.monotonic() - counters.loaded_at <= self.ttl:
+                return counters.stats()
+
+        kind, value = scope
+        column = Attendance.teacher_id if kind == "teacher" else Attendance.room_id
+        rows = [
+            attendance_to_dict(record)
+            for record in db.query(Attendance).filter(column == value, Attendance.day == day).all()
+        ]
+        with self._lock:
+            counters = _ScopeCounters(rows)
+            self._scopes[key] = counters
+            return counters.stats()
+
+    def peek(self, scope: Scope, day: date_type) -> Optional[Dict[str, int]]:
+        """이미 읽어 둔 범위의 상태별 집계 (없으면 None, DB 조회 없음)"""
+        with self._lock:
+            counters = self._scopes.get((scope, day))
+            return counters.summary() if counters is not None else None
+
+    def apply(self, rows: List[Dict[str, Any]]):
+        """저장된 출석 기록(전체 컬럼)을 이미 읽어 둔 범위에 반영"""
+        with self._lock:
+            for row in rows:
+                for scope in (("teacher", row["teacher_id"]), ("room", row["room_id"])):
+                    counters = self._scopes.get((scope, row["day"]))
+                    if counters is not None:
+                        counters.apply(row)
+
+    def invalidate(self, day: Optional[date_type] = None):
+        """집계를 비움 (day를 주면 해당 날짜만)"""
+        with self._lock:
+            if day is None:
+                self._scopes.clear()
+            else:
+                for key in [key for key in self._scopes if key[1] == day]:
+                    del self._scopes[key]
+
+
+# 전역 집계 인스턴스
+attendance_counters = None
+
+
+def get_attendance_counters() -> AttendanceCounters:
+    """출석 집계 인스턴스 가져오기 (싱글톤)"""
+    global attendance_counters
+    if attendance_counters is None:
+        attendance_counters = AttendanceCounters()
+    return attendance_counters
@@ -0,0 +1,184 @@
+# 출석 실시간 이벤트 (교사 대시보드 푸시용 pub/sub)
+from datetime import date, datetime
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import threading
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.attendance_counter_service import get_attendance_counters
+from app.services.pg_listener import PgNotificationListener
+
+logger = logging.getLogger(__name__)
+
+# 워커 간 스캔 이벤트 전달 채널
+ATTENDANCE_EVENT_CHANNEL = "attendance_events"
+
+# 구독 주제: ("teacher", teacher_id) 또는 ("room", room_id)
+Topic = Tuple[str, Hashable]
+
+# 이벤트에서 제외하는 컬럼 (크기가 크고 대시보드에 필요 없음, NOTIFY 페이로드 8000바이트 제한)
+_EXCLUDED_FIELDS = ("geo_data", "scanned_token")
+_DATETIME_FIELDS = ("date", "check_in_time", "check_out_time", "created_at", "updated_at")
+
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_row(row: Dict[str, Any]) -> str:
+    return json.dumps({k: v for k, v in row.items() if k not in _EXCLUDED_FIELDS}, default=_json_default)
+
+
+def decode_row(payload: str) -> Dict[str, Any]:
+    row = json.loads(payload)
+    for field in _DATETIME_FIELDS:
+        if row.get(field):
+            row[field] = datetime.fromisoformat(row[field])
+    if row.get("day"):
+        row["day"] = date.fromisoformat(row["day"])
+    return row
+
+
+class Subscription:
+    """SSE 연결 하나의 구독 (이벤트 루프 쪽 asyncio.Queue로 전달받음)"""
+
+    def __init__(self, broker: "AttendanceEventBroker", topics: List[Topic]):
+        self.broker = broker
+        self.topics = topics
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def put(self, event: Dict[str, Any]):
+        """(임의의 스레드에서) 이벤트 전달"""
+        try:
+            self.loop.call_soon_threadsafe(self._put_nowait, event)
+        except RuntimeError:
+            # 이벤트 루프가 이미 종료됨
+            self.close()
+
+    def _put_nowait(self, event: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # 느린 클라이언트 때문에 메모리가 늘지 않도록 버림
+            self.dropped += 1
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class AttendanceEventBroker:
+    """
+    프로세스 내 출석 이벤트 pub/sub
+
+    QR 스캔이 저장되면 해당 교사/정독실 주제의 구독자에게 scan 이벤트를 보냅니다.
+    ATTENDANCE_EVENTS_PG_NOTIFY를 켜면 저장 트랜잭션에서 pg_notify로 이벤트를 보내고,
+    모든 워커가 LISTEN으로 받아 자기 구독자에게 전달합니다.
+    (다른 워커에서 저장된 스캔도 실시간 집계에 반영됨)
+    """
+
+    def __init__(self, use_pg_notify: bool = None):
+        self.use_pg_notify = settings.ATTENDANCE_EVENTS_PG_NOTIFY if use_pg_notify is None else use_pg_notify
+        self._subscribers: Dict[Topic, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._listener: Optional[PgNotificationListener] = None
+
+    def subscribe(self, topics: List[Topic]) -> Subscription:
+        subscription = Subscription(self, topics)
+        with self._lock:
+            for topic in topics:
+                self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def register(self, listener: PgNotificationListener):
+        """워커 간 이벤트 수신 등록 (ATTENDANCE_EVENTS_PG_NOTIFY 사용 시)"""
+        if self.use_pg_notify:
+            self._listener = listener
+            listener.subscribe(ATTENDANCE_EVENT_CHANNEL, self._handle_notification)
+
+    @property
+    def _remote_delivery(self) -> bool:
+        return self.use_pg_notify and self._listener is not None and self._listener.connected.is_set()
+
+    def notify_remote(self, db: Session, rows: List[Dict[str, Any]]):
+        """
+        저장 트랜잭션 안에서 호출 (commit 시 모든 워커에 전달)
+        pg_notify를 쓰지 않으면 아무것도 하지 않음
+        """
+        if not rows or not self._remote_delivery:
+            return
+        db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {"channel": ATTENDANCE_EVENT_CHANNEL, "payloads": [encode_row(row) for row in rows]}
+        )
+
+    def publish(self, rows: List[Dict[str, Any]]):
+        """commit 후 호출: pg_notify로 보냈으면 LISTEN으로 돌아오므로 여기서는 전달하지 않음"""
+        if self._remote_delivery:
+            return
+        for row in rows:
+            self._deliver(row)
+
+    def _handle_notification(self, payload: str):
+        row = decode_row(payload)
+        # 같은 id는 덮어쓰므로 자기 워커에서 이미 반영한 행이 다시 와도 집계가 틀어지지 않음
+        get_attendance_counters().apply([row])
+        self._deliver(row)
+
+    def _deliver(self, row: Dict[str, Any]):
+        topics = (("teacher", row["teacher_id"]), ("room", row["room_id"]))
+        with self._lock:
+            targets = [(topic, list(self._subscribers.get(topic, ()))) for topic in topics]
+        if not any(subscribers for _, subscribers in targets):
+            return
+
+        attendance = json.loads(encode_row(row))
+        counters = get_attendance_counters()
+        for topic, subscribers in targets:
+            if not subscribers:
+                continue
+            event = {
+                "type": "scan",
+                "attendance": attendance,
+                # 실시간 집계를 쓰는 경우에만 포함
+                "counters": counters.peek(topic, row["day"]),
+            }
+            for subscription in subscribers:
+                subscription.put(event)
+
+
+# 전역 이벤트 브로커 인스턴스
+attendance_events = None
+
+
+def get_attendance_events() -> AttendanceEventBroker:
+    """출석 이벤트 브로커 인스턴스 가져오기 (싱글톤)"""
+    global attendance_events
+    if attendance_events is None:
+        attendance_events = AttendanceEventBroker()
+    return attendance_events
@@ -0,0 +1,130 @@
+# QR 출석 스캔 일괄 저장 서비스 (야자 시작 시 몰리는 스캔 처리용)
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import queue
+import threading
+import time
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.attendance_service import AttendanceService
+
+logger = logging.getLogger(__name__)
+
+
+class AttendanceScanBuffer:
+    """
+    QR 스캔 write-behind 버퍼
+
+    검증을 마친 스캔을 큐에 모아 두었다가 전용 스레드가 배치 단위로
+    한 번의 upsert + commit으로 저장합니다. submit()이 돌려주는 Future는
+    해당 배치의 commit이 끝난 뒤에 출석 기록 ID로 완료되므로,
+    응답은 기록이 DB에 반영된 다음에만 나갑니다.
+    """
+
+    def __init__(self, batch_size: int = None, flush_interval_ms: int = None, session_factory=SessionLocal):
+        self.batch_size = max(1, batch_size or settings.ATTENDANCE_SCAN_BATCH_SIZE)
+        self.flush_interval = max(0, flush_interval_ms if flush_interval_ms is not None
+                                  else settings.ATTENDANCE_SCAN_FLUSH_MS) / 1000
+        self.session_factory = session_factory
+        self._queue: "queue.Queue[Optional[Tuple[Dict[str, Any], Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stats = {"scans": 0, "batches": 0, "max_batch": 0, "fallbacks": 0}
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="attendance-scan-buffer", daemon=True)
+                self._thread.start()
+
+    def submit(self, values: Dict[str, Any]) -> Future:
+        """
+        스캔 한 건을 저장 대기열에 추가
+
+        Args:
+            values: AttendanceService.build_qr_attendance_values() 결과
+
+        Returns:
+            저장이 끝나면 출석 기록 ID로 완료되는 Future
+        """
+        self.start()
+        future: Future = Future()
+        self._queue.put((values, future))
+        return future
+
+    def shutdown(self, timeout: float = 10):
+        """대기 중인 스캔을 모두 저장한 뒤 스레드 종료"""
+        if self._thread and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            # 첫 스캔 이후 flush_interval 동안 또는 batch_size가 찰 때까지 모음
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+            if stopping:
+                # 종료 요청 이후 남은 스캔도 저장
+                rest = []
+                while not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is not None:
+                        rest.append(item)
+                for start in range(0, len(rest), self.batch_size):
+                    self._flush(rest[start:start + self.batch_size])
+                return
+
+    def _flush(self, batch: List[Tuple[Dict[str, Any], Future]]):
+        db = self.session_factory()
+        try:
+            try:
+                ids = AttendanceService(db).upsert_qr_attendance_records([values for values, _ in batch])
+                for (_, future), attendance_id in zip(batch, ids):
+                    future.set_result(attendance_id)
+            except Exception as e:
+                # 한 건의 오류(FK 위반 등)로 배치 전체가 실패하지 않도록 건별로 다시 저장
+                db.rollback()
+                self.stats["fallbacks"] += 1
+                logger.warning(f"출석 스캔 일괄 저장 실패, 건별 저장으로 재시도: {str(e)}")
+                for values, future in batch:
+                    try:
+                        future.set_result(AttendanceService(db).upsert_qr_attendance_records([values])[0])
+                    except Exception as row_error:
+                        db.rollback()
+                        future.set_exception(row_error)
+        finally:
+            db.close()
+
+        self.stats["scans"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+
+
+# 전역 스캔 버퍼 인스턴스
+scan_buffer = None
+
+
+def get_scan_buffer() -> AttendanceScanBuffer:
+    """스캔 버퍼 인스턴스 가져오기 (싱글톤)"""
+    global scan_buffer
+    if scan_buffer is None:
+        scan_buffer = AttendanceScanBuffer()
+    return scan_buffer
@@ -1,10 +1,15 @@
 # 출석 서비스
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, String
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, String, Date, DateTime, tuple_, select, update, exists, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import datetime, date as date_type
-from typing import List, Optional, Dict, Any
-from app.models.attendance import Attendance, AttendanceStatus
+from typing import List, Optional, Dict, Any, Tuple
+from app.models.attendance import Attendance, AttendanceStatus, LocationSetting, NightStudyRoster
+from app.models.student import Student
 from app.schemas.attendance import AttendanceCreate, AttendanceUpdate
+from app.services.attendance_counter_service import get_attendance_counters
+from app.services.attendance_event_service import get_attendance_events
+from app.config import settings
 
 class AttendanceService:
     def __init__(self, db: Session):
@@ -18,7 +23,8 @@ class AttendanceService:
             from datetime import datetime
             try:
                 date_obj = datetime.strptime(date, '%Y-%m-%d').date()
-                query = query.filter(func.date(Attendance.date) == date_obj)
+                # 저장된 day 컬럼으로 비교 (ix_attendance_teacher_day 사용)
+                query = query.filter(Attendance.day == date_obj)
             except ValueError:
                 # 날짜 파싱 실패 시 문자열로 직접 비교
                 query = query.filter(Attendance.date.cast(String).like(f"{date}%"))
@@ -31,6 +37,7 @@ class AttendanceService:
         attendance = Attendance(**attendance_data.dict(), teacher_id=teacher_id)
         self.db.add(attendance)
         self.db.commit()
+        get_attendance_counters().invalidate()
         self.db.refresh(attendance)
         return attendance
     
@@ -43,6 +50,7 @@ class AttendanceService:
             setattr(attendance, field, value)
         
         self.db.commit()
+        get_attendance_counters().invalidate()
         self.db.refresh(attendance)
         return attendance
     
@@ -61,84 +69,174 @@ class AttendanceService:
         """
         QR 코드 기반 출석 기록 생성 (명세서 F-04)
         """
-        # 같은 날짜에 이미 출석 기록이 있는지 확인
-        today = check_in_time.date()
-        existing = self.db.query(Attendance).filter(
-            and_(
-                Attendance.student_id == student_id,
-                func.date(Attendance.date) == today,
-                Attendance.room_id == room_id
-            )
-        ).first()
-        
-        if existing:
-            # 기존 기록 업데이트
-            existing.status = status.value  # Enum을 String으로 변환
-            existing.check_in_time = check_in_time
-            existing.scanned_token = scanned_token
-            existing.geo_data = geo_data
-            existing.device_id = device_id
-            existing.is_fraud_detected = is_fraud
-            self.db.commit()
-            self.db.refresh(existing)
-            return existing
-        else:
-            # 새 기록 생성
-            attendance = Attendance(
+        attendance_id = self.upsert_qr_attendance_records([
+            self.build_qr_attendance_values(
                 student_id=student_id,
                 teacher_id=teacher_id,
-                date=check_in_time,
-                status=status.value,  # Enum을 String으로 변환
-                check_in_time=check_in_time,
                 room_id=room_id,
                 scanned_token=scanned_token,
                 geo_data=geo_data,
                 device_id=device_id,
-                is_fraud_detected=is_fraud
+                check_in_time=check_in_time,
+                status=status,
+                is_fraud=is_fraud
             )
-            self.db.add(attendance)
-            self.db.commit()
-            self.db.refresh(attendance)
-            return attendance
+        ])[0]
+        return self.db.query(Attendance).filter(Attendance.id == attendance_id).first()
+    
+    @staticmethod
+    def build_qr_attendance_values(
+        student_id: int,
+        teacher_id: int,
+        room_id: str,
+        scanned_token: str,
+        geo_data: Dict[str, Any],
+        device_id: str,
+        check_in_time: datetime,
+        status: AttendanceStatus,
+        is_fraud: bool = False
+    ) -> Dict[str, Any]:
+        """QR 스캔 한 건을 attendance 테이블 INSERT 값으로 변환"""
+        return {
+            "student_id": student_id,
+            "teacher_id": teacher_id,
+            "date": check_in_time,
+            "day": check_in_time.date(),
+            "status": status.value,  # Enum을 String으로 변환
+            "check_in_time": check_in_time,
+            "room_id": room_id,
+            "scanned_token": scanned_token,
+            "geo_data": geo_data,
+            "device_id": device_id,
+            "is_fraud_detected": is_fraud,
+        }
+    
+    def upsert_qr_attendance_records(self, records: List[Dict[str, Any]]) -> List[int]:
+        """
+        QR 출석 기록 일괄 저장 (한 번의 INSERT ... ON CONFLICT DO UPDATE)
+        
+        같은 (학생, 일자, 정독실)에 이미 기록이 있으면 스캔 정보만 갱신합니다.
+        조회 후 저장하는 방식과 달리 동시 스캔에도 중복 기록이 생기지 않습니다.
+        
+        Args:
+            records: build_qr_attendance_values()로 만든 값 목록 (스캔 순서대로)
+        
+        Returns:
+            records와 같은 순서의 출석 기록 ID 목록
+        """
+        if not records:
+            return []
+        
+        # 한 문장 안에서 같은 행을 두 번 갱신할 수 없으므로 같은 키는 마지막 스캔만 남김
+        keys = [(r["student_id"], r["day"], r["room_id"]) for r in records]
+        latest = {key: record for key, record in zip(keys, records)}
+        
+        stmt = pg_insert(Attendance).values(list(latest.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Attendance.student_id, Attendance.day, Attendance.room_id],
+            set_={
+                "status": stmt.excluded.status,
+                "check_in_time": stmt.excluded.check_in_time,
+                "scanned_token": stmt.excluded.scanned_token,
+                "geo_data": stmt.excluded.geo_data,
+                "device_id": stmt.excluded.device_id,
+                "is_fraud_detected": stmt.excluded.is_fraud_detected,
+                "updated_at": func.now(),
+            }
+        ).returning(*Attendance.__table__.columns)
+        
+        rows = [dict(row._mapping) for row in self.db.execute(stmt).all()]
+        events = get_attendance_events()
+        events.notify_remote(self.db, rows)
+        self.db.commit()
+        
+        # 저장된 행으로 실시간 집계 갱신 후 대시보드 구독자에게 전달
+        get_attendance_counters().apply(rows)
+        events.publish(rows)
+        
+        ids = {(row["student_id"], row["day"], row["room_id"]): row["id"] for row in rows}
+        return [ids[key] for key in keys]
     
-    def get_fraud_records(self, teacher_id: Optional[int] = None, limit: int = 50) -> List[Attendance]:
+    def get_fraud_records(
+        self,
+        teacher_id: Optional[int] = None,
+        limit: int = 50,
+        room_id: Optional[str] = None,
+        day: Optional[date_type] = None,
+        device_id: Optional[str] = None,
+        before: Optional[Tuple[datetime, int]] = None
+    ) -> List[Attendance]:
         """
         부정행위 의심 기록 조회 (명세서 F-05)
+        
+        학생과 학생의 users 정보를 한 번의 조인 쿼리로 함께 읽습니다.
+        (record.student.name 접근 시 추가 조회 없음)
+        
+        Args:
+            before: 이전 페이지 마지막 기록의 (created_at, id). 주면 그보다 오래된 기록부터 조회
         """
-        query = self.db.query(Attendance).filter(Attendance.is_fraud_detected == True)
+        query = self.db.query(Attendance).options(
+            # Student.user는 lazy="joined"이므로 같은 쿼리에 함께 조인됨
+            joinedload(Attendance.student)
+        ).filter(Attendance.is_fraud_detected == True)
         
         if teacher_id:
             query = query.filter(Attendance.teacher_id == teacher_id)
-        
-        return query.order_by(Attendance.created_at.desc()).limit(limit).all()
+        if room_id:
+            query = query.filter(Attendance.room_id == room_id)
+        if day:
+            query = query.filter(Attendance.day == day)
+        if device_id:
+            query = query.filter(Attendance.device_id == device_id)
+        if before:
+            # keyset 페이지네이션 (OFFSET 없이 인덱스 순서대로 이어서 조회)
+            query = query.filter(tuple_(Attendance.created_at, Attendance.id) < tuple_(*before))
+        
+        return query.order_by(Attendance.created_at.desc(), Attendance.id.desc()).limit(limit).all()
     
-    def get_monitoring_stats(self, teacher_id: Optional[int] = None, target_date: Optional[date_type] = None) -> Dict[str, Any]:
+    def get_monitoring_stats(
+        self,
+        teacher_id: Optional[int] = None,
+        target_date: Optional[date_type] = None,
+        room_id: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         실시간 출석 현황 통계 (명세서 F-05)
+        room_id만 주면 해당 정독실 전체(담당 교사 무관) 현황
         """
-        query = self.db.query(Attendance)
+        # 특정 교사 또는 정독실의 특정 날짜 현황은 실시간 집계 사용 (설정 시)
+        if target_date and settings.ATTENDANCE_LIVE_COUNTERS and bool(teacher_id) != bool(room_id):
+            scope = ("teacher", teacher_id) if teacher_id else ("room", room_id)
+            return get_attendance_counters().get_stats(self.db, scope, target_date)
         
+        conditions = []
         if teacher_id:
-            query = query.filter(Attendance.teacher_id == teacher_id)
-        
+            conditions.append(Attendance.teacher_id == teacher_id)
         if target_date:
-            query = query.filter(func.date(Attendance.date) == target_date)
-        
-        total = query.count()
-        present_count = query.filter(Attendance.status == AttendanceStatus.PRESENT.value).count()
-        late_count = query.filter(Attendance.status == AttendanceStatus.LATE.value).count()
-        absent_count = query.filter(Attendance.status == AttendanceStatus.ABSENT.value).count()
-        fraud_count = query.filter(Attendance.is_fraud_detected == True).count()
+            conditions.append(Attendance.day == target_date)
+        if room_id:
+            conditions.append(Attendance.room_id == room_id)
+        
+        # 상태별 집계를 한 번의 쿼리로 (COUNT(*) FILTER (WHERE ...))
+        counts = self.db.query(
+            func.count().label("total"),
+            func.count().filter(Attendance.status == AttendanceStatus.PRESENT.value).label("present"),
+            func.count().filter(Attendance.status == AttendanceStatus.LATE.value).label("late"),
+            func.count().filter(Attendance.status == AttendanceStatus.ABSENT.value).label("absent"),
+            func.count().filter(Attendance.is_fraud_detected == True).label("fraud"),
+        ).select_from(Attendance).filter(*conditions).one()
         
         # 최근 출석 기록
-        recent = query.order_by(Attendance.check_in_time.desc()).limit(20).all()
+        recent = self.db.query(Attendance).filter(*conditions).order_by(
+            Attendance.check_in_time.desc()
+        ).limit(20).all()
         
         return {
-            "total_students": total,
-            "present_count": present_count,
-            "late_count": late_count,
-            "absent_count": absent_count,
-            "fraud_suspected_count": fraud_count,
+            "total_students": counts.total,
+            "present_count": counts.present,
+            "late_count": counts.late,
+            "absent_count": counts.absent,
+            "fraud_suspected_count": counts.fraud,
             "recent_attendance": recent
         }
     
@@ -165,6 +263,7 @@ class AttendanceService:
             attendance.note = reason  # 조퇴 사유를 note에 저장
         
         self.db.commit()
+        get_attendance_counters().invalidate()
         self.db.refresh(attendance)
         return attendance
     
@@ -183,6 +282,7 @@ class AttendanceService:
             if attendance.status == AttendanceStatus.EARLY_LEAVE_REQUEST.value:
                 attendance.status = AttendanceStatus.PRESENT.value
                 self.db.commit()
+                get_attendance_counters().invalidate()
                 self.db.refresh(attendance)
                 return attendance
             return attendance
@@ -192,89 +292,156 @@ class AttendanceService:
             attendance.status = AttendanceStatus.EARLY_LEAVE.value
             attendance.check_out_time = datetime.utcnow()
             self.db.commit()
+            get_attendance_counters().invalidate()
             self.db.refresh(attendance)
             return attendance
         
         return attendance
     
-    def process_auto_checkout(self, room_id: str, checkout_time_str: str) -> Dict[str, int]:
+    def _eligible_rooms(self, time_column, room_ids: Optional[List[str]] = None):
+        """해당 시간 설정이 있는 정독실 room_id 조회문"""
+        rooms = select(LocationSetting.room_id).where(time_column.isnot(None))
+        if room_ids:
+            rooms = rooms.where(LocationSetting.room_id.in_(room_ids))
+        return rooms
+    
+    def _count_by_room(self, rooms, *changed_ctes) -> Dict[str, List[int]]:
+        """정독실별로 각 CTE(RETURNING room_id)의 행 수를 집계 (변경 없는 정독실은 0)"""
+        rooms = rooms.cte("rooms")
+        counts = [
+            select(cte.c.room_id, func.count().label("n")).group_by(cte.c.room_id).subquery()
+            for cte in changed_ctes
+        ]
+        from_clause = rooms
+        for count in counts:
+            from_clause = from_clause.outerjoin(count, count.c.room_id == rooms.c.room_id)
+        stmt = select(rooms.c.room_id, *[func.coalesce(count.c.n, 0) for count in counts]).select_from(from_clause)
+        return {row[0]: list(row[1:]) for row in self.db.execute(stmt).all()}
+    
+    def process_auto_checkout(
+        self, room_ids: Optional[List[str]] = None, day: Optional[date_type] = None
+    ) -> Dict[str, Dict[str, int]]:
         """
         자동 퇴실 처리 (야자 종료 시간 도달 시)
-        status가 '정상'이고 check_out_time이 null인 모든 레코드의
+        야자 종료 시간이 설정된 모든 정독실(room_ids를 주면 그 중 해당 정독실)에서
+        status가 '정상'이고 check_out_time이 null인 당일 레코드의
         check_out_time을 현재 시각으로 기록하고 status를 '정상 완료'로 업데이트
         
+        학생 수와 무관하게 한 번의 UPDATE ... RETURNING 문으로 처리합니다.
+        
+        Args:
+            day: 처리할 날짜 (스케줄러 시간대 기준 실행일, None이면 UTC 오늘)
+        
         Returns:
-            처리된 레코드 수를 담은 딕셔너리
+            정독실별 처리된 레코드 수 ({room_id: {"processed": n}})
         """
-        from datetime import time
-        
-        # checkout_time_str을 time 객체로 파싱 (예: "22:00" -> time(22, 0))
-        try:
-            hour, minute = map(int, checkout_time_str.split(":"))
-            checkout_time = time(hour, minute)
-        except:
-            return {"processed": 0, "error": "Invalid checkout_time format"}
-        
-        # 오늘 날짜
-        today = datetime.utcnow().date()
-        
-        # status가 '정상'이고 check_out_time이 null인 레코드 조회
-        records = self.db.query(Attendance).filter(
-            and_(
-                Attendance.room_id == room_id,
-                func.date(Attendance.date) == today,
-                Attendance.status == AttendanceStatus.PRESENT.value,
-                Attendance.check_out_time.is_(None)
-            )
-        ).all()
-        
-        processed_count = 0
+        today = day or datetime.utcnow().date()
         checkout_datetime = datetime.utcnow()
-        
-        for record in records:
-            record.check_out_time = checkout_datetime
-            record.status = AttendanceStatus.COMPLETED.value
-            processed_count += 1
-        
+        rooms = self._eligible_rooms(LocationSetting.checkout_time, room_ids)
+        
+        attendance = Attendance.__table__
+        updated = update(attendance).where(
+            attendance.c.day == today,
+            attendance.c.status == AttendanceStatus.PRESENT.value,
+            attendance.c.check_out_time.is_(None),
+            attendance.c.room_id.in_(rooms)
+        ).values(
+            check_out_time=checkout_datetime,
+            status=AttendanceStatus.COMPLETED.value,
+            updated_at=func.now()
+        ).returning(attendance.c.room_id).cte("updated")
+        
+        counts = self._count_by_room(rooms, updated)
         self.db.commit()
+        get_attendance_counters().invalidate(today)
         
-        return {"processed": processed_count}
+        return {room_id: {"processed": processed} for room_id, (processed,) in counts.items()}
     
-    def process_auto_absent(self, room_id: str, attendance_end_time_str: str) -> Dict[str, int]:
+    def process_auto_absent(
+        self, room_ids: Optional[List[str]] = None, day: Optional[date_type] = None
+    ) -> Dict[str, Dict[str, int]]:
         """
         자동 결석 처리 (출석 마감 시간 이후)
-        해당일 야자 출석 대상이지만 check_in_time이 null인 모든 학생을 '결석'으로 처리
+        출석 마감 시간이 설정된 모든 정독실(room_ids를 주면 그 중 해당 정독실)에 대해
+        - 당일 기록 중 check_in_time이 null인 레코드를 '결석'으로 변경
+        - 야자 명단(night_study_roster)에 있지만 당일 기록이 없는 학생은 '결석' 기록 생성
+        
+        UPDATE ... RETURNING과 명단 기반 INSERT ... SELECT를 한 문장에서 실행합니다.
+        
+        Args:
+            day: 처리할 날짜 (스케줄러 시간대 기준 실행일, None이면 UTC 오늘)
         
         Returns:
-            처리된 레코드 수를 담은 딕셔너리
+            정독실별 처리 수 ({room_id: {"processed": 전체, "updated": 변경, "inserted": 생성}})
         """
-        from datetime import time
-        
-        # attendance_end_time_str을 time 객체로 파싱 (예: "19:10" -> time(19, 10))
-        try:
-            hour, minute = map(int, attendance_end_time_str.split(":"))
-            end_time = time(hour, minute)
-        except:
-            return {"processed": 0, "error": "Invalid attendance_end_time format"}
-        
-        # 오늘 날짜
-        today = datetime.utcnow().date()
-        
-        # 해당 room_id에 대해 오늘 날짜의 출석 기록 중 check_in_time이 null인 레코드 조회
-        records = self.db.query(Attendance).filter(
-            and_(
-                Attendance.room_id == room_id,
-                func.date(Attendance.date) == today,
-                Attendance.check_in_time.is_(None)
+        today = day or datetime.utcnow().date()
+        now = datetime.utcnow()
+        rooms = self._eligible_rooms(LocationSetting.attendance_end_time, room_ids)
+        
+        attendance = Attendance.__table__
+        updated = update(attendance).where(
+            attendance.c.day == today,
+            attendance.c.check_in_time.is_(None),
+            attendance.c.status != AttendanceStatus.ABSENT.value,
+            attendance.c.room_id.in_(rooms)
+        ).values(
+            status=AttendanceStatus.ABSENT.value,
+            updated_at=func.now()
+        ).returning(attendance.c.room_id).cte("updated")
+        
+        # 명단에 있지만 스캔하지 않은 학생 (담임교사 = students.user_id, 스캔 경로와 동일)
+        missing = select(
+            NightStudyRoster.student_id,
+            Student.user_id,
+            literal(now, DateTime(timezone=True)),
+            literal(today, Date),
+            literal(AttendanceStatus.ABSENT.value),
+            NightStudyRoster.room_id,
+            literal(False)
+        ).join(Student, Student.id == NightStudyRoster.student_id).where(
+            NightStudyRoster.room_id.in_(rooms),
+            Student.user_id.isnot(None),
+            ~exists().where(
+                attendance.c.student_id == NightStudyRoster.student_id,
+                attendance.c.day == today,
+                attendance.c.room_id == NightStudyRoster.room_id
             )
-        ).all()
-        
-        processed_count = 0
-        
-        for record in records:
-            record.status = AttendanceStatus.ABSENT.value
-            processed_count += 1
-        
+        )
+        inserted = pg_insert(attendance).from_select(
+            ["student_id", "teacher_id", "date", "day", "status", "room_id", "is_fraud_detected"],
+            missing
+        ).on_conflict_do_nothing(
+            index_elements=["student_id", "day", "room_id"]
+        ).returning(attendance.c.room_id).cte("inserted")
+        
+        counts = self._count_by_room(rooms, updated, inserted)
         self.db.commit()
+        get_attendance_counters().invalidate(today)
         
-        return {"processed": processed_count}
\ No newline at end of file
+        return {
+            room_id: {"processed": n_updated + n_inserted, "updated": n_updated, "inserted": n_inserted}
+            for room_id, (n_updated, n_inserted) in counts.items()
+        }
+    
+    def get_roster(self, room_id: str) -> List[int]:
+        """야자 참여 학생 명단 조회"""
+        rows = self.db.query(NightStudyRoster.student_id).filter(
+            NightStudyRoster.room_id == room_id
+        ).order_by(NightStudyRoster.student_id).all()
+        return [row.student_id for row in rows]
+    
+    def replace_roster(self, room_id: str, student_ids: List[int]) -> List[int]:
+        """야자 참여 학생 명단 전체 교체"""
+        student_ids = sorted(set(student_ids))
+        self.db.query(NightStudyRoster).filter(
+            NightStudyRoster.room_id == room_id,
+            NightStudyRoster.student_id.notin_(student_ids)
+        ).delete(synchronize_session=False)
+        if student_ids:
+            self.db.execute(
+                pg_insert(NightStudyRoster).values(
+                    [{"room_id": room_id, "student_id": student_id} for student_id in student_ids]
+                ).on_conflict_do_nothing()
+            )
+        self.db.commit()
+        return student_ids
@@ -1,8 +1,8 @@
 # 출석 유효성 검증 서비스 (명세서 F-03)
 from typing import Dict, Any, Optional, Tuple
-from datetime import datetime, time
+from datetime import datetime
 from math import radians, sin, cos, sqrt, atan2
-from app.models.attendance import LocationSetting
+from app.services.room_policy_cache import RoomPolicy, get_room_policy_cache
 from sqlalchemy.orm import Session
 
 class AttendanceValidationService:
@@ -10,6 +10,11 @@ class AttendanceValidationService:
     
     def __init__(self, db: Session):
         self.db = db
+        self.policy_cache = get_room_policy_cache()
+    
+    def get_room_policy(self, room_id: str) -> Optional[RoomPolicy]:
+        """정독실 정책 조회 (캐시 적중 시 DB 조회 없음)"""
+        return self.policy_cache.get(self.db, room_id)
     
     def calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """
@@ -34,6 +39,14 @@ class AttendanceValidationService:
         
         return distance
     
+    def distance_to_room(self, latitude: float, longitude: float, policy: RoomPolicy) -> float:
+        """정독실까지 거리 (calculate_distance와 같은 식, 정독실 좌표 쪽 값은 정책에서 사용)"""
+        R = 6371000
+        delta_lat = radians(policy.latitude - latitude)
+        delta_lon = radians(policy.longitude - longitude)
+        a = sin(delta_lat / 2) ** 2 + cos(radians(latitude)) * policy.cos_latitude * sin(delta_lon / 2) ** 2
+        return R * 2 * atan2(sqrt(a), sqrt(1 - a))
+    
     def validate_token(self, token_payload: Optional[Dict[str, Any]]) -> Tuple[bool, Optional[str]]:
         """
         토큰 검증 (명세서 F-03 - 3.1)
@@ -69,12 +82,10 @@ class AttendanceValidationService:
         Returns:
             (검증 성공 여부, 실패 원인)
         """
-        # 위치 설정 조회
-        location_setting = self.db.query(LocationSetting).filter(
-            LocationSetting.room_id == room_id
-        ).first()
+        # 위치 정책 조회
+        policy = self.get_room_policy(room_id)
         
-        if not location_setting:
+        if not policy:
             return False, "정독실 위치 설정을 찾을 수 없습니다"
         
         # GPS 검증
@@ -84,29 +95,24 @@ class AttendanceValidationService:
         if gps_latitude is None or gps_longitude is None:
             return False, "GPS 좌표가 제공되지 않았습니다"
         
-        # GPS 거리 계산
-        distance = self.calculate_distance(
-            float(gps_latitude),
-            float(gps_longitude),
-            float(location_setting.latitude),
-            float(location_setting.longitude)
-        )
+        # GPS 거리 계산 (정독실 좌표 쪽 상수는 정책에 미리 계산됨)
+        distance = self.distance_to_room(float(gps_latitude), float(gps_longitude), policy)
         
-        if distance > location_setting.radius_m:
-            return False, f"정독실 위치에서 벗어났습니다 (거리: {distance:.1f}m, 허용: {location_setting.radius_m}m)"
+        if distance > policy.radius_m:
+            return False, f"정독실 위치에서 벗어났습니다 (거리: {distance:.1f}m, 허용: {policy.radius_m}m)"
         
         # Wi-Fi 검증
         wifi_bssids = location_data.get("wifi", {}).get("bssids", [])
         if not wifi_bssids:
             return False, "Wi-Fi 정보가 제공되지 않았습니다"
         
-        allowed_bssids = location_setting.allowed_wifi_bssid or []
+        allowed_bssids = policy.allowed_bssids
         if not allowed_bssids:
             # Wi-Fi 검증이 설정되지 않았으면 GPS만으로 판단
             return True, None
         
         # 허용된 Wi-Fi AP 중 하나라도 포함되어 있는지 확인
-        wifi_match = any(bssid in allowed_bssids for bssid in wifi_bssids)
+        wifi_match = not allowed_bssids.isdisjoint(wifi_bssids)
         if not wifi_match:
             return False, "정독실 Wi-Fi에 연결되어 있지 않습니다"
         
@@ -143,50 +149,29 @@ class AttendanceValidationService:
         Returns:
             (검증 성공 여부, 실패 원인, 상태(정상/지각))
         """
-        # 위치 설정 조회
-        location_setting = self.db.query(LocationSetting).filter(
-            LocationSetting.room_id == room_id
-        ).first()
+        # 위치 정책 조회
+        policy = self.get_room_policy(room_id)
         
-        if not location_setting:
+        if not policy:
             return False, "정독실 위치 설정을 찾을 수 없습니다", None
         
-        # 출석 가능 시간 확인
-        start_time_str = location_setting.attendance_start_time
-        end_time_str = location_setting.attendance_end_time
-        late_threshold_str = location_setting.late_threshold_time
-        
-        if not start_time_str or not end_time_str:
+        if not policy.attendance_start_time_str or not policy.attendance_end_time_str:
             # 시간 제한이 설정되지 않았으면 항상 통과
             return True, None, "present"
         
-        # 시간 파싱
-        try:
-            start_hour, start_minute = map(int, start_time_str.split(":"))
-            end_hour, end_minute = map(int, end_time_str.split(":"))
-            
-            scan_time_only = scan_time.time()
-            start_time = time(start_hour, start_minute)
-            end_time = time(end_hour, end_minute)
-            
-            # 출석 가능 시간 범위 확인
-            if scan_time_only < start_time or scan_time_only > end_time:
-                return False, f"출석 가능 시간이 아닙니다 ({start_time_str} ~ {end_time_str})", None
-            
-            # 지각 여부 확인
-            if late_threshold_str:
-                late_hour, late_minute = map(int, late_threshold_str.split(":"))
-                late_threshold = time(late_hour, late_minute)
-                
-                if scan_time_only > late_threshold:
-                    return True, None, "late"  # 지각
-                else:
-                    return True, None, "present"  # 정상
-            else:
-                return True, None, "present"
-        
-        except (ValueError, AttributeError) as e:
-            return False, f"시간 설정 오류: {str(e)}", None
+        if policy.time_error:
+            return False, policy.time_error, None
+        
+        scan_time_only = scan_time.time()
+        
+        # 출석 가능 시간 범위 확인
+        if scan_time_only < policy.attendance_start_time or scan_time_only > policy.attendance_end_time:
+            return False, f"출석 가능 시간이 아닙니다 ({policy.attendance_start_time_str} ~ {policy.attendance_end_time_str})", None
+        
+        # 지각 여부 확인
+        if policy.late_threshold_time and scan_time_only > policy.late_threshold_time:
+            return True, None, "late"  # 지각
+        return True, None, "present"  # 정상
     
     def validate_all(
         self,
@@ -0,0 +1,398 @@
+# 시간표 자동 배정 백그라운드 작업 (별도 프로세스에서 풀고 진행 상황/결과를 DB에 기록)
+from datetime import datetime, timedelta, timezone
+from queue import Empty
+from typing import Any, Dict, List, Optional
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.existing_db import AutoScheduleJob, LectureBlock, ScheduleMetadata
+from app.services.occupancy import group_resources
+from app.services.schedule_occupancy_cache import get_schedule_occupancy_cache
+from app.services.schedule_problem import SchedulingProblem, load_scheduling_problem
+from app.services.scheduler import AutoScheduler, SchedulingError
+
+logger = logging.getLogger(__name__)
+
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+APPLIED = "applied"
+
+# 진행 상황 DB 기록 및 다른 워커의 취소 요청 확인 주기 (초)
+PROGRESS_WRITE_SECONDS = 1.0
+# 제한 시간 + 이 시간이 지나도 끝나지 않으면 프로세스 강제 종료 (프로세스 시작/결과 전달 여유)
+PROCESS_GRACE_SECONDS = 15
+# 실행 중 상태로 이 시간 이상 남은 작업은 워커가 죽은 것으로 보고 실패 처리
+STALE_JOB_SECONDS = 60
+
+
+class AutoScheduleJobError(Exception):
+    """작업 요청을 처리할 수 없음 (status_code는 API 응답 코드)"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _placement(block) -> Dict[str, Any]:
+    return {"group_id": block.group_id, "day": block.day, "period": block.period, "room_id": block.room_id}
+
+
+def _solve_in_process(problem: SchedulingProblem, engine: str, time_limit: float, queue):
+    """(자식 프로세스) 자동 배정 실행 후 ("progress" | "result", 내용)을 queue로 전달"""
+    scheduler = AutoScheduler(
+        None, problem.schedule_id, 0, engine=engine, time_limit=time_limit,
+        progress=lambda progress: queue.put(("progress", progress))
+    )
+    try:
+        blocks = scheduler.solve_problem(problem)
+        queue.put(("result", {
+            "status": SUCCEEDED,
+            "placements": [_placement(b) for b in blocks],
+            "stats": scheduler.stats,
+        }))
+    except SchedulingError as e:
+        partial = scheduler.result.placements if scheduler.result is not None else scheduler.created_blocks
+        queue.put(("result", {
+            "status": FAILED,
+            "error": str(e),
+            "unplaced_groups": e.unplaced,
+            "blocked_groups": e.blocked,
+            "partial_placements": [_placement(p) for p in partial],
+            "stats": scheduler.stats,
+        }))
+    except Exception as e:
+        queue.put(("result", {"status": FAILED, "error": str(e)}))
+
+
+class AutoScheduleJobService:
+    """
+    자동 배정 작업 실행기 (워커 프로세스마다 하나)
+
+    작업마다 spawn 프로세스에서 AutoScheduler를 제한 시간 안에 실행하고,
+    감시 스레드가 진행 상황을 auto_schedule_jobs에 기록합니다.
+    상태 조회/취소 요청/결과 적용은 DB를 통하므로 어느 워커에서든 가능하며,
+    취소 요청은 작업을 실행 중인 워커가 다음 확인 주기에 프로세스를 종료해 처리합니다.
+    """
+
+    def __init__(self):
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: Dict[int, Any] = {}
+        self._reserved = 0  # 등록 중인 작업 수 (프로세스 시작 전 동시 요청이 상한을 넘지 않도록)
+        self._cancel_events: Dict[int, threading.Event] = {}
+        self._monitors: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    def get(self, db: Session, job_id: int, user_id: int) -> AutoScheduleJob:
+        job = db.query(AutoScheduleJob).filter(
+            AutoScheduleJob.id == job_id, AutoScheduleJob.user_id == user_id
+        ).first()
+        if job is None:
+            raise AutoScheduleJobError("자동 배정 작업을 찾을 수 없습니다.", 404)
+        return job
+
+    def submit(
+        self,
+        db: Session,
+        schedule_id: int,
+        user_id: int,
+        engine: str = "mrv",
+        time_limit: Optional[float] = None
+    ) -> AutoScheduleJob:
+        """작업 등록 후 바로 반환 (풀이는 별도 프로세스에서 진행)"""
+        if engine not in AutoScheduler.ENGINES:
+            raise AutoScheduleJobError(f"지원하지 않는 배정 엔진입니다: {engine}")
+        time_limit = min(
+            time_limit or settings.AUTO_SCHEDULE_TIME_LIMIT_SECONDS or settings.AUTO_SCHEDULE_JOB_MAX_SECONDS,
+            settings.AUTO_SCHEDULE_JOB_MAX_SECONDS
+        )
+        # 워커 내 동시 작업 수 자리를 먼저 예약 (프로세스 등록 또는 실패 시 해제)
+        with self._lock:
+            if self._stopping:
+                raise AutoScheduleJobError("서버가 종료 중입니다.", 503)
+            if len(self._processes) + self._reserved >= settings.AUTO_SCHEDULE_MAX_JOBS:
+                raise AutoScheduleJobError("실행 중인 자동 배정 작업이 많습니다. 잠시 후 다시 시도하세요.", 429)
+            self._reserved += 1
+        try:
+            return self._start(db, schedule_id, user_id, engine, time_limit)
+        finally:
+            with self._lock:
+                self._reserved -= 1
+
+    def _start(self, db: Session, schedule_id: int, user_id: int, engine: str, time_limit: float) -> AutoScheduleJob:
+        # 실행 중 작업 확인과 작업 등록 사이에 다른 요청(다른 워커 포함)이 끼어들지 않도록 시간표 행을 잠금 (commit 시 해제)
+        schedule = db.query(ScheduleMetadata.id).filter(ScheduleMetadata.id == schedule_id).with_for_update().first()
+        if schedule is None:
+            db.rollback()
+            raise AutoScheduleJobError("시간표를 찾을 수 없습니다.", 404)
+        self._expire_stale_jobs(db, schedule_id)
+        active = db.query(AutoScheduleJob.id).filter(
+            AutoScheduleJob.schedule_id == schedule_id, AutoScheduleJob.status == RUNNING
+        ).first()
+        if active:
+            db.rollback()
+            raise AutoScheduleJobError(f"이 시간표의 자동 배정 작업({active.id})이 이미 실행 중입니다.", 409)
+
+        # 입력은 요청 스레드에서 미리 읽어 자식 프로세스는 DB에 접근하지 않음
+        problem = load_scheduling_problem(db, schedule_id, user_id)
+        job = AutoScheduleJob(
+            schedule_id=schedule_id,
+            user_id=user_id,
+            engine=engine,
+            status=RUNNING,
+            time_limit_seconds=time_limit,
+            total_blocks=problem.blocks_needed,
+            progress={"placed": 0, "best_placed": 0, "total": problem.blocks_needed, "nodes": 0},
+            cancel_requested=False,
+            worker=self.worker,
+            started_at=datetime.now(timezone.utc),
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        queue = self._context.Queue()
+        process = self._context.Process(
+            target=_solve_in_process,
+            args=(problem, engine, time_limit, queue),
+            name=f"auto-schedule-{job.id}",
+            # portfolio 엔진은 자식 프로세스를 만들므로 daemon이 아니어야 함 (종료 시 shutdown에서 정리)
+            daemon=engine != "portfolio"
+        )
+        process.start()
+        monitor = threading.Thread(
+            target=self._monitor,
+            args=(job.id, process, queue, time_limit),
+            name=f"auto-schedule-monitor-{job.id}",
+            daemon=True
+        )
+        with self._lock:
+            self._processes[job.id] = process
+            self._cancel_events[job.id] = threading.Event()
+            self._monitors = [t for t in self._monitors if t.is_alive()] + [monitor]
+        monitor.start()
+        logger.info(f"자동 배정 작업 시작: {job.id} (시간표 {schedule_id}, 블록 {problem.blocks_needed}개, 제한 {time_limit}초)")
+        return job
+
+    def cancel(self, db: Session, job: AutoScheduleJob) -> AutoScheduleJob:
+        """취소 요청 (이 워커에서 실행 중이면 바로 종료, 아니면 실행 중인 워커가 처리)"""
+        if job.status != RUNNING:
+            raise AutoScheduleJobError(f"실행 중인 작업이 아닙니다 (상태: {job.status}).", 409)
+        job.cancel_requested = True
+        db.commit()
+        with self._lock:
+            event = self._cancel_events.get(job.id)
+        if event is not None:
+            event.set()
+        db.refresh(job)
+        return job
+
+    def apply(self, db: Session, job: AutoScheduleJob) -> List[LectureBlock]:
+        """
+        성공한 작업 결과를 LectureBlock으로 저장 (한 트랜잭션)
+        작업 이후 시간표가 바뀌어 결과가 현재 블록/불가 시간과 겹치면 아무것도 저장하지 않음
+        """
+        # 같은 시간표에 동시에 적용하지 않도록 시간표 행과 작업 행을 잠금
+        db.query(ScheduleMetadata.id).filter(ScheduleMetadata.id == job.schedule_id).with_for_update().first()
+        job = db.query(AutoScheduleJob).filter(AutoScheduleJob.id == job.id).with_for_update().populate_existing().one()
+        if job.status != SUCCEEDED:
+            db.rollback()
+            raise AutoScheduleJobError(f"적용할 수 있는 결과가 없습니다 (상태: {job.status}).", 409)
+
+        problem = load_scheduling_problem(db, job.schedule_id, job.user_id)
+        occupancy = problem.build_occupancy()
+        groups = {g.id: g for g in problem.groups}
+        remaining = {g.id: g.blocks_needed for g in problem.groups}
+        conflicts = 0
+        blocks = []
+        for p in (job.result or {}).get("placements", []):
+            group = groups.get(p["group_id"])
+            if group is None or remaining[group.id] <= 0:
+                conflicts += 1
+                continue
+            resources = group_resources(group.teacher_id, group.grade, group.class_num, p["room_id"])
+            if not occupancy.is_free(resources, p["day"], p["period"]):
+                conflicts += 1
+                continue
+            occupancy.occupy(resources, p["day"], p["period"])
+            remaining[group.id] -= 1
+            blocks.append(LectureBlock(
+                group_id=group.id, day=p["day"], period=p["period"], room_id=p["room_id"], is_fixed=False
+            ))
+        if conflicts:
+            db.rollback()
+            raise AutoScheduleJobError(
+                f"작업 이후 시간표가 변경되어 {conflicts}개 블록을 배정할 수 없습니다. 자동 배정을 다시 실행하세요.", 409
+            )
+
+        db.add_all(blocks)
+        job.status = APPLIED
+        cache = get_schedule_occupancy_cache()
+        cache.notify_change(db, job.schedule_id)
+        try:
+            db.commit()
+        except IntegrityError:
+            # 다른 시간표가 검사 이후 같은 특별실 칸을 차지한 경우 (특별실 칸은 전체 시간표에서 하나뿐)
+            db.rollback()
+            raise AutoScheduleJobError(
+                "작업 이후 다른 시간표가 같은 특별실 시간을 사용해 결과를 적용할 수 없습니다. 자동 배정을 다시 실행하세요.", 409
+            )
+        cache.invalidate(job.schedule_id)
+        for block in blocks:
+            db.refresh(block)
+        logger.info(f"자동 배정 작업 결과 적용: {job.id} (블록 {len(blocks)}개)")
+        return blocks
+
+    def shutdown(self):
+        """실행 중인 작업 프로세스 종료 (감시 스레드가 실패로 기록)"""
+        with self._lock:
+            self._stopping = True
+            processes = list(self._processes.values())
+            monitors = list(self._monitors)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for monitor in monitors:
+            monitor.join(timeout=5)
+
+    def _expire_stale_jobs(self, db: Session, schedule_id: int):
+        """워커가 죽어 실행 중 상태로 남은 작업을 실패 처리"""
+        now = datetime.now(timezone.utc)
+        for job in db.query(AutoScheduleJob).filter(
+            AutoScheduleJob.schedule_id == schedule_id, AutoScheduleJob.status == RUNNING
+        ).all():
+            limit = (job.time_limit_seconds or 0) + settings.AUTO_SCHEDULE_OPTIMIZE_SECONDS + PROCESS_GRACE_SECONDS + STALE_JOB_SECONDS
+            started_at = job.started_at
+            if started_at and started_at.tzinfo is None:
+                started_at = started_at.replace(tzinfo=timezone.utc)
+            if started_at and started_at + timedelta(seconds=limit) < now:
+                job.status = FAILED
+                job.error = "작업을 실행하던 워커가 응답하지 않아 중단되었습니다."
+                job.finished_at = now
+        # 호출한 쪽의 작업 등록과 함께 commit (시간표 행 잠금 유지)
+        db.flush()
+
+    def _monitor(self, job_id: int, process, queue, time_limit: float):
+        """자식 프로세스의 진행 상황을 기록하고, 취소/시간 초과 시 프로세스 종료"""
+        # 탐색 제한 시간 + 소프트 제약 최적화 시간 + 여유
+        deadline = time.monotonic() + time_limit + settings.AUTO_SCHEDULE_OPTIMIZE_SECONDS + PROCESS_GRACE_SECONDS
+        with self._lock:
+            cancel_event = self._cancel_events[job_id]
+        progress = None
+        outcome = None
+        next_write = time.monotonic() + PROGRESS_WRITE_SECONDS
+        try:
+            while outcome is None:
+                try:
+                    kind, payload = queue.get(timeout=0.2)
+                    if kind == "result":
+                        outcome = payload
+                        break
+                    progress = payload
+                except Empty:
+                    if not process.is_alive():
+                        try:
+                            # 결과를 보낸 직후 종료된 경우
+                            kind, payload = queue.get(timeout=1)
+                            outcome = payload if kind == "result" else None
+                        except Empty:
+                            pass
+                        if outcome is None:
+                            reason = "서버 종료로 중단되었습니다." if self._stopping else \
+                                f"자동 배정 프로세스가 비정상 종료되었습니다 (exit code {process.exitcode})."
+                            outcome = {"status": FAILED, "error": reason}
+                        break
+
+                if cancel_event.is_set():
+                    outcome = {"status": CANCELLED}
+                    break
+                now = time.monotonic()
+                if now > deadline:
+                    outcome = {"status": FAILED, "error": "제한 시간을 넘겨 자동 배정 프로세스를 종료했습니다."}
+                    break
+                if now >= next_write:
+                    next_write = now + PROGRESS_WRITE_SECONDS
+                    if self._write_progress(job_id, progress):
+                        outcome = {"status": CANCELLED}
+                        break
+        except Exception as e:
+            logger.error(f"자동 배정 작업 감시 중 오류 발생 ({job_id}): {str(e)}")
+            outcome = {"status": FAILED, "error": str(e)}
+        finally:
+            if process.is_alive():
+                process.terminate()
+            process.join(timeout=5)
+            with self._lock:
+                self._processes.pop(job_id, None)
+                self._cancel_events.pop(job_id, None)
+            self._finish(job_id, outcome, progress)
+
+    def _write_progress(self, job_id: int, progress: Optional[Dict[str, Any]]) -> bool:
+        """진행 상황 기록 후 취소 요청 여부 반환"""
+        db = SessionLocal()
+        try:
+            job = db.query(AutoScheduleJob).filter(AutoScheduleJob.id == job_id).first()
+            if job is None:
+                return True
+            if progress is not None:
+                job.progress = progress
+            db.commit()
+            return bool(job.cancel_requested)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"자동 배정 진행 상황 기록 실패 ({job_id}): {str(e)}")
+            return False
+        finally:
+            db.close()
+
+    def _finish(self, job_id: int, outcome: Dict[str, Any], progress: Optional[Dict[str, Any]]):
+        db = SessionLocal()
+        try:
+            job = db.query(AutoScheduleJob).filter(AutoScheduleJob.id == job_id).first()
+            if job is None:
+                return
+            job.status = outcome["status"]
+            job.error = outcome.get("error")
+            job.result = {k: v for k, v in outcome.items() if k not in ("status", "error")} or None
+            if job.status == SUCCEEDED:
+                placed = len(outcome["placements"])
+                job.progress = {
+                    **(progress or job.progress or {}),
+                    "placed": placed,
+                    "best_placed": placed,
+                    "nodes": outcome.get("stats", {}).get("nodes"),
+                }
+            elif progress is not None:
+                job.progress = progress
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+            logger.info(f"자동 배정 작업 종료: {job_id} ({job.status})")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"자동 배정 작업 결과 기록 실패 ({job_id}): {str(e)}")
+        finally:
+            db.close()
+
+
+# 전역 자동 배정 작업 서비스 인스턴스
+auto_schedule_job_service = None
+
+
+def get_auto_schedule_job_service() -> AutoScheduleJobService:
+    """자동 배정 작업 서비스 인스턴스 가져오기 (싱글톤)"""
+    global auto_schedule_job_service
+    if auto_schedule_job_service is None:
+        auto_schedule_job_service = AutoScheduleJobService()
+    return auto_schedule_job_service
@@ -1,9 +1,8 @@
 # 배치 작업 서비스 (야자 출석 자동 처리)
 from sqlalchemy.orm import Session
-from datetime import datetime, time as time_type
-from typing import Dict, Any
+from datetime import datetime, date
+from typing import Dict, Any, Optional
 from app.services.attendance_service import AttendanceService
-from app.models.attendance import LocationSetting
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,85 +15,37 @@ class BatchService:
         self.db = db
         self.attendance_service = AttendanceService(db)
     
-    def process_night_study_checkout(self, room_id: str = None) -> Dict[str, Any]:
+    def process_night_study_checkout(self, room_id: str = None, day: Optional[date] = None) -> Dict[str, Any]:
         """
         야자 자동 퇴실 처리 (야자 종료 시간 도달 시)
+        모든 야자 장소를 한 번의 UPDATE 문으로 처리
         
         Args:
             room_id: 특정 room_id만 처리할 경우, None이면 모든 야자 장소 처리
+            day: 처리할 날짜 (None이면 UTC 오늘)
         
         Returns:
-            처리 결과 딕셔너리
+            처리 결과 딕셔너리 ({room_id: {"processed": n}})
         """
-        results = {}
-        
-        if room_id:
-            # 특정 room_id만 처리
-            location_setting = self.db.query(LocationSetting).filter(
-                LocationSetting.room_id == room_id
-            ).first()
-            
-            if location_setting and location_setting.checkout_time:
-                result = self.attendance_service.process_auto_checkout(
-                    room_id=room_id,
-                    checkout_time_str=location_setting.checkout_time
-                )
-                results[room_id] = result
-        else:
-            # 모든 야자 장소 처리
-            location_settings = self.db.query(LocationSetting).filter(
-                LocationSetting.checkout_time.isnot(None)
-            ).all()
-            
-            for location_setting in location_settings:
-                if location_setting.checkout_time:
-                    result = self.attendance_service.process_auto_checkout(
-                        room_id=location_setting.room_id,
-                        checkout_time_str=location_setting.checkout_time
-                    )
-                    results[location_setting.room_id] = result
-        
-        return results
+        return self.attendance_service.process_auto_checkout(
+            room_ids=[room_id] if room_id else None, day=day
+        )
     
-    def process_night_study_absent(self, room_id: str = None) -> Dict[str, Any]:
+    def process_night_study_absent(self, room_id: str = None, day: Optional[date] = None) -> Dict[str, Any]:
         """
         야자 자동 결석 처리 (출석 마감 시간 이후)
+        모든 야자 장소를 한 번의 UPDATE + 명단 기반 INSERT 문으로 처리
         
         Args:
             room_id: 특정 room_id만 처리할 경우, None이면 모든 야자 장소 처리
+            day: 처리할 날짜 (None이면 UTC 오늘)
         
         Returns:
-            처리 결과 딕셔너리
+            처리 결과 딕셔너리 ({room_id: {"processed": n, "updated": n, "inserted": n}})
         """
-        results = {}
-        
-        if room_id:
-            # 특정 room_id만 처리
-            location_setting = self.db.query(LocationSetting).filter(
-                LocationSetting.room_id == room_id
-            ).first()
-            
-            if location_setting and location_setting.attendance_end_time:
-                result = self.attendance_service.process_auto_absent(
-                    room_id=room_id,
-                    attendance_end_time_str=location_setting.attendance_end_time
-                )
-                results[room_id] = result
-        else:
-            # 모든 야자 장소 처리
-            location_settings = self.db.query(LocationSetting).filter(
-                LocationSetting.attendance_end_time.isnot(None)
-            ).all()
-            
-            for location_setting in location_settings:
-                if location_setting.attendance_end_time:
-                    result = self.attendance_service.process_auto_absent(
-                        room_id=location_setting.room_id,
-                        attendance_end_time_str=location_setting.attendance_end_time
-                    )
-                    results[location_setting.room_id] = result
-        
-        return results
+        return self.attendance_service.process_auto_absent(
+            room_ids=[room_id] if room_id else None, day=day
+        )
     
     def run_daily_batch(self) -> Dict[str, Any]:
         """
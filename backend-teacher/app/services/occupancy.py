@@ -0,0 +1,120 @@
+"""
+Bitset occupancy of teachers, classes and rooms over a days x periods grid.
+
+Every resource has one int bitmask with bit (day_index * periods + period_index)
+set when the resource is taken at that slot. Conflict tests are a single AND,
+and the free slots of a lecture group are the complement of the OR of its
+teacher, class and room masks. Used by AutoScheduler / TimetableSolver, the
+ScheduleValidator and the drag-and-drop validation endpoint.
+"""
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+WEEK_DAYS = ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"]
+
+
+def group_resources(teacher_id, grade, class_num, room_id) -> List[Hashable]:
+    """Resources a block occupies: its teacher, its class (if any) and its room (if any)."""
+    resources: List[Hashable] = []
+    if teacher_id is not None:
+        resources.append(("teacher", teacher_id))
+    if class_num:
+        resources.append(("class", grade, class_num))
+    if room_id:
+        resources.append(("room", room_id))
+    return resources
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Indices of the set bits, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Occupancy:
+    def __init__(self, days: Sequence[str], periods: Sequence[int]):
+        self.days = list(days)
+        self.periods = list(periods)
+        self.width = len(self.periods)
+        self.slot_count = len(self.days) * self.width
+        self.full = (1 << self.slot_count) - 1
+        self._day_index = {day: i for i, day in enumerate(self.days)}
+        self._period_index = {period: i for i, period in enumerate(self.periods)}
+        self._day_masks = [((1 << self.width) - 1) << (d * self.width) for d in range(len(self.days))]
+        self.masks: Dict[Hashable, int] = {}
+
+    @classmethod
+    def covering(cls, days: Iterable[str], periods: Iterable[int]) -> "Occupancy":
+        """Grid large enough for the given days (week order) and periods (1..max)."""
+        days = set(days)
+        ordered = [d for d in WEEK_DAYS if d in days] + sorted(d for d in days if d not in WEEK_DAYS)
+        last = max(periods, default=0)
+        return cls(ordered or WEEK_DAYS[:5], range(1, max(last, 1) + 1))
+
+    def slot(self, day: str, period: int) -> Optional[int]:
+        d = self._day_index.get(day)
+        p = self._period_index.get(period)
+        if d is None or p is None:
+            return None
+        return d * self.width + p
+
+    def bit(self, day: str, period: int) -> int:
+        """Bit of a slot, 0 if the slot is outside the grid."""
+        slot = self.slot(day, period)
+        return 0 if slot is None else 1 << slot
+
+    def slot_at(self, slot: int) -> Tuple[str, int]:
+        return self.days[slot // self.width], self.periods[slot % self.width]
+
+    def day_mask(self, day: str) -> int:
+        d = self._day_index.get(day)
+        return 0 if d is None else self._day_masks[d]
+
+    def mask(self, resources: Iterable[Hashable]) -> int:
+        """Slots where any of the resources is taken."""
+        busy = 0
+        for resource in resources:
+            busy |= self.masks.get(resource, 0)
+        return busy
+
+    def free_mask(self, resources: Iterable[Hashable]) -> int:
+        """Slots where all of the resources are free."""
+        return self.full & ~self.mask(resources)
+
+    def is_free(self, resources: Iterable[Hashable], day: str, period: int) -> bool:
+        return self.is_free_bit(resources, self.bit(day, period))
+
+    def is_free_bit(self, resources: Iterable[Hashable], bit: int) -> bool:
+        masks = self.masks
+        for resource in resources:
+            if masks.get(resource, 0) & bit:
+                return False
+        return True
+
+    def conflicts(self, resources: Iterable[Hashable], day: str, period: int) -> List[Hashable]:
+        """Resources already taken at the slot."""
+        bit = self.bit(day, period)
+        return [resource for resource in resources if self.masks.get(resource, 0) & bit]
+
+    def take(self, resource: Hashable, bit: int) -> bool:
+        """Mark one resource taken; False (and no change) if it already was."""
+        current = self.masks.get(resource, 0)
+        if current & bit:
+            return False
+        self.masks[resource] = current | bit
+        return True
+
+    def occupy(self, resources: Iterable[Hashable], day: str, period: int):
+        bit = self.bit(day, period)
+        for resource in resources:
+            self.masks[resource] = self.masks.get(resource, 0) | bit
+
+    def release(self, resources: Iterable[Hashable], day: str, period: int):
+        bit = self.bit(day, period)
+        for resource in resources:
+            self.masks[resource] = self.masks.get(resource, 0) & ~bit
+
+    def count_on_day(self, resource: Hashable, day: str) -> int:
+        """Taken slots of a resource on one day."""
+        return (self.masks.get(resource, 0) & self.day_mask(day)).bit_count()
@@ -0,0 +1,90 @@
+# Postgres LISTEN/NOTIFY 수신 (여러 uvicorn 워커 간 캐시 무효화/이벤트 전달용)
+from typing import Callable, Dict, List, Optional
+import logging
+import select
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PgNotificationListener:
+    """
+    하나의 DB 연결로 여러 채널을 LISTEN하고, 알림이 오면 채널별 콜백을 호출합니다.
+    연결이 끊기면 다시 연결하며, 재연결 시 on_reconnect 콜백으로
+    그 사이 놓친 알림에 대비할 수 있게 합니다.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[[str], None]]] = {}
+        self._reconnect_handlers: List[Callable[[], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.connected = threading.Event()
+
+    def subscribe(self, channel: str, handler: Callable[[str], None], on_reconnect: Callable[[], None] = None):
+        """채널 알림 콜백 등록 (start 전에 등록해야 LISTEN 대상에 포함됨)"""
+        with self._lock:
+            self._handlers.setdefault(channel, []).append(handler)
+            if on_reconnect:
+                self._reconnect_handlers.append(on_reconnect)
+
+    def start(self, engine):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(engine,), name="pg-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, engine):
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = engine.raw_connection()
+                driver_connection = connection.driver_connection
+                driver_connection.autocommit = True
+                with driver_connection.cursor() as cursor:
+                    for channel in list(self._handlers):
+                        cursor.execute(f"LISTEN {channel}")
+                self.connected.set()
+                for handler in list(self._reconnect_handlers):
+                    handler()
+
+                while not self._stop.is_set():
+                    if select.select([driver_connection], [], [], 5) == ([], [], []):
+                        continue
+                    driver_connection.poll()
+                    notifies = list(driver_connection.notifies)
+                    driver_connection.notifies.clear()
+                    for notify in notifies:
+                        for handler in self._handlers.get(notify.channel, []):
+                            try:
+                                handler(notify.payload)
+                            except Exception as e:
+                                logger.error(f"DB 알림 처리 중 오류 발생 ({notify.channel}): {str(e)}")
+            except Exception as e:
+                logger.warning(f"DB 알림 수신 오류 (재연결 예정): {str(e)}")
+                self._stop.wait(10)
+            finally:
+                self.connected.clear()
+                if connection is not None:
+                    try:
+                        connection.invalidate()
+                    except Exception:
+                        pass
+
+
+# 전역 알림 수신기 인스턴스
+pg_listener = None
+
+
+def get_pg_listener() -> PgNotificationListener:
+    """DB 알림 수신기 인스턴스 가져오기 (싱글톤)"""
+    global pg_listener
+    if pg_listener is None:
+        pg_listener = PgNotificationListener()
+    return pg_listener
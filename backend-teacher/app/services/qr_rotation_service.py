@@ -0,0 +1,232 @@
+# 정독실 QR 코드 순환 서비스 (키오스크 화면용 토큰/이미지를 미리 서명/렌더링)
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+import base64
+import hashlib
+import logging
+import threading
+import time
+
+from app.config import settings
+from app.services.attendance_event_service import Subscription
+from app.services.qr_service import QRCodeService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class QRFrame:
+    """한 순환 주기(slot) 동안 표시할 QR 코드"""
+    room_id: str
+    slot: int
+    token: str
+    issued_at: datetime  # 표시 시작 (토큰 iat)
+    rotates_at: datetime  # 다음 QR 코드로 바뀌는 시각
+    expires_at: datetime  # 토큰 만료 (교체 후에도 스캔 중인 요청을 위해 여유 시간 포함)
+    png: bytes
+    png_base64: str
+    svg: bytes
+    etag: str
+
+    def seconds_until_rotation(self) -> int:
+        return max(0, int((self.rotates_at - datetime.now(timezone.utc)).total_seconds()))
+
+    def to_event(self, include_image: bool = True) -> Dict[str, Any]:
+        event = {
+            "type": "qr",
+            "room_id": self.room_id,
+            "token": self.token,
+            "etag": self.etag,
+            "issued_at": self.issued_at.isoformat(),
+            "rotates_at": self.rotates_at.isoformat(),
+            "expires_at": self.expires_at.isoformat(),
+        }
+        if include_image:
+            event["qr_code_image"] = self.png_base64
+        return event
+
+
+class _RoomRotation:
+    def __init__(self, room_id: str):
+        self.room_id = room_id
+        self.current: Optional[QRFrame] = None
+        self.next: Optional[QRFrame] = None
+        self.last_used = time.monotonic()
+        self.subscribers: Set[Subscription] = set()
+        self.pushed_slot: Optional[int] = None  # 구독자에게 마지막으로 보낸 slot
+
+
+class QRRotationService:
+    """
+    정독실별 QR 코드 순환
+
+    시간을 QR_ROTATION_SECONDS 단위 slot으로 나누고, slot 시작 시각을 iat로 하는 토큰을
+    다음 slot이 오기 전에 미리 서명하고 PNG/SVG로 렌더링해 둡니다.
+    요청은 메모리의 현재 이미지를 그대로 돌려주고(ETag), 교체 시각에 SSE 구독자에게 새 QR을 보냅니다.
+    같은 slot의 토큰은 페이로드가 같아 모든 워커에서 같은 토큰/ETag가 나오므로 워커 간 조율이 필요 없습니다.
+    한동안 요청/구독이 없는 정독실은 순환을 멈춥니다.
+    """
+
+    def __init__(self, qr_service: QRCodeService = None):
+        self.qr_service = qr_service or QRCodeService()
+        self.period = settings.QR_ROTATION_SECONDS
+        self.grace = settings.QR_TOKEN_GRACE_SECONDS
+        self.idle_seconds = settings.QR_IDLE_SECONDS
+        self._rooms: Dict[str, _RoomRotation] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _slot_start(self, slot: int) -> datetime:
+        return datetime.fromtimestamp(slot * self.period, tz=timezone.utc)
+
+    def _current_slot(self) -> int:
+        return int(time.time() // self.period)
+
+    def render_frame(self, room_id: str, slot: int) -> QRFrame:
+        """slot의 토큰 서명 및 이미지 렌더링"""
+        issued_at = self._slot_start(slot)
+        token_data = self.qr_service.generate_dynamic_token(
+            room_id,
+            # 토큰 페이로드는 naive UTC 기준
+            issued_at=issued_at.replace(tzinfo=None),
+            expires_in_seconds=self.period + self.grace
+        )
+        token = token_data["token"]
+        png = self.qr_service.render_qr_png(token)
+        return QRFrame(
+            room_id=room_id,
+            slot=slot,
+            token=token,
+            issued_at=issued_at,
+            rotates_at=self._slot_start(slot + 1),
+            expires_at=token_data["expires_at"].replace(tzinfo=timezone.utc),
+            png=png,
+            png_base64=base64.b64encode(png).decode(),
+            svg=self.qr_service.render_qr_svg(token),
+            etag='"' + hashlib.sha256(token.encode()).hexdigest()[:32] + '"',
+        )
+
+    def get_frame(self, room_id: str) -> QRFrame:
+        """현재 표시할 QR 코드 (미리 렌더링된 것이 있으면 렌더링 없음)"""
+        slot = self._current_slot()
+        with self._lock:
+            rotation = self._rooms.get(room_id)
+            if rotation is None:
+                rotation = self._rooms[room_id] = _RoomRotation(room_id)
+                self._wakeup.set()
+            rotation.last_used = time.monotonic()
+            frame = self._advance(rotation, slot)
+        if frame is None:
+            # 처음 요청된 정독실 (또는 순환이 멈췄던 정독실)
+            frame = self.render_frame(room_id, slot)
+            with self._lock:
+                if rotation.current is None or rotation.current.slot < slot:
+                    rotation.current = frame
+                if rotation.pushed_slot is None:
+                    # 구독자는 연결 시 현재 QR을 직접 받으므로 다음 교체부터 보냄
+                    rotation.pushed_slot = frame.slot
+        self._ensure_thread()
+        return frame
+
+    def _advance(self, rotation: _RoomRotation, slot: int) -> Optional[QRFrame]:
+        """slot이 바뀌었으면 미리 렌더링한 다음 QR로 교체 (lock 안에서 호출)"""
+        if rotation.current is not None and rotation.current.slot == slot:
+            return rotation.current
+        if rotation.next is not None and rotation.next.slot == slot:
+            rotation.current, rotation.next = rotation.next, None
+            return rotation.current
+        return None
+
+    def subscribe(self, room_id: str) -> Subscription:
+        """QR 교체 이벤트 구독 (구독 중에는 순환이 멈추지 않음)"""
+        subscription = Subscription(self, [room_id])
+        with self._lock:
+            rotation = self._rooms.get(room_id)
+            if rotation is None:
+                rotation = self._rooms[room_id] = _RoomRotation(room_id)
+                self._wakeup.set()
+            rotation.subscribers.add(subscription)
+        self._ensure_thread()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for room_id in subscription.topics:
+                rotation = self._rooms.get(room_id)
+                if rotation is not None:
+                    rotation.subscribers.discard(subscription)
+                    rotation.last_used = time.monotonic()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="qr-rotation", daemon=True)
+            self._thread.start()
+
+    def shutdown(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._rotate()
+            except Exception as e:
+                logger.error(f"QR 코드 순환 중 오류 발생: {str(e)}")
+            # 다음 slot 시작까지 대기 (새 정독실이 추가되면 바로 깨어나 미리 렌더링)
+            delay = self.period - (time.time() % self.period)
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
+
+    def _rotate(self):
+        slot = self._current_slot()
+        now = time.monotonic()
+        with self._lock:
+            for room_id in [
+                room_id for room_id, rotation in self._rooms.items()
+                if not rotation.subscribers and now - rotation.last_used > self.idle_seconds
+            ]:
+                del self._rooms[room_id]
+            rotations = list(self._rooms.values())
+
+        for rotation in rotations:
+            with self._lock:
+                frame = self._advance(rotation, slot)
+            if frame is None:
+                # 다음 QR을 미리 만들지 못한 경우 (시작 직후 등)
+                frame = self.render_frame(rotation.room_id, slot)
+                with self._lock:
+                    rotation.current = frame
+            with self._lock:
+                # 요청 처리 중에 이미 교체되었어도 구독자에게는 한 번 보냄
+                push = rotation.pushed_slot != frame.slot
+                rotation.pushed_slot = frame.slot
+                subscribers = list(rotation.subscribers) if push else []
+            if subscribers:
+                event = frame.to_event()
+                for subscription in subscribers:
+                    subscription.put(event)
+
+            if rotation.next is None or rotation.next.slot != slot + 1:
+                next_frame = self.render_frame(rotation.room_id, slot + 1)
+                with self._lock:
+                    rotation.next = next_frame
+
+
+# 전역 QR 순환 서비스 인스턴스
+qr_rotation_service = None
+
+
+def get_qr_rotation_service() -> QRRotationService:
+    """QR 순환 서비스 인스턴스 가져오기 (싱글톤)"""
+    global qr_rotation_service
+    if qr_rotation_service is None:
+        qr_rotation_service = QRRotationService()
+    return qr_rotation_service
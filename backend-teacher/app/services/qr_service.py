@@ -1,6 +1,7 @@
 # QR 코드 생성 및 검증 서비스 (명세서 F-01, F-03)
 import jwt
 import qrcode
+import qrcode.image.svg
 import io
 import base64
 from datetime import datetime, timedelta
@@ -14,19 +15,30 @@ class QRCodeService:
         self.secret_key = settings.SECRET_KEY
         self.algorithm = settings.ALGORITHM
     
-    def generate_dynamic_token(self, room_id: str, expires_in_minutes: int = 1) -> Dict[str, Any]:
+    def generate_dynamic_token(
+        self,
+        room_id: str,
+        expires_in_minutes: int = 1,
+        issued_at: Optional[datetime] = None,
+        expires_in_seconds: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         동적 인증 토큰 생성 (명세서 F-01)
         
         Args:
             room_id: 정독실 ID (R01, R02 등)
             expires_in_minutes: 토큰 유효 기간 (분, 기본값 1분)
+            issued_at: 토큰 발급 시각 (UTC, 미리 서명할 때 지정, 기본값 현재 시각)
+            expires_in_seconds: 토큰 유효 기간 (초, 지정하면 expires_in_minutes 대신 사용)
         
         Returns:
             토큰 정보 딕셔너리
         """
-        now = datetime.utcnow()
-        expires_at = now + timedelta(minutes=expires_in_minutes)
+        now = issued_at or datetime.utcnow()
+        if expires_in_seconds is not None:
+            expires_at = now + timedelta(seconds=expires_in_seconds)
+        else:
+            expires_at = now + timedelta(minutes=expires_in_minutes)
         
         # 토큰 페이로드 (명세서 예시 참고)
         payload = {
@@ -76,7 +88,10 @@ class QRCodeService:
         Returns:
             Base64 인코딩된 QR 코드 이미지 문자열
         """
-        # QR 코드 생성
+        # Base64 인코딩
+        return base64.b64encode(self.render_qr_png(token)).decode()
+    
+    def _build_qr(self, token: str) -> qrcode.QRCode:
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -85,16 +100,21 @@ class QRCodeService:
         )
         qr.add_data(token)
         qr.make(fit=True)
-        
-        # 이미지 생성
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Base64 인코딩
+        return qr
+    
+    def render_qr_png(self, token: str) -> bytes:
+        """QR 코드 PNG 이미지 생성"""
+        img = self._build_qr(token).make_image(fill_color="black", back_color="white")
         buffer = io.BytesIO()
         img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
-        
-        return img_str
+        return buffer.getvalue()
+    
+    def render_qr_svg(self, token: str) -> bytes:
+        """QR 코드 SVG 이미지 생성 (Pillow 없이 생성, 키오스크 화면 크기에 맞춰 확대 가능)"""
+        img = self._build_qr(token).make_image(image_factory=qrcode.image.svg.SvgPathImage)
+        buffer = io.BytesIO()
+        img.save(buffer)
+        return buffer.getvalue()
     
     def generate_qr_code_with_image(self, room_id: str, expires_in_minutes: int = 1) -> Dict[str, Any]:
         """
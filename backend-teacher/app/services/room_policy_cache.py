@@ -0,0 +1,157 @@
+# 정독실 출석 정책 캐시 (QR 스캔 검증 시 LocationSetting 조회 제거)
+from dataclasses import dataclass
+from datetime import time
+from math import radians, cos
+from typing import Dict, FrozenSet, Optional
+import logging
+import threading
+import time as time_module
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.attendance import LocationSetting
+from app.services.pg_listener import PgNotificationListener
+
+logger = logging.getLogger(__name__)
+
+# 위치 설정 변경 알림 채널 (다른 워커 프로세스의 캐시 무효화용)
+ROOM_POLICY_CHANNEL = "location_settings_changed"
+
+
+def parse_hhmm(value: str) -> time:
+    """'HH:MM' 문자열을 time으로 변환"""
+    hour, minute = map(int, value.split(":"))
+    return time(hour, minute)
+
+
+@dataclass(frozen=True)
+class RoomPolicy:
+    """LocationSetting을 검증에 바로 쓸 수 있도록 미리 변환한 정책"""
+    room_id: str
+    latitude: float
+    longitude: float
+    radius_m: float
+    # Haversine 계산에서 정독실 좌표 쪽 상수
+    latitude_rad: float
+    cos_latitude: float
+    allowed_bssids: FrozenSet[str]
+    # 출석 가능 시간 (원본 문자열은 오류 메시지용)
+    attendance_start_time_str: Optional[str]
+    attendance_end_time_str: Optional[str]
+    attendance_start_time: Optional[time]
+    attendance_end_time: Optional[time]
+    late_threshold_time: Optional[time]
+    checkout_time: Optional[time]
+    time_error: Optional[str] = None  # 시간 설정 파싱 오류
+
+    @classmethod
+    def from_setting(cls, setting: LocationSetting) -> "RoomPolicy":
+        start_str = setting.attendance_start_time
+        end_str = setting.attendance_end_time
+        start = end = late = None
+        time_error = None
+        if start_str and end_str:
+            try:
+                start = parse_hhmm(start_str)
+                end = parse_hhmm(end_str)
+                if setting.late_threshold_time:
+                    late = parse_hhmm(setting.late_threshold_time)
+            except (ValueError, AttributeError) as e:
+                time_error = f"시간 설정 오류: {str(e)}"
+
+        try:
+            checkout = parse_hhmm(setting.checkout_time) if setting.checkout_time else None
+        except (ValueError, AttributeError):
+            checkout = None
+
+        latitude = float(setting.latitude)
+        return cls(
+            room_id=setting.room_id,
+            latitude=latitude,
+            longitude=float(setting.longitude),
+            radius_m=setting.radius_m,
+            latitude_rad=radians(latitude),
+            cos_latitude=cos(radians(latitude)),
+            allowed_bssids=frozenset(setting.allowed_wifi_bssid or []),
+            attendance_start_time_str=start_str,
+            attendance_end_time_str=end_str,
+            attendance_start_time=start,
+            attendance_end_time=end,
+            late_threshold_time=late,
+            checkout_time=checkout,
+            time_error=time_error,
+        )
+
+
+class RoomPolicyCache:
+    """
+    프로세스 전역 정독실 정책 캐시
+
+    위치 설정은 거의 바뀌지 않으므로 전체를 한 번에 읽어 두고,
+    생성/수정 시 invalidate()로 비웁니다. 다른 워커 프로세스에는
+    Postgres NOTIFY로 알리고, 알림을 놓친 경우를 대비해 TTL이 지나면 다시 읽습니다.
+    """
+
+    def __init__(self, ttl_seconds: int = None):
+        self.ttl = ttl_seconds if ttl_seconds is not None else settings.ROOM_POLICY_CACHE_TTL
+        self._policies: Dict[str, RoomPolicy] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, room_id: str) -> Optional[RoomPolicy]:
+        """정독실 정책 조회 (캐시가 유효하면 DB 조회 없음)"""
+        policies = self._policies
+        loaded_at = self._loaded_at
+        if loaded_at is None or time_module.monotonic() - loaded_at > self.ttl:
+            policies = self._load(db)
+        return policies.get(room_id)
+
+    def _load(self, db: Session) -> Dict[str, RoomPolicy]:
+        with self._lock:
+            # 다른 스레드가 먼저 채웠으면 그대로 사용
+            if self._loaded_at is not None and time_module.monotonic() - self._loaded_at <= self.ttl:
+                return self._policies
+            policies = {
+                setting.room_id: RoomPolicy.from_setting(setting)
+                for setting in db.query(LocationSetting).all()
+            }
+            self._policies = policies
+            self._loaded_at = time_module.monotonic()
+            return policies
+
+    def invalidate(self):
+        """다음 조회 때 다시 읽도록 캐시를 비움"""
+        with self._lock:
+            self._loaded_at = None
+
+    def notify_change(self, db: Session, room_id: str):
+        """
+        위치 설정 변경을 다른 워커에 알림
+        commit 전에 호출하면 트랜잭션이 commit될 때 함께 전달됩니다.
+        (현재 프로세스의 캐시는 commit 후 invalidate()로 비움)
+        """
+        try:
+            db.execute(text("SELECT pg_notify(:channel, :room_id)"),
+                       {"channel": ROOM_POLICY_CHANNEL, "room_id": room_id})
+        except Exception as e:
+            # 알림 실패 시 다른 워커는 TTL 만료 후 갱신
+            logger.warning(f"위치 설정 변경 알림 실패: {str(e)}")
+
+    def register(self, listener: PgNotificationListener):
+        """다른 워커의 변경 알림을 받으면 캐시를 비우도록 등록"""
+        # 재연결 사이에 놓친 알림이 있을 수 있으므로 재연결 시에도 비움
+        listener.subscribe(ROOM_POLICY_CHANNEL, lambda room_id: self.invalidate(), on_reconnect=self.invalidate)
+
+
+# 전역 정책 캐시 인스턴스
+room_policy_cache = None
+
+
+def get_room_policy_cache() -> RoomPolicyCache:
+    """정독실 정책 캐시 인스턴스 가져오기 (싱글톤)"""
+    global room_policy_cache
+    if room_policy_cache is None:
+        room_policy_cache = RoomPolicyCache()
+    return room_policy_cache
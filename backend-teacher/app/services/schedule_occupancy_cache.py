@@ -0,0 +1,264 @@
+# 시간표별 블록 점유 인덱스 캐시 (시간표 편집기 드래그 미리보기 검사 시 DB 조회 제거)
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Optional, Tuple
+import logging
+import threading
+import time
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.existing_db import LectureBlock, LectureGroup, Teacher
+from app.services.occupancy import Occupancy, WEEK_DAYS, group_resources
+from app.services.pg_listener import PgNotificationListener
+
+logger = logging.getLogger(__name__)
+
+# 수업 블록 변경 알림 채널 (다른 워커 프로세스의 캐시 무효화용, payload: "schedule_id:보낸 워커")
+SCHEDULE_BLOCKS_CHANNEL = "schedule_blocks_changed"
+# 인덱스 격자 (요일 전체 x 교시), 벗어난 블록이 생기면 인덱스를 버리고 다시 읽음
+GRID_PERIODS = 12
+# 메모리에 유지할 최대 시간표 수 (넘으면 가장 오래 전에 읽은 것부터 제거)
+MAX_CACHED_SCHEDULES = 50
+
+
+@dataclass(frozen=True)
+class GroupInfo:
+    schedule_id: int
+    teacher_id: int
+    teacher_name: Optional[str]
+    grade: int
+    class_num: Optional[int]
+
+
+@dataclass
+class SlotCheck:
+    """한 칸에 블록을 놓을 때 겹치는 블록들 (block id 목록)"""
+    group: GroupInfo
+    teacher_conflicts: List[int] = field(default_factory=list)
+    class_conflicts: List[int] = field(default_factory=list)
+    room_conflicts: List[int] = field(default_factory=list)
+    teacher_daily_count: int = 0  # 같은 요일 해당 교사의 다른 수업 수
+
+
+class ScheduleIndex:
+    """한 시간표의 점유 상태: 교사/학급/특별실 비트마스크와 칸별 블록 id"""
+
+    def __init__(self, schedule_id: int, groups: Dict[int, GroupInfo]):
+        self.schedule_id = schedule_id
+        self.groups = groups
+        self.occupancy = Occupancy(WEEK_DAYS, range(1, GRID_PERIODS + 1))
+        self.blocks: Dict[int, Tuple[int, int, Optional[int]]] = {}  # block id -> (group id, slot, room id)
+        self._owners: Dict[Tuple[Hashable, int], List[int]] = {}  # (자원, slot) -> block id 목록 (중복 배정 포함)
+
+    def _resources(self, group_id: int, room_id: Optional[int]) -> List[Hashable]:
+        group = self.groups[group_id]
+        return group_resources(group.teacher_id, group.grade, group.class_num, room_id)
+
+    def add(self, block_id: int, group_id: int, day: str, period: int, room_id: Optional[int]) -> bool:
+        """블록 추가 (그룹을 모르거나 격자 밖이면 False)"""
+        slot = self.occupancy.slot(day, period)
+        if slot is None or group_id not in self.groups:
+            return False
+        masks = self.occupancy.masks
+        for resource in self._resources(group_id, room_id):
+            self._owners.setdefault((resource, slot), []).append(block_id)
+            masks[resource] = masks.get(resource, 0) | (1 << slot)
+        self.blocks[block_id] = (group_id, slot, room_id)
+        return True
+
+    def remove(self, block_id: int):
+        entry = self.blocks.pop(block_id, None)
+        if entry is None:
+            return
+        group_id, slot, room_id = entry
+        for resource in self._resources(group_id, room_id):
+            owners = self._owners.get((resource, slot), [])
+            if block_id in owners:
+                owners.remove(block_id)
+            if not owners:
+                self._owners.pop((resource, slot), None)
+                self.occupancy.masks[resource] &= ~(1 << slot)
+
+    def check(self, group_id: int, day: str, period: int, room_id: Optional[int],
+              ignore_block_id: Optional[int] = None) -> SlotCheck:
+        group = self.groups[group_id]
+        result = SlotCheck(group=group)
+        slot = self.occupancy.slot(day, period)
+        if slot is None:
+            return result
+        bit = 1 << slot
+        masks = self.occupancy.masks
+
+        def owners(resource):
+            if not masks.get(resource, 0) & bit:
+                return []
+            return [b for b in self._owners.get((resource, slot), []) if b != ignore_block_id]
+
+        teacher_key = ("teacher", group.teacher_id)
+        result.teacher_conflicts = owners(teacher_key)
+        if group.class_num:
+            result.class_conflicts = owners(("class", group.grade, group.class_num))
+        if room_id:
+            result.room_conflicts = owners(("room", room_id))
+
+        # 드래그 중인 블록 자신은 같은 요일 시수에서 제외
+        day_mask = self.occupancy.day_mask(day)
+        count = (masks.get(teacher_key, 0) & day_mask).bit_count()
+        ignored = self.blocks.get(ignore_block_id) if ignore_block_id is not None else None
+        if ignored is not None and (1 << ignored[1]) & day_mask and \
+                self.groups[ignored[0]].teacher_id == group.teacher_id and \
+                len(self._owners.get((teacher_key, ignored[1]), [])) == 1:
+            count -= 1
+        result.teacher_daily_count = count
+        return result
+
+
+class ScheduleOccupancyCache:
+    """
+    프로세스 전역 시간표 점유 캐시
+
+    시간표마다 그룹/블록을 한 번 읽어 인덱스를 만들고, 블록 생성/수정/삭제 시
+    block_saved()/block_deleted()로 바로 반영합니다. 자동 배정 적용처럼 한꺼번에
+    바뀌면 invalidate()로 비웁니다. 다른 워커 프로세스에는 Postgres NOTIFY로 알리고,
+    알림을 놓친 경우를 대비해 TTL이 지나면 다시 읽습니다.
+    """
+
+    def __init__(self, ttl_seconds: int = None):
+        self.ttl = ttl_seconds if ttl_seconds is not None else settings.SCHEDULE_OCCUPANCY_CACHE_TTL
+        self._indexes: Dict[int, Tuple[ScheduleIndex, float]] = {}  # schedule id -> (인덱스, 읽은 시각)
+        self._group_schedules: Dict[int, int] = {}  # group id -> schedule id
+        # 읽는 도중 변경이 있었으면 읽은 결과를 저장하지 않도록 시간표별 변경 횟수 기록
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        # 자기 알림은 이미 반영했으므로 무시하기 위한 워커 식별자
+        self._origin = uuid.uuid4().hex[:12]
+
+    def check(self, db: Session, group_id: int, day: str, period: int, room_id: Optional[int],
+              ignore_block_id: Optional[int] = None) -> Optional[SlotCheck]:
+        """블록을 해당 칸에 놓을 때 겹치는 블록 조회 (그룹이 없으면 None)"""
+        schedule_id = self._group_schedules.get(group_id)
+        if schedule_id is None:
+            row = db.query(LectureGroup.schedule_id).filter(LectureGroup.id == group_id).first()
+            if row is None:
+                return None
+            schedule_id = row.schedule_id
+            with self._lock:
+                self._group_schedules[group_id] = schedule_id
+
+        with self._lock:
+            entry = self._indexes.get(schedule_id)
+            if entry is not None and time.monotonic() - entry[1] <= self.ttl and group_id in entry[0].groups:
+                return entry[0].check(group_id, day, period, room_id, ignore_block_id)
+
+        # 없거나 만료되었거나 새로 만든 그룹이 없으면 다시 읽음
+        index = self._load(db, schedule_id)
+        with self._lock:
+            if group_id not in index.groups:
+                return None
+            return index.check(group_id, day, period, room_id, ignore_block_id)
+
+    def _load(self, db: Session, schedule_id: int) -> ScheduleIndex:
+        with self._lock:
+            generation = self._generations.get(schedule_id, 0)
+
+        group_rows = db.query(
+            LectureGroup.id, LectureGroup.teacher_id, LectureGroup.grade, LectureGroup.class_num, Teacher.name
+        ).outerjoin(Teacher, Teacher.id == LectureGroup.teacher_id).filter(
+            LectureGroup.schedule_id == schedule_id
+        ).all()
+        block_rows = db.query(
+            LectureBlock.id, LectureBlock.group_id, LectureBlock.day, LectureBlock.period, LectureBlock.room_id
+        ).join(LectureGroup, LectureGroup.id == LectureBlock.group_id).filter(
+            LectureGroup.schedule_id == schedule_id
+        ).all()
+
+        index = ScheduleIndex(schedule_id, {
+            r.id: GroupInfo(schedule_id, r.teacher_id, r.name, r.grade, r.class_num) for r in group_rows
+        })
+        for r in block_rows:
+            if not index.add(r.id, r.group_id, r.day, r.period, r.room_id):
+                logger.warning(f"시간표 {schedule_id}의 블록 {r.id}가 점유 격자 밖에 있어 검사에서 제외됩니다 ({r.day} {r.period}교시)")
+
+        with self._lock:
+            for group_id in index.groups:
+                self._group_schedules[group_id] = schedule_id
+            if self._generations.get(schedule_id, 0) == generation:
+                self._indexes[schedule_id] = (index, time.monotonic())
+                if len(self._indexes) > MAX_CACHED_SCHEDULES:
+                    oldest = min(self._indexes, key=lambda s: self._indexes[s][1])
+                    self._indexes.pop(oldest)
+        return index
+
+    def block_saved(self, schedule_id: int, block_id: int, group_id: int, day: str, period: int,
+                    room_id: Optional[int]):
+        """블록 생성/수정 반영 (commit 후 호출)"""
+        with self._lock:
+            self._generations[schedule_id] = self._generations.get(schedule_id, 0) + 1
+            entry = self._indexes.get(schedule_id)
+            if entry is None:
+                return
+            index = entry[0]
+            index.remove(block_id)
+            if not index.add(block_id, group_id, day, period, room_id):
+                self._indexes.pop(schedule_id, None)
+
+    def block_deleted(self, schedule_id: int, block_id: int):
+        """블록 삭제 반영 (commit 후 호출)"""
+        with self._lock:
+            self._generations[schedule_id] = self._generations.get(schedule_id, 0) + 1
+            entry = self._indexes.get(schedule_id)
+            if entry is not None:
+                entry[0].remove(block_id)
+
+    def invalidate(self, schedule_id: Optional[int] = None):
+        """다음 검사 때 다시 읽도록 캐시를 비움 (schedule_id가 없으면 전체)"""
+        with self._lock:
+            if schedule_id is None:
+                for key in self._indexes:
+                    self._generations[key] = self._generations.get(key, 0) + 1
+                self._indexes.clear()
+            else:
+                self._generations[schedule_id] = self._generations.get(schedule_id, 0) + 1
+                self._indexes.pop(schedule_id, None)
+
+    def notify_change(self, db: Session, schedule_id: int):
+        """
+        블록 변경을 다른 워커에 알림
+        commit 전에 호출하면 트랜잭션이 commit될 때 함께 전달됩니다.
+        (현재 프로세스의 캐시는 commit 후 block_saved()/block_deleted()/invalidate()로 반영)
+        """
+        try:
+            db.execute(text("SELECT pg_notify(:channel, :schedule_id)"),
+                       {"channel": SCHEDULE_BLOCKS_CHANNEL, "schedule_id": f"{schedule_id}:{self._origin}"})
+        except Exception as e:
+            # 알림 실패 시 다른 워커는 TTL 만료 후 갱신
+            logger.warning(f"시간표 블록 변경 알림 실패: {str(e)}")
+
+    def register(self, listener: PgNotificationListener):
+        """다른 워커의 변경 알림을 받으면 해당 시간표 캐시를 비우도록 등록"""
+        def on_change(payload: str):
+            schedule_id, _, origin = payload.partition(":")
+            if origin == self._origin:
+                return
+            try:
+                self.invalidate(int(schedule_id))
+            except ValueError:
+                self.invalidate()
+
+        # 재연결 사이에 놓친 알림이 있을 수 있으므로 재연결 시에는 전체를 비움
+        listener.subscribe(SCHEDULE_BLOCKS_CHANNEL, on_change, on_reconnect=self.invalidate)
+
+
+# 전역 점유 캐시 인스턴스
+schedule_occupancy_cache = None
+
+
+def get_schedule_occupancy_cache() -> ScheduleOccupancyCache:
+    """시간표 점유 캐시 인스턴스 가져오기 (싱글톤)"""
+    global schedule_occupancy_cache
+    if schedule_occupancy_cache is None:
+        schedule_occupancy_cache = ScheduleOccupancyCache()
+    return schedule_occupancy_cache
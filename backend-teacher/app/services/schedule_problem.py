@@ -0,0 +1,163 @@
+"""
+Scheduler input loaded from the DB in a handful of queries.
+
+load_scheduling_problem() reads the configuration, the schedule's lecture
+groups (with their subject's required room), its existing blocks, the
+teachers' time-offs, the slots other schedules already use in the same
+rooms and the active soft constraints as plain records. AutoScheduler and the solvers work
+only on these records, so no query runs once solving starts.
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.models.existing_db import (
+    LectureBlock, LectureGroup, TeacherTimeOff, SchoolConfiguration, Subject, ScheduleConstraint
+)
+from app.services.occupancy import Occupancy, group_resources
+from app.services.soft_constraints import SoftConstraint, parse_constraint
+from app.services.timetable_solver import SolverGroup
+
+DEFAULT_DAYS = ["MON", "TUE", "WED", "THU", "FRI"]
+DEFAULT_PERIODS = 7
+
+
+@dataclass
+class ExistingBlock:
+    """A block already in the schedule, with its group's teacher and class."""
+    id: Optional[int]
+    group_id: int
+    teacher_id: int
+    grade: int
+    class_num: Optional[int]
+    day: str
+    period: int
+    room_id: Optional[int]
+    is_fixed: bool = False
+
+
+@dataclass
+class SchedulingProblem:
+    schedule_id: int
+    days: List[str]
+    periods: List[int]
+    groups: List[SolverGroup]  # blocks_needed = total_credits - existing blocks
+    blocks: List[ExistingBlock] = field(default_factory=list)
+    time_offs: List[Tuple[int, str, int]] = field(default_factory=list)  # (teacher_id, day, period)
+    # Room slots taken by other schedules' blocks (room slots are unique across all schedules)
+    room_offs: List[Tuple[int, str, int]] = field(default_factory=list)  # (room_id, day, period)
+    constraints: List[SoftConstraint] = field(default_factory=list)
+    credits: Dict[int, int] = field(default_factory=dict)  # group id -> total_credits (blocks per week)
+
+    def build_occupancy(self) -> Occupancy:
+        """Slots taken by time-offs, other schedules' rooms and existing blocks."""
+        occupancy = self.build_unavailable()
+        for b in self.blocks:
+            occupancy.occupy(group_resources(b.teacher_id, b.grade, b.class_num, b.room_id), b.day, b.period)
+        return occupancy
+
+    def build_unavailable(self) -> Occupancy:
+        """Slots taken outside this schedule's blocks: teacher time-offs and other schedules' rooms."""
+        occupancy = Occupancy(self.days, self.periods)
+        for teacher_id, day, period in self.time_offs:
+            occupancy.occupy([("teacher", teacher_id)], day, period)
+        for room_id, day, period in self.room_offs:
+            occupancy.occupy([("room", room_id)], day, period)
+        return occupancy
+
+    @property
+    def blocks_needed(self) -> int:
+        return sum(g.blocks_needed for g in self.groups)
+
+
+def load_scheduling_problem(db: Session, schedule_id: int, user_id: int) -> SchedulingProblem:
+    """Configuration, groups, existing blocks, time-offs, other schedules' rooms and soft constraints in six queries."""
+    config = db.query(
+        SchoolConfiguration.days_per_week, SchoolConfiguration.periods_per_day
+    ).filter(SchoolConfiguration.user_id == user_id).first()
+    days = DEFAULT_DAYS
+    periods = list(range(1, DEFAULT_PERIODS + 1))
+    if config:
+        periods = list(range(1, config.periods_per_day + 1))
+        days = DEFAULT_DAYS[:config.days_per_week]
+
+    group_rows = db.query(
+        LectureGroup.id, LectureGroup.teacher_id, LectureGroup.grade, LectureGroup.class_num,
+        LectureGroup.total_credits, LectureGroup.subject_id, Subject.required_facility_id
+    ).outerjoin(Subject, Subject.id == LectureGroup.subject_id).filter(
+        LectureGroup.schedule_id == schedule_id
+    ).order_by(LectureGroup.id).all()
+
+    # Existing blocks are needed for the occupancy anyway, so the per-group
+    # counts come from the same rows instead of a separate GROUP BY
+    block_rows = db.query(
+        LectureBlock.id, LectureBlock.group_id, LectureBlock.day, LectureBlock.period,
+        LectureBlock.room_id, LectureBlock.is_fixed,
+        LectureGroup.teacher_id, LectureGroup.grade, LectureGroup.class_num
+    ).join(LectureGroup, LectureGroup.id == LectureBlock.group_id).filter(
+        LectureGroup.schedule_id == schedule_id
+    ).all()
+
+    # Other schedules' blocks in the rooms this schedule uses
+    rooms = {r.required_facility_id for r in group_rows if r.required_facility_id} | \
+        {r.room_id for r in block_rows if r.room_id}
+    room_off_rows = db.query(
+        LectureBlock.room_id, LectureBlock.day, LectureBlock.period
+    ).join(LectureGroup, LectureGroup.id == LectureBlock.group_id).filter(
+        LectureBlock.room_id.in_(rooms),
+        or_(LectureGroup.schedule_id != schedule_id, LectureGroup.schedule_id.is_(None))
+    ).all() if rooms else []
+
+    time_off_rows = db.query(
+        TeacherTimeOff.teacher_id, TeacherTimeOff.day, TeacherTimeOff.period
+    ).filter(TeacherTimeOff.user_id == user_id).all()
+
+    # The user's global constraints and this schedule's own
+    constraint_rows = db.query(
+        ScheduleConstraint.id, ScheduleConstraint.name, ScheduleConstraint.target_type,
+        ScheduleConstraint.target_id, ScheduleConstraint.configuration, ScheduleConstraint.weight
+    ).filter(
+        ScheduleConstraint.user_id == user_id,
+        ScheduleConstraint.is_active.is_(True),
+        or_(ScheduleConstraint.schedule_id == schedule_id, ScheduleConstraint.schedule_id.is_(None))
+    ).order_by(ScheduleConstraint.id).all()
+
+    blocks = [
+        ExistingBlock(
+            id=r.id, group_id=r.group_id, teacher_id=r.teacher_id, grade=r.grade, class_num=r.class_num,
+            day=r.day, period=r.period, room_id=r.room_id, is_fixed=bool(r.is_fixed)
+        )
+        for r in block_rows
+    ]
+    existing = Counter(b.group_id for b in blocks)
+    groups = [
+        SolverGroup(
+            id=r.id,
+            teacher_id=r.teacher_id,
+            grade=r.grade,
+            class_num=r.class_num,
+            room_id=r.required_facility_id,
+            blocks_needed=max(0, r.total_credits - existing[r.id]),
+            subject_id=r.subject_id,
+        )
+        for r in group_rows
+    ]
+    return SchedulingProblem(
+        schedule_id=schedule_id,
+        days=days,
+        periods=periods,
+        groups=groups,
+        blocks=blocks,
+        time_offs=[(r.teacher_id, r.day, r.period) for r in time_off_rows],
+        room_offs=[(r.room_id, r.day, r.period) for r in room_off_rows],
+        constraints=[
+            c for c in (
+                parse_constraint(r.configuration, r.weight, r.target_type, r.target_id, id=r.id, name=r.name)
+                for r in constraint_rows
+            ) if c is not None
+        ],
+        credits={r.id: r.total_credits for r in group_rows},
+    )
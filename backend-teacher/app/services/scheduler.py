@@ -1,156 +1,286 @@
-from typing import List, Dict, Set, Tuple, Optional
+from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
-from app.models.existing_db import (
-    LectureBlock, LectureGroup, TeacherTimeOff, 
-    SchoolConfiguration, ScheduleMetadata,
-    Teacher, Subject
+from app.models.existing_db import LectureBlock
+from app.config import settings
+from app.services.occupancy import Occupancy, group_resources
+from app.services.schedule_problem import SchedulingProblem, load_scheduling_problem
+from app.services.soft_constraints import ScheduleOptimizer
+from app.services.solver_portfolio import solve_portfolio
+from app.services.timetable_solver import (
+    TimetableSolver, SolverGroup, SolveResult, Placement, ProgressCallback,
+    SOLVED, INFEASIBLE, NODE_LIMIT, TIME_LIMIT
 )
+from collections import Counter
 import random
+import time
+
+
+class SchedulingError(Exception):
+    """Auto-scheduling did not place every block; carries what was missing."""
+
+    def __init__(self, message: str, status: str, placed: int = 0, total: int = 0,
+                 unplaced: Optional[List[Dict]] = None, blocked: Optional[List[int]] = None):
+        super().__init__(message)
+        self.status = status
+        self.placed = placed
+        self.total = total
+        self.unplaced = unplaced or []
+        self.blocked = blocked or []
+
+    def to_detail(self) -> Dict:
+        return {
+            "message": f"Scheduling failed: {self}",
+            "status": self.status,
+            "placed": self.placed,
+            "total": self.total,
+            "unplaced_groups": self.unplaced,
+            "blocked_groups": self.blocked,
+        }
+
 
 class AutoScheduler:
-    def __init__(self, db: Session, schedule_id: int, user_id: int):
+    # "mrv": TimetableSolver (MRV + forward checking), "legacy": plain in-order backtracking,
+    # "portfolio": differently ordered TimetableSolver searches in parallel processes
+    ENGINES = ("mrv", "legacy", "portfolio")
+
+    def __init__(self, db: Session, schedule_id: int, user_id: int, engine: str = "mrv",
+                 node_limit: Optional[int] = None, time_limit: Optional[float] = None,
+                 progress: Optional[ProgressCallback] = None, workers: Optional[int] = None,
+                 optimize_seconds: Optional[float] = None):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown scheduler engine: {engine}")
         self.db = db
         self.schedule_id = schedule_id
         self.user_id = user_id
+        self.engine = engine
+        # 0 in settings means no limit
+        self.node_limit = node_limit if node_limit is not None else (settings.AUTO_SCHEDULE_NODE_LIMIT or None)
+        self.time_limit = time_limit if time_limit is not None else (settings.AUTO_SCHEDULE_TIME_LIMIT_SECONDS or None)
+        self.progress = progress  # called with placed/total/nodes while searching
+        # Portfolio processes (0 in settings means one per CPU)
+        self.workers = workers if workers is not None else (settings.AUTO_SCHEDULE_PORTFOLIO_WORKERS or None)
+        # Soft-constraint optimization after a feasible timetable is found (0: only report the score)
+        self.optimize_seconds = optimize_seconds if optimize_seconds is not None else settings.AUTO_SCHEDULE_OPTIMIZE_SECONDS
         self.errors = []
-        
-        # Load constraints variables
-        self.teacher_busy: Set[Tuple[int, str, int]] = set() # (teacher_id, day, period)
-        self.class_busy: Set[Tuple[int, int, str, int]] = set() # (grade, class_num, day, period)
-        self.room_busy: Set[Tuple[int, str, int]] = set() # (room_id, day, period)
+        self.stats: Dict[str, int] = {}
+        self.result: Optional[SolveResult] = None
+        self.problem: Optional[SchedulingProblem] = None
         
         self.valid_days = ["MON", "TUE", "WED", "THU", "FRI"]
         self.valid_periods = list(range(1, 8)) # Default 1-7
+
+        # Taken slots per teacher / class / room (time-offs, existing and new blocks).
+        # Built over the days x periods grid once the problem is loaded.
+        self.occupancy: Optional[Occupancy] = None
+        self._resource_cache: Dict = {}  # (group id, room id) -> occupancy resource keys
         
         self.created_blocks: List[LectureBlock] = []
 
     def schedule(self) -> List[LectureBlock]:
-        # 1. Initialize State
-        self._load_configuration()
-        self._load_existing_state()
-        
-        # 2. Identify Tasks (Blocks needed)
-        # Find groups that need scheduling (unassigned or partially assigned)
-        groups = self._load_groups_to_schedule()
-        
-        tasks = [] # List of (group, block_index)
-        for g in groups:
-            # Check how many periods already assigned
-            current_count = self.db.query(LectureBlock).filter(LectureBlock.group_id == g.id).count()
-            needed = g.total_credits - current_count
-            
-            if needed > 0:
-                for _ in range(needed):
-                    tasks.append(g)
-        
-        # Sort tasks? (Heuristic: Most constrained first could be better, but simple sort by teacher constraint might suffice)
-        # Random shuffle sometimes helps avoid bad patterns in simple greedy
-        # tasks.sort(key=lambda g: g.teacher_id) 
-        
-        # 3. Solve
-        success = self._backtrack(tasks, 0)
-        
+        # 1. Load groups, existing blocks, time-offs and configuration (no DB access after this)
+        self.problem = load_scheduling_problem(self.db, self.schedule_id, self.user_id)
+
+        # 2. Solve
+        return self.solve_problem(self.problem)
+
+    def solve_problem(self, problem: SchedulingProblem) -> List[LectureBlock]:
+        """Place every missing block of the problem; raises SchedulingError otherwise."""
+        self.valid_days = problem.days
+        self.valid_periods = problem.periods
+        self.occupancy = problem.build_occupancy()
+
+        # Groups that need scheduling (unassigned or partially assigned)
+        groups = [g for g in problem.groups if g.blocks_needed > 0]
+        if self.engine == "legacy":
+            tasks = [g for g in groups for _ in range(g.blocks_needed)]
+            success = self._backtrack(tasks)
+        else:
+            success = self._solve(groups)
+
         if not success:
-            raise Exception("Could not find a valid schedule for all blocks.")
-            
+            raise self._failure(groups)
+
+        if problem.constraints:
+            self._optimize(problem)
         return self.created_blocks
 
-    def _load_configuration(self):
-        config = self.db.query(SchoolConfiguration).filter(SchoolConfiguration.user_id == self.user_id).first()
-        if config:
-            self.valid_periods = list(range(1, config.periods_per_day + 1))
-            self.valid_days = ["MON", "TUE", "WED", "THU", "FRI"][:config.days_per_week]
-
-    def _load_existing_state(self):
-        # Time Offs
-        time_offs = self.db.query(TeacherTimeOff).filter(TeacherTimeOff.user_id == self.user_id).all()
-        for to in time_offs:
-            self.teacher_busy.add((to.teacher_id, to.day, to.period))
-            
-        # Existing Blocks (in this schedule)
-        # Note: We assume we are filling GAPS. 
-        # If we wanted to "Reschedule All", we should delete existing blocks clearly before calling this.
-        blocks = self.db.query(LectureBlock).join(LectureGroup).filter(LectureGroup.schedule_id == self.schedule_id).all()
-        
-        for b in blocks:
-            self._mark_busy(b.group, b.day, b.period, b.room_id)
+    def _optimize(self, problem: SchedulingProblem):
+        """Move the new blocks to improve the soft-constraint score; existing blocks stay where they are."""
+        placements = [Placement(b.group_id, b.day, b.period, b.room_id) for b in self.created_blocks]
+        optimizer = ScheduleOptimizer(
+            problem.groups, problem.build_occupancy(), placements, problem.constraints, problem.blocks
+        )
+        if not self.optimize_seconds:
+            self.stats.update({"score": optimizer.score(), "score_breakdown": optimizer.breakdown()})
+            return
 
-    def _mark_busy(self, group: LectureGroup, day: str, period: int, room_id: Optional[int]):
-        self.teacher_busy.add((group.teacher_id, day, period))
-        if group.class_num:
-            self.class_busy.add((group.grade, group.class_num, day, period))
-        
-        if room_id:
-            self.room_busy.add((room_id, day, period))
+        total = len(placements)
 
-    def _unmark_busy(self, group: LectureGroup, day: str, period: int, room_id: Optional[int]):
-        self.teacher_busy.discard((group.teacher_id, day, period))
-        if group.class_num:
-            self.class_busy.discard((group.grade, group.class_num, day, period))
-        
-        if room_id:
-            self.room_busy.discard((room_id, day, period))
+        def on_progress(progress):
+            self.progress({"phase": "optimize", "placed": total, "best_placed": total, "total": total, **progress})
+
+        result = optimizer.optimize(self.optimize_seconds, on_progress=on_progress if self.progress else None)
+        for block, placement in zip(self.created_blocks, result.placements):
+            block.day = placement.day
+            block.period = placement.period
+        self.occupancy = optimizer.occupancy
+        if self.result is not None:
+            self.result.placements = result.placements
+        self.stats.update({
+            "initial_score": result.initial_score,
+            "score": result.score,
+            "score_breakdown": result.breakdown,
+            "optimize_iterations": result.iterations,
+            "optimize_seconds": round(result.elapsed, 3),
+        })
+
+    def _failure(self, groups: List[SolverGroup]) -> SchedulingError:
+        """Describe why solving stopped and which groups are still missing blocks."""
+        status = self.stats.get("status", INFEASIBLE)
+        if status == TIME_LIMIT:
+            message = f"Time limit of {self.time_limit}s reached before all blocks were placed."
+        elif status == NODE_LIMIT:
+            message = f"Search limit of {self.node_limit} nodes reached before all blocks were placed."
+        elif self.result is not None and self.result.blocked:
+            message = "Some teachers, classes or rooms have fewer free slots than blocks needed (time-offs or existing blocks)."
+        else:
+            message = "Could not find a valid schedule for all blocks."
+
+        total = sum(g.blocks_needed for g in groups)
+        groups = {g.id: g for g in groups}
+        if self.result is not None:
+            missing = self.result.unplaced
+            placed = len(self.result.placements)
+            blocked = self.result.blocked
+        else:
+            # Legacy engine: created_blocks holds the partial assignment
+            missing = Counter({g.id: g.blocks_needed for g in groups.values()}) - Counter(b.group_id for b in self.created_blocks)
+            placed = len(self.created_blocks)
+            blocked = []
+        unplaced = [
+            {
+                "group_id": group_id,
+                "missing_blocks": count,
+                "teacher_id": groups[group_id].teacher_id,
+                "grade": groups[group_id].grade,
+                "class_num": groups[group_id].class_num,
+            }
+            for group_id, count in missing.items()
+        ]
+        return SchedulingError(message, status, placed, total, unplaced, blocked)
 
-    def _is_valid(self, group: LectureGroup, day: str, period: int, room_id: Optional[int]) -> bool:
-        # Teacher check (TimeOff + Collision)
-        if (group.teacher_id, day, period) in self.teacher_busy:
+    def _resources(self, group: SolverGroup, room_id: Optional[int]) -> List:
+        key = (group.id, room_id)
+        resources = self._resource_cache.get(key)
+        if resources is None:
+            resources = self._resource_cache[key] = group_resources(group.teacher_id, group.grade, group.class_num, room_id)
+        return resources
+
+    def _mark_busy(self, group: SolverGroup, day: str, period: int, room_id: Optional[int]):
+        self.occupancy.occupy(self._resources(group, room_id), day, period)
+
+    def _unmark_busy(self, group: SolverGroup, day: str, period: int, room_id: Optional[int]):
+        self.occupancy.release(self._resources(group, room_id), day, period)
+
+    def _is_valid(self, group: SolverGroup, day: str, period: int, room_id: Optional[int]) -> bool:
+        # Teacher (time-off + collision), student class and room in one mask test each
+        return self.occupancy.is_free(self._resources(group, room_id), day, period)
+
+    def _solve(self, groups: List[SolverGroup]) -> bool:
+        """Run TimetableSolver on the groups, with everything already in the occupancy as fixed."""
+        if self.engine == "portfolio":
+            self.result = solve_portfolio(
+                groups, self.occupancy, workers=self.workers,
+                node_limit=self.node_limit, time_limit=self.time_limit, on_progress=self.progress
+            )
+        else:
+            solver = TimetableSolver(groups, self.occupancy)
+            self.result = solver.solve(node_limit=self.node_limit, time_limit=self.time_limit, on_progress=self.progress)
+        self.stats = {
+            "status": self.result.status,
+            "nodes": self.result.nodes,
+            "backtracks": self.result.backtracks,
+        }
+        if self.result.strategy:
+            self.stats["strategy"] = self.result.strategy
+        if not self.result.solved:
             return False
-            
-        # Student Class check (Collision)
-        if group.class_num:
-            if (group.grade, group.class_num, day, period) in self.class_busy:
-                return False
-                
-        # Room check (Collision)
-        if room_id:
-            if (room_id, day, period) in self.room_busy:
-                return False
-        
+
+        by_id = {g.id: g for g in groups}
+        for p in self.result.placements:
+            self._mark_busy(by_id[p.group_id], p.day, p.period, p.room_id)
+            self.created_blocks.append(LectureBlock(
+                group_id=p.group_id,
+                day=p.day,
+                period=p.period,
+                room_id=p.room_id,
+                is_fixed=False
+            ))
         return True
 
-    def _backtrack(self, tasks: List[LectureGroup], index: int) -> bool:
+    def _backtrack(self, tasks: List[SolverGroup]) -> bool:
+        """
+        Plain in-order backtracking: each task takes the first free slot, the
+        previous task moves on to its next slot when a task has none left.
+        Runs on an explicit stack (positions[i] = next slot to try for task i).
+        """
+        slots = [(d, p, self.occupancy.bit(d, p)) for d in self.valid_days for p in self.valid_periods]
+        positions = [0] * len(tasks)
+        deadline = time.perf_counter() + self.time_limit if self.time_limit else None
+        nodes = backtracks = 0
+        next_progress = time.perf_counter()
+        status = INFEASIBLE
+        index = 0
+
+        while 0 <= index < len(tasks):
+            group = tasks[index]
+            # Subject's required room, if any; blocks of such groups go there
+            required_room_id = group.room_id
+            resources = self._resources(group, required_room_id)
+
+            placed = False
+            while positions[index] < len(slots):
+                day, period, bit = slots[positions[index]]
+                positions[index] += 1
+                nodes += 1
+                if self.node_limit and nodes > self.node_limit:
+                    status = NODE_LIMIT
+                    break
+                if nodes % 1024 == 0 and (deadline or self.progress):
+                    now = time.perf_counter()
+                    if deadline and now > deadline:
+                        status = TIME_LIMIT
+                        break
+                    if self.progress and now >= next_progress:
+                        next_progress = now + 0.5
+                        self.progress({"placed": index, "total": len(tasks), "nodes": nodes})
+                if self.occupancy.is_free_bit(resources, bit):
+                    self._mark_busy(group, day, period, required_room_id)
+                    self.created_blocks.append(LectureBlock(
+                        group_id=group.id,
+                        day=day,
+                        period=period,
+                        room_id=required_room_id,
+                        is_fixed=False
+                    ))
+                    placed = True
+                    break
+            if status != INFEASIBLE:
+                break
+
+            if placed:
+                index += 1
+                continue
+
+            # No slot left for this task: undo the previous one and let it try its next slot
+            positions[index] = 0
+            index -= 1
+            backtracks += 1
+            if index >= 0:
+                block = self.created_blocks.pop()
+                self._unmark_busy(tasks[index], block.day, block.period, block.room_id)
+
         if index >= len(tasks):
-            return True
-            
-        group = tasks[index]
-        
-        # Try all slots
-        # Optimization: Shuffle slots or pick intelligently
-        slots = [(d, p) for d in self.valid_days for p in self.valid_periods]
-        # random.shuffle(slots) # Randomness helps if stuck
-        
-        # Filter for "required room"
-        # Since LectureGroup itself doesn't typically carry room_id directly in our simplified schema unless mapped?
-        # Ah, Subject has required_facility_id!
-        # And LectureBlock has room_id.
-        # We need to assign room_id if subject requires it.
-        
-        required_room_id = group.subject.required_facility_id if group.subject else None
-                
-        for day, period in slots:
-            if self._is_valid(group, day, period, required_room_id):
-                # Assign
-                self._mark_busy(group, day, period, required_room_id)
-                new_block = LectureBlock(
-                    group_id=group.id,
-                    day=day,
-                    period=period,
-                    room_id=required_room_id,
-                    is_fixed=False
-                )
-                self.created_blocks.append(new_block)
-                
-                # Recurse
-                if self._backtrack(tasks, index + 1):
-                    return True
-                
-                # Backtrack
-                self.created_blocks.pop()
-                self._unmark_busy(group, day, period, required_room_id)
-                
-        return False
-
-    def _load_groups_to_schedule(self) -> List[LectureGroup]:
-        return self.db.query(LectureGroup).filter(
-            LectureGroup.schedule_id == self.schedule_id,
-        ).all()
+            status = SOLVED
+        self.stats = {"status": status, "nodes": nodes, "backtracks": backtracks}
+        return status == SOLVED
@@ -1,150 +1,273 @@
 # 스케줄러 서비스 (야자 출석 자동 처리)
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
-from app.database import SessionLocal
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import text
+from app.config import settings
+from app.database import SessionLocal, engine as default_engine
+from app.models.attendance import LocationSetting, BatchJobRun
 from app.services.batch_service import BatchService
+from app.services.pg_listener import PgNotificationListener
+from app.services.room_policy_cache import ROOM_POLICY_CHANNEL, parse_hhmm
+from datetime import datetime, time, timezone
+from typing import Any, Dict, Optional, Tuple
 import logging
-from datetime import datetime
+import os
+import socket
+import threading
+import time as time_module
 
 logger = logging.getLogger(__name__)
 
+# 스케줄러 리더 선출용 advisory lock 키 (DB 전체에서 이 용도로만 사용)
+LEADER_LOCK_KEY = 720_250_038
+LEADER_JOB_ID = "scheduler_leadership"
+
+CHECKOUT_JOB = "night_study_checkout"
+ABSENT_JOB = "night_study_absent"
+JOB_LABELS = {
+    CHECKOUT_JOB: "야자 자동 퇴실 처리",
+    ABSENT_JOB: "야자 자동 결석 처리",
+}
+
 
 class SchedulerService:
-    """야자 출석 자동 처리 스케줄러"""
-    
-    def __init__(self):
-        self.scheduler = BackgroundScheduler()
-        self._setup_jobs()
-    
-    def _setup_jobs(self):
-        """
-        스케줄 작업 설정
-        - 매일 야자 종료 시간(22:00) 직후 자동 퇴실 처리
-        - 매일 출석 마감 시간(19:10) 직후 자동 결석 처리
-        """
-        # 야자 종료 시간 직후 자동 퇴실 처리 (매일 22:05)
-        self.scheduler.add_job(
-            func=self._process_checkout_job,
-            trigger=CronTrigger(hour=22, minute=5),
-            id='night_study_auto_checkout',
-            name='야자 자동 퇴실 처리',
-            replace_existing=True
-        )
-        
-        # 출석 마감 시간 직후 자동 결석 처리 (매일 19:15)
-        self.scheduler.add_job(
-            func=self._process_absent_job,
-            trigger=CronTrigger(hour=19, minute=15),
-            id='night_study_auto_absent',
-            name='야자 자동 결석 처리',
-            replace_existing=True
+    """
+    야자 출석 자동 처리 스케줄러
+
+    정독실별 야자 종료 시간(checkout_time)과 출석 마감 시간(attendance_end_time)으로
+    자동 퇴실/결석 작업을 만들고, 위치 설정이 바뀌면 작업을 다시 맞춥니다.
+    uvicorn 워커가 여러 개여도 Postgres advisory lock을 잡은 워커(리더)만 작업을 등록/실행하며,
+    리더 워커의 DB 연결이 끊기면 lock이 풀려 다른 워커가 다음 확인 주기에 이어받습니다.
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine or default_engine
+        self.scheduler = BackgroundScheduler(
+            timezone=settings.SCHEDULER_TIMEZONE,
+            job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 600}
         )
-        
-        logger.info("야자 출석 스케줄러 작업 등록 완료")
-    
-    def _process_checkout_job(self):
-        """야자 자동 퇴실 처리 작업"""
-        try:
-            db = SessionLocal()
-            try:
-                batch_service = BatchService(db)
-                results = batch_service.process_night_study_checkout()
-                logger.info(f"야자 자동 퇴실 처리 완료: {results}")
-            finally:
-                db.close()
-        except Exception as e:
-            logger.error(f"야자 자동 퇴실 처리 중 오류 발생: {str(e)}")
-    
-    def _process_absent_job(self):
-        """야자 자동 결석 처리 작업"""
-        try:
-            db = SessionLocal()
-            try:
-                batch_service = BatchService(db)
-                results = batch_service.process_night_study_absent()
-                logger.info(f"야자 자동 결석 처리 완료: {results}")
-            finally:
-                db.close()
-        except Exception as e:
-            logger.error(f"야자 자동 결석 처리 중 오류 발생: {str(e)}")
-    
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._leader_connection = None
+        # 등록된 정독실 작업 (job_id -> 실행 시각)
+        self._room_jobs: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_connection is not None
+
     def start(self):
-        """스케줄러 시작"""
-        if not self.scheduler.running:
-            self.scheduler.start()
-            logger.info("야자 출석 스케줄러 시작됨")
-        else:
+        """스케줄러 시작 (리더 확인 작업을 바로 한 번 실행)"""
+        if self.scheduler.running:
             logger.warning("스케줄러가 이미 실행 중입니다")
-    
+            return
+        self.scheduler.add_job(
+            func=self._tick,
+            trigger=IntervalTrigger(seconds=settings.SCHEDULER_LEADER_CHECK_SECONDS),
+            id=LEADER_JOB_ID,
+            name='스케줄러 리더 확인 및 작업 동기화',
+            replace_existing=True,
+            next_run_time=datetime.now(timezone.utc)
+        )
+        self.scheduler.start()
+        logger.info(f"야자 출석 스케줄러 시작됨 ({self.worker})")
+
     def shutdown(self):
-        """스케줄러 종료"""
+        """스케줄러 종료 (리더였다면 lock 해제)"""
         if self.scheduler.running:
             self.scheduler.shutdown()
             logger.info("야자 출석 스케줄러 종료됨")
-    
-    def add_custom_checkout_job(self, room_id: str, hour: int, minute: int):
-        """
-        특정 room_id에 대한 커스텀 자동 퇴실 작업 추가
-        
-        Args:
-            room_id: 야자 장소 ID
-            hour: 종료 시간 (시)
-            minute: 종료 시간 (분)
-        """
-        job_id = f'night_study_checkout_{room_id}'
-        
-        # 기존 작업이 있으면 제거
-        if self.scheduler.get_job(job_id):
-            self.scheduler.remove_job(job_id)
-        
-        # 새 작업 추가
-        self.scheduler.add_job(
-            func=lambda: self._process_checkout_job_for_room(room_id),
-            trigger=CronTrigger(hour=hour, minute=minute + 5),  # 종료 시간 5분 후
-            id=job_id,
-            name=f'야자 자동 퇴실 처리 - {room_id}',
-            replace_existing=True
-        )
-        
-        logger.info(f"커스텀 자동 퇴실 작업 추가: {room_id} - {hour:02d}:{minute:02d}")
-    
-    def _process_checkout_job_for_room(self, room_id: str):
-        """특정 room_id에 대한 자동 퇴실 처리"""
-        try:
-            db = SessionLocal()
-            try:
-                batch_service = BatchService(db)
-                results = batch_service.process_night_study_checkout(room_id=room_id)
-                logger.info(f"야자 자동 퇴실 처리 완료 ({room_id}): {results}")
-            finally:
-                db.close()
-        except Exception as e:
-            logger.error(f"야자 자동 퇴실 처리 중 오류 발생 ({room_id}): {str(e)}")
+        with self._lock:
+            self._drop_leadership()
 
+    def register(self, listener: PgNotificationListener):
+        """위치 설정 변경 알림을 받으면 작업을 바로 다시 맞추도록 등록"""
+        listener.subscribe(ROOM_POLICY_CHANNEL, lambda room_id: self.request_sync(), on_reconnect=self.request_sync)
 
-# 전역 스케줄러 인스턴스
-scheduler_service = None
+    def request_sync(self):
+        """리더 확인 및 작업 동기화를 다음 주기까지 기다리지 않고 실행"""
+        if self.scheduler.running:
+            try:
+                self.scheduler.modify_job(LEADER_JOB_ID, next_run_time=datetime.now(timezone.utc))
+            except JobLookupError:
+                pass
 
+    def _tick(self):
+        with self._lock:
+            if not self._check_leadership():
+                return
+            try:
+                self.sync_jobs()
+            except Exception as e:
+                logger.error(f"야자 출석 작업 동기화 중 오류 발생: {str(e)}")
 
-def get_scheduler_service() -> SchedulerService:
-    """스케줄러 서비스 인스턴스 가져오기 (싱글톤)"""
-    global scheduler_service
-    if scheduler_service is None:
-        scheduler_service = SchedulerService()
-    return scheduler_service
+    def _check_leadership(self) -> bool:
+        """리더 연결이 살아 있는지 확인하고, 리더가 아니면 advisory lock 획득 시도"""
+        if self._leader_connection is not None:
+            try:
+                self._leader_connection.execute(text("SELECT 1"))
+                return True
+            except Exception as e:
+                logger.warning(f"스케줄러 리더 연결이 끊어졌습니다: {str(e)}")
+                self._drop_leadership()
 
+        try:
+            # lock은 세션 단위이므로 트랜잭션 없이 연결을 계속 잡고 있음
+            connection = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        except Exception as e:
+            logger.warning(f"스케줄러 리더 확인용 DB 연결 실패: {str(e)}")
+            return False
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": LEADER_LOCK_KEY}
+            ).scalar()
+        except Exception as e:
+            logger.warning(f"스케줄러 리더 lock 확인 실패: {str(e)}")
+            connection.invalidate()
+            return False
+        if not acquired:
+            connection.close()
+            return False
 
+        self._leader_connection = connection
+        logger.info(f"스케줄러 리더로 선출됨 ({self.worker})")
+        return True
 
+    def _drop_leadership(self):
+        """등록된 정독실 작업을 지우고 lock을 잡고 있던 연결을 닫음"""
+        for job_id in list(self._room_jobs):
+            self._remove_job(job_id)
+        if self._leader_connection is not None:
+            try:
+                # 풀로 돌려보내면 lock이 유지되므로 연결 자체를 닫아 해제
+                self._leader_connection.invalidate()
+            except Exception:
+                pass
+            self._leader_connection = None
+            logger.info(f"스케줄러 리더 해제 ({self.worker})")
 
+    def _remove_job(self, job_id: str):
+        try:
+            self.scheduler.remove_job(job_id)
+        except JobLookupError:
+            pass
+        self._room_jobs.pop(job_id, None)
 
+    @staticmethod
+    def _run_at(value: time) -> Tuple[int, int]:
+        """설정 시각 + 대기 시간 (시, 분)"""
+        minutes = (value.hour * 60 + value.minute + settings.SCHEDULER_JOB_DELAY_MIN) % (24 * 60)
+        return divmod(minutes, 60)
 
+    def sync_jobs(self):
+        """위치 설정에 맞춰 정독실별 자동 퇴실/결석 작업을 추가/변경/삭제"""
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                LocationSetting.room_id, LocationSetting.checkout_time, LocationSetting.attendance_end_time
+            ).all()
+        finally:
+            db.close()
 
+        desired: Dict[str, Tuple[str, str, Tuple[int, int]]] = {}
+        for room_id, checkout_time, attendance_end_time in rows:
+            for job_name, value in ((CHECKOUT_JOB, checkout_time), (ABSENT_JOB, attendance_end_time)):
+                if not value:
+                    continue
+                try:
+                    run_at = self._run_at(parse_hhmm(value))
+                except (ValueError, AttributeError):
+                    logger.warning(f"{JOB_LABELS[job_name]} 시간 설정 오류 ({room_id}): {value}")
+                    continue
+                desired[f"{job_name}_{room_id}"] = (job_name, room_id, run_at)
 
+        for job_id in set(self._room_jobs) - set(desired):
+            self._remove_job(job_id)
+            logger.info(f"야자 출석 작업 제거: {job_id}")
 
+        for job_id, (job_name, room_id, (hour, minute)) in desired.items():
+            if self._room_jobs.get(job_id) == (hour, minute):
+                continue
+            self.scheduler.add_job(
+                func=self._run_room_job,
+                args=(job_name, room_id),
+                trigger=CronTrigger(hour=hour, minute=minute, timezone=self.scheduler.timezone),
+                id=job_id,
+                name=f'{JOB_LABELS[job_name]} - {room_id}',
+                replace_existing=True
+            )
+            self._room_jobs[job_id] = (hour, minute)
+            logger.info(f"야자 출석 작업 등록: {job_id} - {hour:02d}:{minute:02d}")
 
+    def _run_room_job(self, job_name: str, room_id: str):
+        """정독실 하나의 자동 퇴실/결석 처리 후 실행 기록 저장"""
+        if not self.is_leader:
+            # 작업 실행 직전에 리더를 잃은 경우 (다른 워커가 처리)
+            logger.warning(f"리더가 아니므로 {JOB_LABELS[job_name]}을 건너뜁니다 ({room_id})")
+            return
 
+        started_at = datetime.now(timezone.utc)
+        started = time_module.perf_counter()
+        # 작업 시각(정독실 시간)과 같은 시간대의 날짜 (UTC 날짜는 한국 시간 00~09시에 전날이 됨)
+        day = started_at.astimezone(self.scheduler.timezone).date()
+        db = SessionLocal()
+        try:
+            batch_service = BatchService(db)
+            try:
+                if job_name == CHECKOUT_JOB:
+                    results = batch_service.process_night_study_checkout(room_id=room_id, day=day)
+                else:
+                    results = batch_service.process_night_study_absent(room_id=room_id, day=day)
+                status, error = "success", None
+                logger.info(f"{JOB_LABELS[job_name]} 완료 ({room_id}): {results}")
+            except Exception as e:
+                db.rollback()
+                results, status, error = {}, "failed", str(e)
+                logger.error(f"{JOB_LABELS[job_name]} 중 오류 발생 ({room_id}): {str(e)}")
 
+            self._record_run(db, job_name, room_id, status, started_at, started, results, error)
+        finally:
+            db.close()
+
+    def _record_run(
+        self,
+        db,
+        job_name: str,
+        room_id: Optional[str],
+        status: str,
+        started_at: datetime,
+        started: float,
+        results: Dict[str, Any],
+        error: Optional[str]
+    ):
+        try:
+            db.add(BatchJobRun(
+                job_name=job_name,
+                room_id=room_id,
+                status=status,
+                started_at=started_at,
+                finished_at=datetime.now(timezone.utc),
+                duration_ms=int((time_module.perf_counter() - started) * 1000),
+                rows_processed=sum(counts.get("processed", 0) for counts in results.values()),
+                result=results,
+                error=error,
+                worker=self.worker
+            ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"배치 실행 기록 저장 실패 ({job_name}, {room_id}): {str(e)}")
 
 
+# 전역 스케줄러 인스턴스
+scheduler_service = None
 
 
+def get_scheduler_service() -> SchedulerService:
+    """스케줄러 서비스 인스턴스 가져오기 (싱글톤)"""
+    global scheduler_service
+    if scheduler_service is None:
+        scheduler_service = SchedulerService()
+    return scheduler_service
@@ -0,0 +1,443 @@
+"""
+Soft constraints (ScheduleConstraint rows) and the optimization pass that
+improves a feasible timetable against them.
+
+Supported rules, read from the row's `configuration` JSON (the "rule" key, or
+inferred from the parameter name as in {"max_hours": 4}):
+
+- max_daily_hours  {"max_hours": N}    a teacher teaches at most N periods a day
+- max_consecutive  {"max_periods": N}  a teacher teaches at most N periods in a row
+- subject_spread   {"max_per_day": N}  a lecture group has at most N blocks a day
+
+Each period over the limit costs `weight`. Teacher rules target one teacher
+(target_type TEACHER) or all of them (GLOBAL); subject_spread targets a subject
+(SUBJECT), a grade (GRADE) or every group (GLOBAL).
+
+ScheduleOptimizer runs simulated annealing over moves (one block to another
+free slot) and swaps (two blocks of the same class exchange slots). Hard
+constraints stay satisfied: a move is only tried when the teacher, class and
+room are free at the target. Existing blocks are fixed but count towards the
+score. Every teacher and group keeps a bitmask of its lessons, so the score
+change of a move only looks at the (teacher, day) and (group, day) pairs it
+touches: a popcount per daily limit and a table lookup per run-length limit.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+import json
+import logging
+import math
+import random
+import time
+
+from app.services.occupancy import Occupancy, group_resources
+from app.services.timetable_solver import Placement, SolverGroup
+
+logger = logging.getLogger(__name__)
+
+MAX_DAILY_HOURS = "max_daily_hours"
+MAX_CONSECUTIVE = "max_consecutive"
+SUBJECT_SPREAD = "subject_spread"
+
+# Parameter name of each rule (also used to infer the rule when "rule" is missing)
+RULE_PARAMS = {
+    MAX_DAILY_HOURS: "max_hours",
+    MAX_CONSECUTIVE: "max_periods",
+    SUBJECT_SPREAD: "max_per_day",
+}
+TEACHER_RULES = (MAX_DAILY_HOURS, MAX_CONSECUTIVE)
+
+# Check the clock (and report progress) every this many iterations
+_CLOCK_CHECK_INTERVAL = 256
+
+
+@dataclass
+class SoftConstraint:
+    rule: str
+    limit: int
+    weight: int = 100
+    target_type: str = "GLOBAL"
+    target_id: Optional[int] = None
+    id: Optional[int] = None
+    name: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        return self.name or f"{self.rule} <= {self.limit}"
+
+    def applies_to_teacher(self, teacher_id: int) -> bool:
+        if self.target_type == "TEACHER":
+            return self.target_id == teacher_id
+        return self.target_type == "GLOBAL"
+
+    def applies_to_group(self, group: SolverGroup) -> bool:
+        if self.target_type == "SUBJECT":
+            return self.target_id == group.subject_id
+        if self.target_type == "GRADE":
+            return self.target_id == group.grade
+        return self.target_type == "GLOBAL"
+
+
+def parse_constraint(
+    configuration: Optional[str],
+    weight: Optional[int] = None,
+    target_type: Optional[str] = None,
+    target_id: Optional[int] = None,
+    id: Optional[int] = None,
+    name: Optional[str] = None,
+) -> Optional[SoftConstraint]:
+    """SoftConstraint from a ScheduleConstraint row's columns; None (logged) if not a supported rule."""
+    try:
+        config = json.loads(configuration) if configuration else {}
+    except (TypeError, ValueError):
+        logger.warning(f"Schedule constraint {id}: configuration is not valid JSON")
+        return None
+    if not isinstance(config, dict):
+        return None
+
+    rule = config.get("rule")
+    if rule is None:
+        rule = next((r for r, param in RULE_PARAMS.items() if param in config), None)
+    if rule not in RULE_PARAMS or not isinstance(config.get(RULE_PARAMS[rule]), int):
+        logger.warning(f"Schedule constraint {id} ({name}): unsupported configuration {config}")
+        return None
+
+    if weight is not None and weight <= 0:
+        # Weight 0 disables the rule (it could never change the score)
+        logger.info(f"Schedule constraint {id} ({name}): weight {weight}, skipped")
+        return None
+
+    target_type = (target_type or "GLOBAL").upper()
+    supported = ("TEACHER", "GLOBAL") if rule in TEACHER_RULES else ("SUBJECT", "GRADE", "GLOBAL")
+    if target_type not in supported or (target_type != "GLOBAL" and target_id is None):
+        logger.warning(f"Schedule constraint {id} ({name}): target {target_type} not supported for {rule}")
+        return None
+    return SoftConstraint(
+        rule=rule,
+        limit=config[RULE_PARAMS[rule]],
+        weight=weight if weight is not None else 100,
+        target_type=target_type,
+        target_id=target_id,
+        id=id,
+        name=name,
+    )
+
+
+def _run_penalty_table(width: int, limit: int) -> List[int]:
+    """Periods beyond `limit` in each run of consecutive set bits, for every day mask."""
+    table = []
+    for mask in range(1 << width):
+        excess = run = 0
+        for p in range(width + 1):
+            if p < width and mask >> p & 1:
+                run += 1
+            else:
+                excess += max(0, run - limit)
+                run = 0
+        table.append(excess)
+    return table
+
+
+@dataclass
+class OptimizeResult:
+    placements: List[Placement]
+    initial_score: int
+    score: int
+    breakdown: List[Dict[str, Any]] = field(default_factory=list)
+    iterations: int = 0
+    accepted: int = 0
+    elapsed: float = 0.0
+
+
+class ScheduleOptimizer:
+    def __init__(
+        self,
+        groups: Sequence[SolverGroup],
+        occupancy: Occupancy,
+        placements: Sequence[Placement],
+        constraints: Sequence[SoftConstraint],
+        fixed_blocks: Sequence[Any] = (),
+        seed: Optional[int] = 0,
+    ):
+        """
+        groups: every group of the schedule (fixed blocks and placements refer to them by id).
+        occupancy: slots taken before the placements (time-offs, existing blocks); not modified.
+        fixed_blocks: existing blocks (group_id, day, period) that count towards the score.
+        """
+        self.days = occupancy.days
+        self.width = occupancy.width
+        self.slot_count = occupancy.slot_count
+        self.occupancy = Occupancy(occupancy.days, occupancy.periods)
+        self.occupancy.masks = dict(occupancy.masks)
+        self.constraints = list(constraints)
+        self.groups = {g.id: g for g in groups}
+        self._rng = random.Random(seed)
+        self._day_full = (1 << self.width) - 1
+
+        # Rules per teacher / group: (constraint index, limit, weight) or (constraint index, run table, weight)
+        tables = {}
+        self._teacher_daily: Dict[int, List[Tuple[int, int, int]]] = {}
+        self._teacher_runs: Dict[int, List[Tuple[int, List[int], int]]] = {}
+        self._group_spread: Dict[int, List[Tuple[int, int, int]]] = {}
+        teachers = {g.teacher_id for g in groups}
+        for c_index, c in enumerate(self.constraints):
+            if c.rule == SUBJECT_SPREAD:
+                for g in groups:
+                    if c.applies_to_group(g):
+                        self._group_spread.setdefault(g.id, []).append((c_index, c.limit, c.weight))
+                continue
+            for teacher_id in teachers:
+                if not c.applies_to_teacher(teacher_id):
+                    continue
+                if c.rule == MAX_DAILY_HOURS:
+                    self._teacher_daily.setdefault(teacher_id, []).append((c_index, c.limit, c.weight))
+                else:
+                    table = tables.get(c.limit)
+                    if table is None:
+                        table = tables[c.limit] = _run_penalty_table(self.width, c.limit)
+                    self._teacher_runs.setdefault(teacher_id, []).append((c_index, table, c.weight))
+
+        # Lesson bitmasks (time-offs are not lessons, so these are separate from the occupancy)
+        self._teacher_lessons: Dict[int, int] = {}
+        self._group_lessons: Dict[int, int] = {}
+        for b in fixed_blocks:
+            slot = self.occupancy.slot(b.day, b.period)
+            if slot is not None and b.group_id in self.groups:
+                self._add_lesson(self.groups[b.group_id], 1 << slot)
+
+        # Movable blocks: group, slot and occupancy resources
+        self._block_groups: List[SolverGroup] = []
+        self._block_slots: List[int] = []
+        self._block_resources: List[List[Hashable]] = []
+        self._class_blocks: Dict[Hashable, List[int]] = {}
+        for p in placements:
+            group = self.groups[p.group_id]
+            slot = self.occupancy.slot(p.day, p.period)
+            resources = group_resources(group.teacher_id, group.grade, group.class_num, p.room_id)
+            index = len(self._block_slots)
+            self._block_groups.append(group)
+            self._block_slots.append(slot)
+            self._block_resources.append(resources)
+            self._occupy(resources, 1 << slot)
+            self._add_lesson(group, 1 << slot)
+            if group.class_num:
+                self._class_blocks.setdefault(("class", group.grade, group.class_num), []).append(index)
+        self._room_ids = [p.room_id for p in placements]
+        self._swap_classes = [blocks for blocks in self._class_blocks.values() if len(blocks) > 1]
+
+    # --- Scoring ---
+
+    def _teacher_day_penalty(self, teacher_id: int, day: int) -> int:
+        bits = self._teacher_lessons.get(teacher_id, 0) >> (day * self.width) & self._day_full
+        penalty = 0
+        if teacher_id in self._teacher_daily:
+            count = bits.bit_count()
+            for _, limit, weight in self._teacher_daily[teacher_id]:
+                if count > limit:
+                    penalty += (count - limit) * weight
+        if teacher_id in self._teacher_runs:
+            for _, table, weight in self._teacher_runs[teacher_id]:
+                penalty += table[bits] * weight
+        return penalty
+
+    def _group_day_penalty(self, group_id: int, day: int) -> int:
+        rules = self._group_spread.get(group_id)
+        if not rules:
+            return 0
+        count = (self._group_lessons.get(group_id, 0) >> (day * self.width) & self._day_full).bit_count()
+        return sum((count - limit) * weight for _, limit, weight in rules if count > limit)
+
+    def _local_penalty(self, groups: Sequence[SolverGroup], days: Sequence[int]) -> int:
+        """Penalty of the (teacher, day) and (group, day) pairs touched by a move."""
+        teacher_days = {(g.teacher_id, d) for g in groups for d in days}
+        group_days = {(g.id, d) for g in groups for d in days}
+        return (sum(self._teacher_day_penalty(t, d) for t, d in teacher_days)
+                + sum(self._group_day_penalty(gid, d) for gid, d in group_days))
+
+    def score(self) -> int:
+        teachers = set(self._teacher_daily) | set(self._teacher_runs)
+        return (sum(self._teacher_day_penalty(t, d) for t in teachers for d in range(len(self.days)))
+                + sum(self._group_day_penalty(gid, d) for gid in self._group_spread for d in range(len(self.days))))
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        """Penalty and number of violations per constraint."""
+        totals = [{"penalty": 0, "violations": 0} for _ in self.constraints]
+        for d in range(len(self.days)):
+            for teacher_id, rules in self._teacher_daily.items():
+                count = (self._teacher_lessons.get(teacher_id, 0) >> (d * self.width) & self._day_full).bit_count()
+                for c_index, limit, weight in rules:
+                    if count > limit:
+                        totals[c_index]["penalty"] += (count - limit) * weight
+                        totals[c_index]["violations"] += 1
+            for teacher_id, rules in self._teacher_runs.items():
+                bits = self._teacher_lessons.get(teacher_id, 0) >> (d * self.width) & self._day_full
+                for c_index, table, weight in rules:
+                    if table[bits]:
+                        totals[c_index]["penalty"] += table[bits] * weight
+                        totals[c_index]["violations"] += 1
+            for group_id, rules in self._group_spread.items():
+                count = (self._group_lessons.get(group_id, 0) >> (d * self.width) & self._day_full).bit_count()
+                for c_index, limit, weight in rules:
+                    if count > limit:
+                        totals[c_index]["penalty"] += (count - limit) * weight
+                        totals[c_index]["violations"] += 1
+        return [
+            {"constraint_id": c.id, "name": c.label, "rule": c.rule, "weight": c.weight, **totals[i]}
+            for i, c in enumerate(self.constraints)
+        ]
+
+    # --- State changes ---
+
+    def _occupy(self, resources: Sequence[Hashable], bit: int):
+        masks = self.occupancy.masks
+        for resource in resources:
+            masks[resource] = masks.get(resource, 0) | bit
+
+    def _release(self, resources: Sequence[Hashable], bit: int):
+        masks = self.occupancy.masks
+        for resource in resources:
+            masks[resource] &= ~bit
+
+    def _add_lesson(self, group: SolverGroup, bit: int):
+        self._teacher_lessons[group.teacher_id] = self._teacher_lessons.get(group.teacher_id, 0) | bit
+        self._group_lessons[group.id] = self._group_lessons.get(group.id, 0) | bit
+
+    def _remove_lesson(self, group: SolverGroup, bit: int):
+        self._teacher_lessons[group.teacher_id] &= ~bit
+        self._group_lessons[group.id] &= ~bit
+
+    def _move(self, index: int, slot: int):
+        group, old = self._block_groups[index], self._block_slots[index]
+        self._release(self._block_resources[index], 1 << old)
+        self._remove_lesson(group, 1 << old)
+        self._occupy(self._block_resources[index], 1 << slot)
+        self._add_lesson(group, 1 << slot)
+        self._block_slots[index] = slot
+
+    def _swap(self, i: int, j: int):
+        slot_i, slot_j = self._block_slots[i], self._block_slots[j]
+        # Release both first: the blocks share their class (and maybe teacher or room)
+        for index, slot in ((i, slot_i), (j, slot_j)):
+            self._release(self._block_resources[index], 1 << slot)
+            self._remove_lesson(self._block_groups[index], 1 << slot)
+        for index, slot in ((i, slot_j), (j, slot_i)):
+            self._occupy(self._block_resources[index], 1 << slot)
+            self._add_lesson(self._block_groups[index], 1 << slot)
+            self._block_slots[index] = slot
+
+    def _can_move(self, index: int, slot: int) -> bool:
+        return self.occupancy.is_free_bit(self._block_resources[index], 1 << slot)
+
+    def _can_swap(self, i: int, j: int) -> bool:
+        slot_i, slot_j = self._block_slots[i], self._block_slots[j]
+        if slot_i == slot_j:
+            return False
+        masks = self.occupancy.masks
+        res_i, res_j = self._block_resources[i], self._block_resources[j]
+        # A resource of i must be free at j's slot, unless j is the one holding it there
+        for resources, slot, other in ((res_i, slot_j, res_j), (res_j, slot_i, res_i)):
+            bit = 1 << slot
+            for resource in resources:
+                if masks.get(resource, 0) & bit and resource not in other:
+                    return False
+        return True
+
+    # --- Search ---
+
+    def optimize(
+        self,
+        time_limit: float,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        progress_interval: float = 0.5,
+        initial_temperature: Optional[float] = None,
+        final_temperature: float = 0.05,
+    ) -> OptimizeResult:
+        """
+        Simulated annealing for time_limit seconds (geometric cooling over the
+        budget); returns the best timetable seen and its score breakdown.
+        """
+        started = time.perf_counter()
+        score = initial_score = self.score()
+        best_score = score
+        best_slots = list(self._block_slots)
+        blocks = len(self._block_slots)
+        if initial_temperature is None:
+            initial_temperature = float(max((c.weight for c in self.constraints), default=1))
+        initial_temperature = max(1.0, initial_temperature)
+        temperature = initial_temperature
+        cooling = math.log(final_temperature / initial_temperature)
+        next_progress = started + progress_interval
+        iterations = accepted = 0
+        rng = self._rng
+        period_count = self.width
+
+        while blocks and score > 0:
+            iterations += 1
+            if iterations % _CLOCK_CHECK_INTERVAL == 0:
+                now = time.perf_counter()
+                elapsed = now - started
+                if elapsed >= time_limit:
+                    break
+                temperature = initial_temperature * math.exp(cooling * elapsed / time_limit)
+                if on_progress and now >= next_progress:
+                    next_progress = now + progress_interval
+                    on_progress({"score": score, "best_score": best_score, "initial_score": initial_score,
+                                 "iterations": iterations})
+
+            if self._swap_classes and rng.random() < 0.5:
+                members = rng.choice(self._swap_classes)
+                i, j = rng.sample(members, 2)
+                if not self._can_swap(i, j):
+                    continue
+                affected = (self._block_groups[i], self._block_groups[j])
+                days = {self._block_slots[i] // period_count, self._block_slots[j] // period_count}
+                before = self._local_penalty(affected, days)
+                self._swap(i, j)
+                delta = self._local_penalty(affected, days) - before
+                undo = (self._swap, i, j)
+            else:
+                i = rng.randrange(blocks)
+                slot = rng.randrange(self.slot_count)
+                if slot == self._block_slots[i] or not self._can_move(i, slot):
+                    continue
+                old = self._block_slots[i]
+                affected = (self._block_groups[i],)
+                days = {old // period_count, slot // period_count}
+                before = self._local_penalty(affected, days)
+                self._move(i, slot)
+                delta = self._local_penalty(affected, days) - before
+                undo = (self._move, i, old)
+
+            if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+                accepted += 1
+                score += delta
+                if score < best_score:
+                    best_score = score
+                    best_slots = list(self._block_slots)
+            else:
+                undo[0](*undo[1:])
+
+        # Back to the best timetable seen
+        for i, slot in enumerate(best_slots):
+            if self._block_slots[i] != slot:
+                self._release(self._block_resources[i], 1 << self._block_slots[i])
+                self._remove_lesson(self._block_groups[i], 1 << self._block_slots[i])
+        for i, slot in enumerate(best_slots):
+            if self._block_slots[i] != slot:
+                self._block_slots[i] = slot
+                self._occupy(self._block_resources[i], 1 << slot)
+                self._add_lesson(self._block_groups[i], 1 << slot)
+
+        placements = []
+        for i, slot in enumerate(self._block_slots):
+            day, period = self.occupancy.slot_at(slot)
+            placements.append(Placement(group_id=self._block_groups[i].id, day=day, period=period,
+                                        room_id=self._room_ids[i]))
+        return OptimizeResult(
+            placements=placements,
+            initial_score=initial_score,
+            score=self.score(),
+            breakdown=self.breakdown(),
+            iterations=iterations,
+            accepted=accepted,
+            elapsed=time.perf_counter() - started,
+        )
@@ -0,0 +1,247 @@
+"""
+Portfolio solving: one timetable problem searched by several processes at once.
+
+Backtracking search time depends heavily on variable/value ordering, so a
+search that gets stuck with one ordering often finishes instantly with
+another. solve_portfolio() starts one spawn process per Strategy (heuristic,
+seed, restarts), takes the first solved result and terminates the others.
+If nobody solves the problem within the time budget, the best-scoring partial
+result (most placed blocks) is returned.
+
+Workers only receive SolverGroup records and the Occupancy, so this module
+must not import anything that needs the DB (spawned workers import it).
+"""
+from dataclasses import dataclass
+from queue import Empty
+from typing import Dict, List, Optional, Sequence
+import logging
+import multiprocessing
+import os
+import time
+
+from app.services.occupancy import Occupancy
+from app.services.timetable_solver import (
+    TimetableSolver, SolverGroup, SolveResult, ProgressCallback, HEURISTICS,
+    INFEASIBLE, NODE_LIMIT, TIME_LIMIT
+)
+
+logger = logging.getLogger(__name__)
+
+# Node budget of the first restart; later restarts follow the Luby sequence (1 1 2 1 1 2 4 ...)
+RESTART_BASE_NODES = 2000
+# Extra wait for workers to start up and report after the time limit
+PROCESS_GRACE_SECONDS = 10
+
+
+@dataclass
+class Strategy:
+    heuristic: str = "mrv"
+    seed: Optional[int] = None  # None: deterministic tie-breaking
+    restarts: bool = False  # restart with a new seed whenever a node budget runs out
+
+    @property
+    def name(self) -> str:
+        name = self.heuristic
+        if self.seed is not None:
+            name += f"/seed={self.seed}"
+        if self.restarts:
+            name += "/restarts"
+        return name
+
+
+def default_strategies(count: int) -> List[Strategy]:
+    """
+    Worker 0 runs the deterministic MRV search (the single-process engine), so the
+    portfolio is never worse than it apart from start-up time. The others cycle
+    through the heuristics with random tie-breaking, every other one with restarts.
+    """
+    strategies = [Strategy()]
+    for k in range(1, count):
+        strategies.append(Strategy(heuristic=HEURISTICS[k % len(HEURISTICS)], seed=k, restarts=k % 2 == 0))
+    return strategies
+
+
+def _luby(i: int) -> int:
+    """i-th term (1-based) of the Luby sequence."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while (1 << k) - 1 != i:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+def solve_with_strategy(
+    groups: Sequence[SolverGroup],
+    occupancy: Occupancy,
+    strategy: Strategy,
+    node_limit: Optional[int] = None,
+    time_limit: Optional[float] = None,
+    on_progress: Optional[ProgressCallback] = None,
+) -> SolveResult:
+    """Run one strategy in this process; with restarts, keep the deepest result over all runs."""
+    if not strategy.restarts:
+        solver = TimetableSolver(groups, occupancy, heuristic=strategy.heuristic, seed=strategy.seed)
+        result = solver.solve(node_limit=node_limit, time_limit=time_limit, on_progress=on_progress)
+        result.strategy = strategy.name
+        return result
+
+    started = time.perf_counter()
+    deadline = started + time_limit if time_limit is not None else None
+    base_seed = strategy.seed or 0
+    best: Optional[SolveResult] = None
+    nodes = backtracks = 0
+    status = INFEASIBLE
+    run = 0
+    while True:
+        run += 1
+        budget = RESTART_BASE_NODES * _luby(run)
+        if node_limit is not None:
+            budget = min(budget, node_limit - nodes)
+            if budget <= 0:
+                status = NODE_LIMIT
+                break
+        left = deadline - time.perf_counter() if deadline is not None else None
+        if left is not None and left <= 0:
+            status = TIME_LIMIT
+            break
+
+        solver = TimetableSolver(groups, occupancy, heuristic=strategy.heuristic, seed=base_seed * 100003 + run)
+        result = solver.solve(node_limit=budget, time_limit=left, on_progress=on_progress)
+        nodes += result.nodes
+        backtracks += result.backtracks
+        if best is None or len(result.placements) > len(best.placements):
+            best = result
+        if result.status != NODE_LIMIT:
+            # Solved, proven infeasible (full search or blocked groups) or out of time
+            status = result.status
+            break
+
+    best.status = status
+    best.nodes = nodes
+    best.backtracks = backtracks
+    best.elapsed = time.perf_counter() - started
+    best.strategy = f"{strategy.name} x{run}"
+    return best
+
+
+class _ParentGone(Exception):
+    pass
+
+
+def _run_worker(worker: int, groups, occupancy, strategy: Strategy, node_limit, time_limit, parent_pid: int, queue):
+    """(worker process) Solve with one strategy and put ("result", worker, SolveResult) on the queue."""
+    def on_progress(progress):
+        # Stop if the parent was killed (daemon workers are not cleaned up on SIGTERM)
+        if os.getppid() != parent_pid:
+            raise _ParentGone()
+        queue.put(("progress", worker, progress))
+
+    try:
+        result = solve_with_strategy(groups, occupancy, strategy, node_limit, time_limit, on_progress)
+    except _ParentGone:
+        return
+    queue.put(("result", worker, result))
+
+
+def solve_portfolio(
+    groups: Sequence[SolverGroup],
+    occupancy: Occupancy,
+    workers: Optional[int] = None,
+    node_limit: Optional[int] = None,
+    time_limit: Optional[float] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    progress_interval: float = 0.5,
+    strategies: Optional[Sequence[Strategy]] = None,
+) -> SolveResult:
+    """
+    Solve with one process per strategy (default: `workers` strategies, one per CPU).
+
+    node_limit / time_limit apply to every worker. on_progress receives the best
+    progress over all workers. The returned result names the winning strategy.
+    """
+    started = time.perf_counter()
+    groups = [g for g in groups if g.blocks_needed > 0]
+    if strategies is None:
+        strategies = default_strategies(max(1, workers or os.cpu_count() or 1))
+
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    processes = [
+        context.Process(
+            target=_run_worker,
+            args=(i, groups, occupancy, strategy, node_limit, time_limit, os.getpid(), queue),
+            name=f"timetable-portfolio-{i}",
+            daemon=True,
+        )
+        for i, strategy in enumerate(strategies)
+    ]
+    for process in processes:
+        process.start()
+
+    deadline = started + time_limit + PROCESS_GRACE_SECONDS if time_limit is not None else None
+    results: Dict[int, SolveResult] = {}
+    progress: Dict[int, dict] = {}
+    next_progress = started + progress_interval
+    winner: Optional[int] = None
+    try:
+        while len(results) < len(processes):
+            try:
+                kind, worker, payload = queue.get(timeout=0.2)
+            except Empty:
+                if deadline is not None and time.perf_counter() > deadline:
+                    logger.warning("Portfolio workers did not report before the deadline")
+                    break
+                if not any(p.is_alive() for p in processes):
+                    break  # workers died without reporting
+                continue
+
+            if kind == "progress":
+                progress[worker] = payload
+                now = time.perf_counter()
+                if on_progress and now >= next_progress:
+                    next_progress = now + progress_interval
+                    on_progress({
+                        "placed": max(p["placed"] for p in progress.values()),
+                        "best_placed": max(p["best_placed"] for p in progress.values()),
+                        "total": payload["total"],
+                        "nodes": sum(p["nodes"] for p in progress.values()),
+                    })
+                continue
+
+            results[worker] = payload
+            if payload.solved:
+                winner = worker
+                break
+            if payload.status == INFEASIBLE:
+                # Blocked groups or an exhausted search tree: no ordering can do better
+                break
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+
+    if winner is None and results:
+        # Best partial timetable; an infeasibility proof wins ties so the status says so
+        winner = max(results, key=lambda w: (len(results[w].placements), results[w].status == INFEASIBLE, -w))
+    if winner is None:
+        return SolveResult(
+            status=TIME_LIMIT,
+            placements=[],
+            unplaced={g.id: g.blocks_needed for g in groups},
+            elapsed=time.perf_counter() - started,
+        )
+
+    result = results[winner]
+    result.elapsed = time.perf_counter() - started
+    result.strategy = result.strategy or strategies[winner].name
+    logger.info(
+        f"Portfolio of {len(processes)} finished in {result.elapsed:.2f}s: "
+        f"{result.status} by {result.strategy} ({len(results)} reported)"
+    )
+    return result
@@ -0,0 +1,298 @@
+"""
+Incremental repair of an existing timetable (large-neighborhood search).
+
+After a teacher gets a new time-off or a group's total_credits change, most of
+the timetable is still valid. repair_timetable() keeps every block that is
+still fine and only touches:
+- blocks on their teacher's time-off, outside the configured days/periods, or
+  double-booked (the newer of two clashing blocks moves): these are re-placed
+- missing blocks of groups whose credits went up: these are added
+- surplus blocks of groups whose credits went down: these are deleted
+Fixed blocks (is_fixed) are never moved or deleted; their violations are only
+reported.
+
+If the blocks to re-place do not fit around the kept ones, a neighborhood of
+movable blocks sharing a teacher, class or room with the ones that did not fit
+is freed and the whole region is solved again by TimetableSolver. The
+neighborhood grows until the region fits or the time budget runs out. Freed
+blocks try their old slots first and blocks that end up where they were are
+not reported, so the diff stays small.
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+import math
+import random
+import time
+
+from sqlalchemy.orm import Session
+
+from app.models.existing_db import LectureBlock
+from app.services.occupancy import Occupancy, group_resources
+from app.services.schedule_problem import ExistingBlock, SchedulingProblem
+from app.services.timetable_solver import (
+    TimetableSolver, SolverGroup, Placement, SOLVED, INFEASIBLE, TIME_LIMIT
+)
+
+# Why a block has to move
+TIME_OFF = "time_off"
+DOUBLE_BOOKING = "double_booking"
+OUTSIDE_GRID = "outside_grid"
+NEIGHBORHOOD = "neighborhood"  # freed to make room for another block
+SURPLUS_FIXED = "surplus_fixed"  # more fixed blocks than credits
+
+# Nodes per solve attempt before the neighborhood grows
+ATTEMPT_NODE_LIMIT = 20000
+# Share of the candidate blocks freed by the first growth step (doubles each step)
+NEIGHBORHOOD_FRACTION = 0.25
+NEIGHBORHOOD_MIN_BLOCKS = 4
+
+
+@dataclass
+class BlockMove:
+    block_id: int
+    group_id: int
+    from_day: str
+    from_period: int
+    day: str
+    period: int
+    room_id: Optional[int]
+    reason: str
+
+
+@dataclass
+class RepairResult:
+    status: str
+    moves: List[BlockMove] = field(default_factory=list)
+    added: List[Placement] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)  # surplus block ids
+    unplaced: Dict[int, int] = field(default_factory=dict)  # group id -> blocks that could not be placed
+    unresolved: List[Dict[str, Any]] = field(default_factory=list)  # violations of fixed blocks
+    violations: int = 0  # blocks that had to move or go
+    freed: int = 0  # neighborhood size of the last attempt
+    attempts: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def solved(self) -> bool:
+        return self.status == SOLVED
+
+
+def repair_timetable(problem: SchedulingProblem, time_limit: float = 1.0, seed: int = 0) -> RepairResult:
+    """Diff that makes the problem's blocks valid again, touching as few blocks as possible."""
+    started = time.perf_counter()
+    deadline = started + time_limit
+    rng = random.Random(seed)
+    groups = {g.id: g for g in problem.groups}
+
+    # Teacher time-offs and rooms used by other schedules
+    unavailable = problem.build_unavailable()
+
+    # 1. Keep valid blocks: fixed ones first so they win clashes, then older before newer
+    occupancy = Occupancy(problem.days, problem.periods)
+    kept: List[ExistingBlock] = []
+    displaced: List[Tuple[ExistingBlock, str]] = []
+    unresolved: List[Dict[str, Any]] = []
+    for b in sorted(problem.blocks, key=lambda b: (not b.is_fixed, b.id or 0)):
+        resources = group_resources(b.teacher_id, b.grade, b.class_num, b.room_id)
+        bit = occupancy.bit(b.day, b.period)
+        if not bit:
+            reason = OUTSIDE_GRID
+        elif unavailable.masks.get(("teacher", b.teacher_id), 0) & bit:
+            reason = TIME_OFF
+        elif not occupancy.is_free_bit(resources, bit) or not unavailable.is_free_bit(resources, bit):
+            reason = DOUBLE_BOOKING
+        else:
+            reason = None
+        if reason is not None and b.is_fixed:
+            # Fixed blocks stay; the violation is reported (outside the grid they take no slot)
+            unresolved.append(_violation(b, reason))
+            if not bit:
+                continue
+        elif reason is not None:
+            displaced.append((b, reason))
+            continue
+        occupancy.occupy(resources, b.day, b.period)
+        kept.append(b)
+
+    # 2. Credits: delete surplus blocks (displaced ones first, then the newest), count missing ones
+    counts = Counter(b.group_id for b in problem.blocks)
+    removed: List[int] = []
+    missing: Dict[int, int] = {}
+    for group_id, credits in problem.credits.items():
+        surplus = counts[group_id] - credits
+        if surplus < 0:
+            missing[group_id] = -surplus
+            continue
+        if surplus == 0:
+            continue
+        for item in [d for d in displaced if d[0].group_id == group_id][:surplus]:
+            displaced.remove(item)
+            removed.append(item[0].id)
+            surplus -= 1
+        for b in sorted((b for b in kept if b.group_id == group_id and not b.is_fixed),
+                        key=lambda b: b.id or 0, reverse=True)[:surplus]:
+            kept.remove(b)
+            occupancy.release(group_resources(b.teacher_id, b.grade, b.class_num, b.room_id), b.day, b.period)
+            removed.append(b.id)
+            surplus -= 1
+        if surplus > 0:
+            unresolved.append({"group_id": group_id, "reason": SURPLUS_FIXED, "blocks": surplus})
+
+    result = RepairResult(status=SOLVED, removed=removed, unresolved=unresolved,
+                          violations=len(displaced) + len(removed))
+    if not displaced and not missing:
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    # Movable kept blocks by resource (neighborhood candidates)
+    resource_blocks: Dict[Hashable, List[int]] = {}
+    for i, b in enumerate(kept):
+        if not b.is_fixed:
+            for resource in group_resources(b.teacher_id, b.grade, b.class_num, b.room_id):
+                resource_blocks.setdefault(resource, []).append(i)
+
+    # 3. Solve the blocks to place, freeing a growing neighborhood until they fit
+    freed: Set[int] = set()
+    fraction = NEIGHBORHOOD_FRACTION
+    while True:
+        result.attempts += 1
+        keys, solver_groups, preferred = _region(groups, kept, freed, displaced, missing, occupancy)
+        region = Occupancy(problem.days, problem.periods)
+        region.masks = dict(unavailable.masks)
+        for i, b in enumerate(kept):
+            if i not in freed:
+                region.occupy(group_resources(b.teacher_id, b.grade, b.class_num, b.room_id), b.day, b.period)
+
+        left = deadline - time.perf_counter()
+        solve = TimetableSolver(solver_groups, region, preferred_slots=preferred).solve(
+            node_limit=ATTEMPT_NODE_LIMIT, time_limit=max(left, 0)
+        )
+        result.freed = len(freed)
+        if solve.solved:
+            _diff(result, keys, solve.placements, kept, freed, displaced)
+            break
+
+        # Grow around what did not fit (or around the whole region if nothing was placed at all)
+        stuck = set(solve.unplaced) | set(solve.blocked) or set(range(len(keys)))
+        candidates = _neighbors(resource_blocks, [solver_groups[k] for k in stuck], freed)
+        if not candidates:
+            candidates = _neighbors(resource_blocks, solver_groups, freed)
+        if time.perf_counter() >= deadline or solve.status == TIME_LIMIT:
+            result.status = TIME_LIMIT
+        elif not candidates:
+            result.status = INFEASIBLE
+        else:
+            take = max(NEIGHBORHOOD_MIN_BLOCKS, math.ceil(len(candidates) * fraction))
+            freed.update(rng.sample(candidates, min(take, len(candidates))))
+            fraction = min(1.0, fraction * 2)
+            continue
+
+        for k, count in solve.unplaced.items():
+            group_id = keys[k][0]
+            result.unplaced[group_id] = result.unplaced.get(group_id, 0) + count
+        break
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def _violation(b: ExistingBlock, reason: str) -> Dict[str, Any]:
+    return {"block_id": b.id, "group_id": b.group_id, "day": b.day, "period": b.period, "reason": reason}
+
+
+def _region(groups, kept, freed, displaced, missing, occupancy: Occupancy):
+    """
+    Solver groups for everything to place, one per (group, room): displaced and
+    freed blocks keep their room, missing blocks use the subject's required room.
+    Returns the (group id, room id) key of every solver group, the groups and the
+    blocks' old slots as preferred slots (solver group id -> slot mask).
+    """
+    needed: Dict[Tuple[int, Optional[int]], int] = {}
+    old_slots: Dict[Tuple[int, Optional[int]], int] = {}
+    for b in [b for b, _ in displaced] + [kept[i] for i in freed]:
+        key = (b.group_id, b.room_id)
+        needed[key] = needed.get(key, 0) + 1
+        old_slots[key] = old_slots.get(key, 0) | occupancy.bit(b.day, b.period)
+    for group_id, count in missing.items():
+        key = (group_id, groups[group_id].room_id)
+        needed[key] = needed.get(key, 0) + count
+
+    keys = sorted(needed, key=lambda k: (k[0], k[1] or 0))
+    solver_groups = []
+    for index, (group_id, room_id) in enumerate(keys):
+        g = groups[group_id]
+        solver_groups.append(SolverGroup(
+            id=index, teacher_id=g.teacher_id, grade=g.grade, class_num=g.class_num,
+            room_id=room_id, blocks_needed=needed[(group_id, room_id)], subject_id=g.subject_id,
+        ))
+    preferred = {index: old_slots[key] for index, key in enumerate(keys) if old_slots.get(key)}
+    return keys, solver_groups, preferred
+
+
+def _neighbors(resource_blocks, solver_groups, freed) -> List[int]:
+    """Kept movable blocks that share a teacher, class or room with the solver groups."""
+    candidates = set()
+    for g in solver_groups:
+        for resource in group_resources(g.teacher_id, g.grade, g.class_num, g.room_id):
+            candidates.update(resource_blocks.get(resource, ()))
+    return sorted(candidates - freed)
+
+
+def _diff(result: RepairResult, keys, placements: List[Placement], kept, freed, displaced):
+    """Turn the region's placements into moves and additions; blocks placed back on their own slot are unchanged."""
+    new_slots: Dict[int, List[Tuple[str, int]]] = {}
+    for p in placements:
+        new_slots.setdefault(p.group_id, []).append((p.day, p.period))
+
+    old_blocks: Dict[Tuple[int, Optional[int]], List[Tuple[ExistingBlock, str]]] = {}
+    for b, reason in displaced:
+        old_blocks.setdefault((b.group_id, b.room_id), []).append((b, reason))
+    for i in sorted(freed):
+        b = kept[i]
+        old_blocks.setdefault((b.group_id, b.room_id), []).append((b, NEIGHBORHOOD))
+
+    for index, (group_id, room_id) in enumerate(keys):
+        slots = Counter(new_slots.get(index, []))
+        moving = []
+        for b, reason in old_blocks.get((group_id, room_id), []):
+            if slots[(b.day, b.period)] > 0:
+                slots[(b.day, b.period)] -= 1
+            else:
+                moving.append((b, reason))
+        targets = sorted(slots.elements())
+        for (b, reason), (day, period) in zip(moving, targets):
+            result.moves.append(BlockMove(
+                block_id=b.id, group_id=group_id, from_day=b.day, from_period=b.period,
+                day=day, period=period, room_id=room_id, reason=reason,
+            ))
+        for day, period in targets[len(moving):]:
+            result.added.append(Placement(group_id=group_id, day=day, period=period, room_id=room_id))
+
+
+def apply_repair(db: Session, result: RepairResult) -> List[LectureBlock]:
+    """Write a successful repair (caller commits); returns the moved and added blocks."""
+    ids = [m.block_id for m in result.moves] + list(result.removed)
+    blocks = {b.id: b for b in db.query(LectureBlock).filter(LectureBlock.id.in_(ids)).all()} if ids else {}
+    for block_id in result.removed:
+        db.delete(blocks[block_id])
+    if result.removed:
+        # The unit of work flushes inserts before deletes: free the removed blocks' room slots first
+        db.flush()
+    # Rooms are unique per slot: clear them first so moves between each other's slots don't clash mid-flush
+    moved = [blocks[m.block_id] for m in result.moves]
+    if any(block.room_id for block in moved):
+        for block in moved:
+            block.room_id = None
+        db.flush()
+    for block, move in zip(moved, result.moves):
+        block.day = move.day
+        block.period = move.period
+        block.room_id = move.room_id
+    added = [
+        LectureBlock(group_id=p.group_id, day=p.day, period=p.period, room_id=p.room_id, is_fixed=False)
+        for p in result.added
+    ]
+    db.add_all(added)
+    db.flush()
+    return moved + added
@@ -0,0 +1,368 @@
+"""
+Timetable search engine working on plain in-memory records.
+
+AutoScheduler loads groups, existing blocks and time-offs from the DB and
+hands them over as SolverGroup records plus an Occupancy of already taken
+slots, so the search itself never touches the DB (and can be benchmarked
+without one).
+
+Search strategy:
+- every group keeps a domain of free slots (teacher, class and room free) as
+  an int bitmask over the Occupancy grid
+- MRV: the group with the least slack (free slots - blocks still needed) goes next
+- forward checking: placing a block removes that slot from every group sharing
+  the teacher, class or room, and fails early when a group runs out of slots
+- a group's blocks are identical, so they are placed in increasing slot order
+  (symmetry breaking) while value ordering spreads them across the week
+
+The search runs on an explicit stack (no recursion, so any number of blocks)
+and stops at an optional node or wall-clock limit, returning the deepest
+partial timetable it reached together with the blocks it could not place.
+
+The variable ordering can be switched (HEURISTICS) and a seed replaces the
+fixed tie-breaking by a random one, so the solver portfolio can run several
+differently ordered searches of the same problem.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+import random
+import time
+
+from app.services.occupancy import Occupancy, group_resources, iter_bits
+
+SOLVED = "solved"
+INFEASIBLE = "infeasible"  # search space exhausted
+NODE_LIMIT = "node_limit"
+TIME_LIMIT = "time_limit"
+
+# Variable ordering:
+# "mrv"     least slack (free slots - blocks needed), then more blocks left, then higher degree
+# "domain"  fewest free slots, then higher degree
+# "dom_deg" least slack per unit of degree (dom/deg)
+HEURISTICS = ("mrv", "domain", "dom_deg")
+
+# Check the clock every this many nodes
+_CLOCK_CHECK_INTERVAL = 256
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+@dataclass
+class SolverGroup:
+    """A lecture group that still needs `blocks_needed` blocks."""
+    id: int
+    teacher_id: int
+    grade: int
+    class_num: Optional[int]  # None for electives (no class constraint)
+    room_id: Optional[int]  # required facility, if any
+    blocks_needed: int
+    subject_id: Optional[int] = None
+
+
+@dataclass
+class Placement:
+    group_id: int
+    day: str
+    period: int
+    room_id: Optional[int]
+
+
+@dataclass
+class SolveResult:
+    status: str
+    placements: List[Placement]  # all blocks if solved, else the deepest partial assignment
+    unplaced: Dict[int, int] = field(default_factory=dict)  # group id -> blocks left unplaced
+    blocked: List[int] = field(default_factory=list)  # group ids that cannot fit even before searching
+    nodes: int = 0
+    backtracks: int = 0
+    elapsed: float = 0.0
+    strategy: Optional[str] = None  # portfolio strategy that produced the result
+
+    @property
+    def solved(self) -> bool:
+        return self.status == SOLVED
+
+
+class TimetableSolver:
+    def __init__(self, groups: Sequence[SolverGroup], occupancy: Occupancy,
+                 heuristic: str = "mrv", seed: Optional[int] = None,
+                 preferred_slots: Optional[Dict[int, int]] = None):
+        """
+        occupancy: slots already taken before solving (existing blocks, time-offs); not modified.
+        heuristic: variable ordering (see HEURISTICS).
+        seed: random tie-breaking between equally ranked groups and slots; None keeps
+        the deterministic order (group order, earliest slot).
+        preferred_slots: group id -> slot mask tried before any other slot (e.g. where
+        the group's blocks were before a repair, to keep the diff small).
+        """
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"Unknown solver heuristic: {heuristic}")
+        self.heuristic = heuristic
+        self.occupancy = occupancy
+        self.days = occupancy.days
+        self.periods = occupancy.periods
+        self.groups = [g for g in groups if g.blocks_needed > 0]
+        self.slot_count = occupancy.slot_count
+
+        # Resource -> groups using it, group -> resources
+        self._resources: List[List[Hashable]] = []
+        self._resource_groups: Dict[Hashable, List[int]] = {}
+        for index, g in enumerate(self.groups):
+            resources = group_resources(g.teacher_id, g.grade, g.class_num, g.room_id)
+            self._resources.append(resources)
+            for resource in resources:
+                self._resource_groups.setdefault(resource, []).append(index)
+
+        # Domain = slots where the group's teacher, class and room are all free
+        self.domains: List[int] = [occupancy.free_mask(resources) for resources in self._resources]
+
+        self.remaining = [g.blocks_needed for g in self.groups]
+        self._day_counts = [[0] * len(self.days) for _ in self.groups]
+        self._teacher_day_load: Dict[int, List[int]] = {}
+        for g in self.groups:
+            self._teacher_day_load.setdefault(g.teacher_id, [0] * len(self.days))
+        self._active = {index for index, count in enumerate(self.remaining) if count > 0}  # groups with blocks left
+        # Static tie-breaker for MRV: groups sharing resources with many others go first
+        self._degree = [
+            sum(len(self._resource_groups[r]) for r in resources) for resources in self._resources
+        ]
+        preferred_slots = preferred_slots or {}
+        self._preferred = [preferred_slots.get(g.id, 0) for g in self.groups]
+        # Last-resort tie-breakers
+        if seed is None:
+            self._group_rank = list(range(len(self.groups)))
+            self._slot_rank = list(range(self.slot_count))
+        else:
+            rng = random.Random(seed)
+            self._group_rank = [rng.random() for _ in self.groups]
+            self._slot_rank = [rng.random() for _ in range(self.slot_count)]
+
+        # Undo information
+        self._trail: List[Tuple[int, int]] = []  # (group index, slot bits removed from its domain)
+        self._assignments: List[Tuple[int, int, int]] = []  # (group index, slot, trail length before)
+        self._best: List[Tuple[int, int, int]] = []  # deepest assignment seen
+
+        self.nodes = 0
+        self.backtracks = 0
+        self._total = sum(self.remaining)
+        self._on_progress: Optional[ProgressCallback] = None
+
+    def solve(
+        self,
+        node_limit: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        progress_interval: float = 0.5,
+    ) -> SolveResult:
+        """
+        Search for placements of every needed block.
+
+        node_limit caps the number of tried placements, time_limit the wall-clock
+        seconds. When the search does not finish, the result carries the deepest
+        partial assignment seen and which groups are still missing blocks.
+        on_progress is called about every progress_interval seconds with
+        placed / best_placed / total / nodes.
+        """
+        started = time.perf_counter()
+        self._total = sum(self.remaining)
+        self._on_progress = on_progress
+        self._progress_interval = progress_interval
+        self._next_progress = started + progress_interval
+        blocked = self._blocked_groups()
+        if blocked:
+            status = INFEASIBLE
+        else:
+            deadline = started + time_limit if time_limit is not None else None
+            status = self._search(node_limit, deadline)
+
+        if status == SOLVED:
+            best = list(self._assignments)
+        else:
+            best = self._best
+        return SolveResult(
+            status=status,
+            placements=self._to_placements(best),
+            unplaced=self._unplaced(best),
+            blocked=blocked,
+            nodes=self.nodes,
+            backtracks=self.backtracks,
+            elapsed=time.perf_counter() - started,
+        )
+
+    def progress(self) -> Dict[str, Any]:
+        return {
+            "placed": len(self._assignments),
+            "best_placed": len(self._best),
+            "total": self._total,
+            "nodes": self.nodes,
+        }
+
+    def _blocked_groups(self) -> List[int]:
+        """Groups that cannot fit before any search: on their own, or together with
+        the other groups of a teacher, class or room that has fewer free slots than blocks."""
+        blocked = set()
+        for index, domain in enumerate(self.domains):
+            if domain.bit_count() < self.remaining[index]:
+                blocked.add(index)
+        for members in self._resource_groups.values():
+            free = 0
+            for i in members:
+                free |= self.domains[i]
+            if sum(self.remaining[i] for i in members) > free.bit_count():
+                blocked.update(members)
+        return [self.groups[index].id for index in sorted(blocked)]
+
+    def _to_placements(self, assignments: Sequence[Tuple[int, int, int]]) -> List[Placement]:
+        placements = []
+        for index, slot, _ in assignments:
+            day, period = self.occupancy.slot_at(slot)
+            placements.append(Placement(
+                group_id=self.groups[index].id,
+                day=day,
+                period=period,
+                room_id=self.groups[index].room_id,
+            ))
+        return placements
+
+    def _unplaced(self, assignments: Sequence[Tuple[int, int, int]]) -> Dict[int, int]:
+        left = [g.blocks_needed for g in self.groups]
+        for index, _, _ in assignments:
+            left[index] -= 1
+        return {self.groups[index].id: count for index, count in enumerate(left) if count > 0}
+
+    def _search(self, node_limit: Optional[int], deadline: Optional[float]) -> str:
+        """
+        Depth-first search on an explicit stack.
+
+        Each frame is [group index, ordered candidate slots, next candidate position,
+        whether the frame currently holds an assignment]. Undo goes through the trail.
+        """
+        self._best = []
+        index = self._select_group()
+        if index is None:
+            return SOLVED
+        stack = [[index, self._ordered_slots(index), 0, False]]
+
+        while stack:
+            frame = stack[-1]
+            index, slots, position, assigned = frame
+            if assigned:
+                # Coming back from a failed subtree
+                self._unassign()
+                self.backtracks += 1
+                frame[3] = False
+            if position >= len(slots):
+                stack.pop()
+                continue
+            frame[2] = position + 1
+
+            self.nodes += 1
+            if node_limit is not None and self.nodes > node_limit:
+                return NODE_LIMIT
+            if self.nodes % _CLOCK_CHECK_INTERVAL == 0 and (deadline is not None or self._on_progress):
+                now = time.perf_counter()
+                if deadline is not None and now > deadline:
+                    return TIME_LIMIT
+                if self._on_progress and now >= self._next_progress:
+                    self._next_progress = now + self._progress_interval
+                    self._on_progress(self.progress())
+
+            if not self._assign(index, slots[position]):
+                self._unassign()
+                self.backtracks += 1
+                continue
+            frame[3] = True
+            if len(self._assignments) > len(self._best):
+                self._best = list(self._assignments)
+
+            next_index = self._select_group()
+            if next_index is None:
+                return SOLVED
+            stack.append([next_index, self._ordered_slots(next_index), 0, False])
+
+        return INFEASIBLE
+
+    def _select_group(self) -> Optional[int]:
+        """Most constrained group first, as ranked by the heuristic."""
+        if not self._active:
+            return None
+        domains, remaining, degree, rank = self.domains, self.remaining, self._degree, self._group_rank
+        if self.heuristic == "domain":
+            return min(self._active, key=lambda i: (domains[i].bit_count(), -degree[i], rank[i]))
+        if self.heuristic == "dom_deg":
+            return min(
+                self._active,
+                key=lambda i: ((domains[i].bit_count() - remaining[i]) / (degree[i] + 1), rank[i])
+            )
+        return min(
+            self._active,
+            key=lambda i: (domains[i].bit_count() - remaining[i], -remaining[i], -degree[i], rank[i])
+        )
+
+    def _ordered_slots(self, index: int) -> List[int]:
+        """
+        Preferred slots first; then days the group does not use yet, close to the day
+        its k-th block would fall on if spread evenly, on days where the teacher is less loaded.
+        """
+        period_count = len(self.periods)
+        group = self.groups[index]
+        placed = group.blocks_needed - self.remaining[index]
+        ideal_day = placed * len(self.days) / group.blocks_needed
+        day_counts = self._day_counts[index]
+        teacher_load = self._teacher_day_load[group.teacher_id]
+        slot_rank = self._slot_rank
+        preferred = self._preferred[index]
+
+        def key(slot):
+            if preferred >> slot & 1:
+                # Earliest first: symmetry breaking keeps the later preferred slots available
+                return (0, slot)
+            day = slot // period_count
+            return (1, day_counts[day], abs(day - ideal_day), teacher_load[day], slot_rank[slot])
+
+        return sorted(iter_bits(self.domains[index]), key=key)
+
+    def _remove(self, index: int, bits: int):
+        self.domains[index] &= ~bits
+        self._trail.append((index, bits))
+
+    def _assign(self, index: int, slot: int) -> bool:
+        """Place one block; False if forward checking finds a group without enough slots."""
+        self._assignments.append((index, slot, len(self._trail)))
+        group = self.groups[index]
+        day = slot // len(self.periods)
+        self.remaining[index] -= 1
+        if self.remaining[index] == 0:
+            self._active.discard(index)
+        self._day_counts[index][day] += 1
+        self._teacher_day_load[group.teacher_id][day] += 1
+
+        # Symmetry breaking: this group's next blocks go after this slot
+        bit = 1 << slot
+        earlier = self.domains[index] & ((bit << 1) - 1)
+        if earlier:
+            self._remove(index, earlier)
+        if self.domains[index].bit_count() < self.remaining[index]:
+            return False
+
+        # Forward checking on teacher, class and room
+        ok = True
+        for resource in self._resources[index]:
+            for other in self._resource_groups[resource]:
+                if other != index and self.domains[other] & bit:
+                    self._remove(other, bit)
+                    if self.domains[other].bit_count() < self.remaining[other]:
+                        ok = False
+        return ok
+
+    def _unassign(self):
+        index, slot, trail_length = self._assignments.pop()
+        while len(self._trail) > trail_length:
+            other, removed = self._trail.pop()
+            self.domains[other] |= removed
+        group = self.groups[index]
+        day = slot // len(self.periods)
+        self.remaining[index] += 1
+        self._active.add(index)
+        self._day_counts[index][day] -= 1
+        self._teacher_day_load[group.teacher_id][day] -= 1
@@ -1,6 +1,7 @@
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from app.models.existing_db import LectureBlock, TeacherTimeOff, ScheduleConstraint, LectureGroup
+from app.services.occupancy import Occupancy
 from dataclasses import dataclass
 
 @dataclass
@@ -42,53 +43,63 @@ class ScheduleValidator:
         return self.db.query(TeacherTimeOff).all() # Should optimize to filter by teacher_ids in schedule
 
     def _check_double_bookings(self, blocks: List[LectureBlock]):
-        teacher_schedule = {} # (day, period, teacher_id) -> block
-        room_schedule = {}    # (day, period, room_id) -> block
+        # One bitmask per teacher / room; a bit already set means double booking
+        occupancy = Occupancy.covering((b.day for b in blocks), (b.period for b in blocks))
+
+        for index, block in enumerate(blocks):
+            bit = occupancy.bit(block.day, block.period)
 
-        for block in blocks:
             # Teacher Collision
-            t_key = (block.day, block.period, block.group.teacher_id)
-            if t_key in teacher_schedule:
+            if not occupancy.take(("teacher", block.group.teacher_id), bit):
+                first = next(
+                    b for b in blocks[:index]
+                    if b.group.teacher_id == block.group.teacher_id and b.day == block.day and b.period == block.period
+                )
                 self.errors.append({
                     "type": "DOUBLE_BOOKING_TEACHER",
                     "description": f"Teacher {block.group.teacher_id} is double booked at {block.day} period {block.period}",
                     "teacher_id": block.group.teacher_id,
                     "day": block.day,
                     "period": block.period,
-                    "block_ids": [teacher_schedule[t_key].id, block.id]
+                    "block_ids": [first.id, block.id]
                 })
-            else:
-                teacher_schedule[t_key] = block
 
             # Room Collision
-            if block.room_id:
-                r_key = (block.day, block.period, block.room_id)
-                if r_key in room_schedule:
-                    self.errors.append({
-                        "type": "DOUBLE_BOOKING_ROOM",
-                        "description": f"Room {block.room_id} is double booked at {block.day} period {block.period}",
-                        "room_id": block.room_id,
-                        "day": block.day,
-                        "period": block.period,
-                        "block_ids": [room_schedule[r_key].id, block.id]
-                    })
-                else:
-                    room_schedule[r_key] = block
+            if block.room_id and not occupancy.take(("room", block.room_id), bit):
+                first = next(
+                    b for b in blocks[:index]
+                    if b.room_id == block.room_id and b.day == block.day and b.period == block.period
+                )
+                self.errors.append({
+                    "type": "DOUBLE_BOOKING_ROOM",
+                    "description": f"Room {block.room_id} is double booked at {block.day} period {block.period}",
+                    "room_id": block.room_id,
+                    "day": block.day,
+                    "period": block.period,
+                    "block_ids": [first.id, block.id]
+                })
 
     def _check_time_offs(self, blocks: List[LectureBlock], time_offs: List[TeacherTimeOff]):
-        # Index time offs
-        off_map = {} # (teacher_id, day, period) -> reason
+        # Index time offs as one mask per teacher
+        off = Occupancy.covering(
+            [b.day for b in blocks] + [to.day for to in time_offs],
+            [b.period for b in blocks] + [to.period for to in time_offs]
+        )
         for to in time_offs:
-            off_map[(to.teacher_id, to.day, to.period)] = to.reason
+            off.occupy([("teacher", to.teacher_id)], to.day, to.period)
 
         for block in blocks:
-            key = (block.group.teacher_id, block.day, block.period)
-            if key in off_map:
-                self.errors.append({
-                    "type": "CONSTRAINT_VIOLATION_TIME_OFF",
-                    "description": f"Teacher {block.group.teacher_id} has time off at {block.day} period {block.period} ({off_map[key]})",
-                    "teacher_id": block.group.teacher_id,
-                    "day": block.day,
-                    "period": block.period,
-                    "reason": off_map[key]
-                })
+            if off.is_free([("teacher", block.group.teacher_id)], block.day, block.period):
+                continue
+            reason = next(
+                to.reason for to in time_offs
+                if to.teacher_id == block.group.teacher_id and to.day == block.day and to.period == block.period
+            )
+            self.errors.append({
+                "type": "CONSTRAINT_VIOLATION_TIME_OFF",
+                "description": f"Teacher {block.group.teacher_id} has time off at {block.day} period {block.period} ({reason})",
+                "teacher_id": block.group.teacher_id,
+                "day": block.day,
+                "period": block.period,
+                "reason": reason
+            })
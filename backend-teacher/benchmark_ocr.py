@@ -0,0 +1,75 @@
+"""
+OCR 백엔드별 페이지당 처리 시간 벤치마크
+(페이지 전체 인식 vs 레이아웃 기반 영역 인식 비교 포함)
+
+사용법:
+    python benchmark_ocr.py sample.pdf --dpi 300 --repeat 3
+"""
+import sys
+import os
+import argparse
+import statistics
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from pdf2image import convert_from_path
+from app.api.ocr import OCR_BACKENDS, get_ocr_backend, ocr_page
+
+
+def benchmark_backend(name, images, repeat, layout):
+    backend = get_ocr_backend(name)
+    if backend.name != name:
+        print(f"   SKIP: {name} 사용 불가 ({backend.name}로 대체됨)")
+        return None
+
+    # 첫 호출은 언어 모델 로딩이 포함되므로 별도로 측정
+    warmup_start = time.perf_counter()
+    ocr_page(images[0], backend, layout=layout)
+    warmup = time.perf_counter() - warmup_start
+
+    latencies = []
+    for _ in range(repeat):
+        for image in images:
+            start = time.perf_counter()
+            ocr_page(image, backend, layout=layout)
+            latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    return {
+        "warmup": warmup,
+        "mean": statistics.mean(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "max": latencies[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR 백엔드 페이지당 지연 시간 비교")
+    parser.add_argument("pdf", help="측정에 사용할 PDF 파일")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3, help="페이지 반복 횟수")
+    parser.add_argument("--backends", nargs="*", default=list(OCR_BACKENDS.keys()))
+    args = parser.parse_args()
+
+    print(f"1. PDF 변환 ({args.dpi} DPI)...")
+    images = [image.convert("L") for image in convert_from_path(args.pdf, dpi=args.dpi)]
+    print(f"   {len(images)} 페이지")
+
+    print("2. 백엔드별 측정...")
+    for name in args.backends:
+        for layout in (False, True):
+            print(f"   [{name}, {'영역 인식' if layout else '전체 페이지'}]")
+            result = benchmark_backend(name, images, args.repeat, layout)
+            if not result:
+                break
+            print(
+                f"   warmup {result['warmup']:.2f}s | mean {result['mean']:.2f}s | "
+                f"p50 {result['p50']:.2f}s | p95 {result['p95']:.2f}s | max {result['max']:.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
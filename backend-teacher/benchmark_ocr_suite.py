@@ -0,0 +1,365 @@
+"""
+OCR 파이프라인 벤치마크 (합성 생기부 PDF)
+
+생기부와 비슷한 레이아웃(세부능력 및 특기사항 표)의 한글 PDF를
+디지털(텍스트 레이어) / 스캔(래스터 + 노이즈) 두 종류, 여러 페이지 수로 생성한 뒤
+DPI, PSM, 병렬도, OCR 백엔드, 레이아웃 분석 조합별로 추출 파이프라인을 실행하고
+pages/sec, 최대 RSS, 문자 오류율(CER)을 JSON 리포트로 기록합니다.
+각 조합은 별도 프로세스에서 실행되므로 최대 RSS가 서로 섞이지 않습니다.
+
+사용법:
+    python benchmark_ocr_suite.py --font /usr/share/fonts/truetype/nanum/NanumGothic.ttf \\
+        --pages 1 5 10 --dpi 200 300 --psm 4 6 --workers 1 4 --output ocr_report.json
+"""
+import sys
+import os
+import argparse
+import json
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+import multiprocessing
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 한글 글꼴 후보 (--font 미지정 시 순서대로 탐색)
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
+    "/usr/share/fonts/truetype/nanum/NanumMyeongjo.ttf",
+    "/Library/Fonts/NanumGothic.ttf",
+    "/System/Library/Fonts/Supplemental/AppleGothic.ttf",
+    "C:/Windows/Fonts/malgun.ttf",
+    "C:/Windows/Fonts/gulim.ttc",
+]
+
+SUBJECTS = ["국어", "수학", "영어", "한국사", "통합사회", "통합과학", "물리학Ⅰ", "화학Ⅰ", "생명과학Ⅰ", "정보"]
+ACTIVITIES = [
+    "수업 시간에 배운 개념을 바탕으로 탐구 보고서를 작성함",
+    "모둠 활동에서 자료 조사와 발표를 주도적으로 맡아 수행함",
+    "교과서의 예제를 변형하여 스스로 문제를 만들고 풀이 과정을 설명함",
+    "실험 결과를 표와 그래프로 정리하고 오차의 원인을 분석함",
+    "관련 도서를 읽고 핵심 내용을 요약하여 학급 친구들에게 소개함",
+    "토론 수업에서 근거를 들어 자신의 입장을 논리적으로 제시함",
+    "개념 사이의 관계를 마인드맵으로 정리하여 이해를 넓힘",
+]
+QUALITIES = [
+    "학업에 대한 열의가 높고 성실한 태도가 돋보임",
+    "질문을 통해 궁금한 점을 끝까지 해결하려는 태도를 보임",
+    "친구들의 의견을 존중하며 협력적으로 과제를 완성함",
+    "꾸준한 노력으로 학기 초보다 이해 수준이 크게 향상됨",
+    "자신의 생각을 정확한 용어로 표현하는 능력이 뛰어남",
+]
+
+# A4 (pt 단위, 72pt = 1인치)
+PAGE_WIDTH_PT = 595
+PAGE_HEIGHT_PT = 842
+MARGIN_PT = 48
+LABEL_COLUMN_PT = 90
+FONT_SIZE_PT = 10
+LINE_HEIGHT_PT = 15
+RASTER_DPI = 300
+
+
+def find_font(path=None):
+    for candidate in ([path] if path else FONT_CANDIDATES):
+        if candidate and os.path.exists(candidate):
+            return candidate
+    raise SystemExit("한글 글꼴을 찾을 수 없습니다. --font 옵션으로 TTF 경로를 지정하세요.")
+
+
+# --- 합성 문서 생성 ---
+
+def make_paragraph(rng):
+    sentences = [rng.choice(ACTIVITIES) for _ in range(rng.randint(2, 4))] + [rng.choice(QUALITIES)]
+    return ". ".join(sentences) + "."
+
+
+def wrap_text(text, font, width_pt):
+    """글자 단위로 줄바꿈 (한글은 어절 중간 줄바꿈도 허용)"""
+    scale = FONT_SIZE_PT / font.size
+    lines, current = [], ""
+    for char in text:
+        if font.getlength(current + char) * scale > width_pt and current:
+            lines.append(current.rstrip())
+            current = char.lstrip()
+        else:
+            current += char
+    if current:
+        lines.append(current)
+    return lines
+
+
+def layout_page(rng, font, page_number):
+    """
+    한 페이지의 레이아웃을 만듭니다.
+
+    Returns:
+        (texts, rules, ground_truth)
+        texts: [(x_pt, y_pt, text)] (y는 위에서부터)
+        rules: [(x0, y0, x1, y1)] 표 괘선
+        ground_truth: 읽기 순서대로 이어붙인 정답 텍스트
+    """
+    texts, rules, truth = [], [], []
+    title = f"학교생활기록부 - 세부능력 및 특기사항 ({page_number})"
+    texts.append((MARGIN_PT, MARGIN_PT, title))
+    truth.append(title)
+
+    table_left, table_right = MARGIN_PT, PAGE_WIDTH_PT - MARGIN_PT
+    content_left = table_left + LABEL_COLUMN_PT
+    content_width = table_right - content_left - 12
+    y = MARGIN_PT + 30
+    rules.append((table_left, y, table_right, y))
+
+    while True:
+        subject = rng.choice(SUBJECTS)
+        lines = wrap_text(make_paragraph(rng), font, content_width)
+        row_height = len(lines) * LINE_HEIGHT_PT + 12
+        if y + row_height > PAGE_HEIGHT_PT - MARGIN_PT:
+            break
+        texts.append((table_left + 8, y + 6, subject))
+        for idx, line in enumerate(lines):
+            texts.append((content_left + 6, y + 6 + idx * LINE_HEIGHT_PT, line))
+        truth.append(subject)
+        truth.append(" ".join(lines))
+        y += row_height
+        rules.append((table_left, y, table_right, y))
+
+    table_top = MARGIN_PT + 30
+    for x in (table_left, content_left, table_right):
+        rules.append((x, table_top, x, y))
+    return texts, rules, "\n".join(truth)
+
+
+def write_digital_pdf(path, pages, font_path):
+    """텍스트 레이어가 있는 PDF (pdfplumber 직접 추출 대상)"""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+
+    pdfmetrics.registerFont(TTFont("BenchKorean", font_path))
+    pdf = canvas.Canvas(path, pagesize=(PAGE_WIDTH_PT, PAGE_HEIGHT_PT))
+    for texts, rules, _ in pages:
+        pdf.setFont("BenchKorean", FONT_SIZE_PT)
+        for x0, y0, x1, y1 in rules:
+            pdf.line(x0, PAGE_HEIGHT_PT - y0, x1, PAGE_HEIGHT_PT - y1)
+        for x, y, text in texts:
+            pdf.drawString(x, PAGE_HEIGHT_PT - y - FONT_SIZE_PT, text)
+        pdf.showPage()
+    pdf.save()
+
+
+def render_scanned_page(texts, rules, font_path, rng):
+    """페이지를 300 DPI로 래스터화하고 스캔 노이즈(기울어짐, 번짐, 잡음)를 추가합니다."""
+    scale = RASTER_DPI / 72.0
+    image = Image.new("L", (int(PAGE_WIDTH_PT * scale), int(PAGE_HEIGHT_PT * scale)), 255)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.truetype(font_path, int(FONT_SIZE_PT * scale))
+    for x0, y0, x1, y1 in rules:
+        draw.line((x0 * scale, y0 * scale, x1 * scale, y1 * scale), fill=0, width=3)
+    for x, y, text in texts:
+        draw.text((x * scale, y * scale), text, font=font, fill=rng.randint(0, 40))
+
+    image = image.rotate(rng.uniform(-0.8, 0.8), resample=Image.BICUBIC, fillcolor=255)
+    image = image.filter(ImageFilter.GaussianBlur(radius=0.6))
+    pixels = np.asarray(image, dtype=np.float32)
+    noise_rng = np.random.default_rng(rng.randint(0, 2 ** 31))
+    pixels += noise_rng.normal(0, 12, pixels.shape)
+    # 먼지/얼룩 점
+    speckles = noise_rng.random(pixels.shape) < 0.0005
+    pixels[speckles] = 0
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def generate_documents(output_dir, page_counts, font_path, seed):
+    """페이지 수별 디지털/스캔 PDF와 정답 텍스트를 생성합니다."""
+    rng = random.Random(seed)
+    measure_font = ImageFont.truetype(font_path, 100)
+    documents = []
+    for page_count in page_counts:
+        pages = [layout_page(rng, measure_font, n + 1) for n in range(page_count)]
+        truth = [page[2] for page in pages]
+
+        digital_path = os.path.join(output_dir, f"digital_{page_count}p.pdf")
+        try:
+            write_digital_pdf(digital_path, pages, font_path)
+            documents.append({"name": f"digital_{page_count}p", "kind": "digital",
+                              "path": digital_path, "pages": page_count, "truth": truth})
+        except Exception as e:
+            print(f"   디지털 PDF 생성 실패 ({page_count}p, reportlab/TTF 확인 필요): {e}")
+
+        scanned_path = os.path.join(output_dir, f"scanned_{page_count}p.pdf")
+        images = [render_scanned_page(texts, rules, font_path, rng) for texts, rules, _ in pages]
+        images[0].save(scanned_path, "PDF", resolution=RASTER_DPI, save_all=True, append_images=images[1:])
+        documents.append({"name": f"scanned_{page_count}p", "kind": "scanned",
+                          "path": scanned_path, "pages": page_count, "truth": truth})
+    return documents
+
+
+# --- 측정 ---
+
+def edit_distance(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(predicted_pages, truth_pages):
+    """공백을 제거한 뒤 페이지별 편집 거리 합 / 정답 글자 수"""
+    errors, total = 0, 0
+    for predicted, truth in zip(predicted_pages, truth_pages):
+        predicted = "".join((predicted or "").split())
+        truth = "".join(truth.split())
+        errors += edit_distance(predicted, truth)
+        total += len(truth)
+    return errors / total if total else 0.0
+
+
+def peak_rss_mb(who):
+    if resource is None:
+        return None
+    usage = resource.getrusage(who).ru_maxrss
+    # Linux는 KB, macOS는 byte 단위
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def run_config(document, config):
+    """(별도 프로세스에서) 한 문서를 주어진 설정으로 추출합니다."""
+    from app.api.ocr import _inspect_document, get_ocr_backend, ocr_pdf_page
+
+    start = time.perf_counter()
+    digital_pages, page_count = _inspect_document(document["path"])
+    if digital_pages is not None:
+        page_texts = digital_pages
+    else:
+        backend = get_ocr_backend(config["backend"], psm=config["psm"])
+        if backend.name != config["backend"]:
+            return {"skipped": f"{config['backend']} 사용 불가"}
+        with ThreadPoolExecutor(max_workers=config["workers"]) as executor:
+            page_texts = list(executor.map(
+                lambda n: ocr_pdf_page(document["path"], n, backend, config["dpi"], config["layout"]),
+                range(1, page_count + 1)
+            ))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "method": "direct" if digital_pages is not None else "ocr",
+        "elapsed_sec": elapsed,
+        "pages_per_sec": page_count / elapsed if elapsed else None,
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        # pytesseract는 tesseract를 자식 프로세스로 실행하므로 별도로 기록
+        "children_peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+        "cer": character_error_rate(page_texts, document["truth"]),
+    }
+
+
+def build_configs(args):
+    configs = []
+    for backend in args.backends:
+        for dpi in args.dpi:
+            for psm in args.psm:
+                for workers in args.workers:
+                    for layout in args.layout:
+                        configs.append({"backend": backend, "dpi": dpi, "psm": psm,
+                                        "workers": workers, "layout": layout})
+    return configs
+
+
+def tesseract_version():
+    try:
+        output = subprocess.run(["tesseract", "--version"], capture_output=True, text=True, timeout=10)
+        return (output.stdout or output.stderr).splitlines()[0]
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 생기부 PDF로 OCR 파이프라인 벤치마크")
+    parser.add_argument("--font", help="한글 TTF 글꼴 경로")
+    parser.add_argument("--pages", type=int, nargs="*", default=[1, 5, 10])
+    parser.add_argument("--dpi", type=int, nargs="*", default=[200, 300])
+    parser.add_argument("--psm", type=int, nargs="*", default=[6])
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--backends", nargs="*", default=["pytesseract", "tesserocr"])
+    parser.add_argument("--layout", type=lambda v: v.lower() == "true", nargs="*", default=[False, True],
+                        help="레이아웃 기반 영역 인식 여부 (true/false)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", help="생성한 PDF를 보관할 디렉터리")
+    parser.add_argument("--output", default="ocr_benchmark_report.json")
+    args = parser.parse_args()
+
+    font_path = find_font(args.font)
+    output_dir = args.keep or tempfile.mkdtemp(prefix="ocr_bench_")
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"1. 합성 문서 생성 (글꼴: {font_path})...")
+    documents = generate_documents(output_dir, args.pages, font_path, args.seed)
+    print(f"   {len(documents)}개 문서 -> {output_dir}")
+
+    configs = build_configs(args)
+    print(f"2. 측정 ({len(configs)}개 설정)...")
+    results = []
+    # 조합마다 새 프로세스를 사용해 엔진 초기화 비용과 최대 RSS를 독립적으로 측정
+    context = multiprocessing.get_context("spawn")
+    for document in documents:
+        # 디지털 PDF는 OCR 설정과 무관하므로 한 번만 측정
+        document_configs = configs[:1] if document["kind"] == "digital" else configs
+        for config in document_configs:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                try:
+                    measured = executor.submit(run_config, document, config).result()
+                except Exception as e:
+                    measured = {"error": str(e)}
+            entry = {
+                "document": document["name"],
+                "kind": document["kind"],
+                "pages": document["pages"],
+                "config": None if document["kind"] == "digital" else config,
+                **measured,
+            }
+            results.append(entry)
+            if "pages_per_sec" in measured:
+                print(f"   {document['name']:<14} {json.dumps(entry['config'])} -> "
+                      f"{measured['pages_per_sec']:.2f} pages/s, CER {measured['cer']:.3f}")
+            else:
+                print(f"   {document['name']:<14} {json.dumps(entry['config'])} -> "
+                      f"{measured.get('skipped') or measured.get('error')}")
+
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "tesseract": tesseract_version(),
+        },
+        "parameters": {
+            "pages": args.pages, "seed": args.seed, "font": os.path.basename(font_path),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"3. 리포트 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
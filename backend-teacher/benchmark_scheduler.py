@@ -0,0 +1,133 @@
+"""
+자동 시간표 배정 엔진 벤치마크 (기존 순차 백트래킹 vs MRV + forward checking vs 병렬 portfolio)
+
+DB 없이 benchmark_scheduler_suite와 같은 가상 고등학교(학년 x 반, 교과별 교사, 특별실, 선택과목, 교사 불가 시간)를 만들어
+AutoScheduler의 엔진들로 같은 문제를 풀고 소요 시간과 탐색 노드 수를 비교합니다.
+모든 엔진이 탐색 시간 제한(--timeout)을 받고, 혹시 멈추지 않는 경우를 대비해 별도 프로세스에서 실행합니다.
+portfolio 엔진은 --workers의 프로세스 수마다 실행해 1개일 때 대비 속도 향상을 함께 출력합니다.
+
+사용법:
+    python benchmark_scheduler.py --sizes 2 5 10 --timeout 60
+    python benchmark_scheduler.py --sizes 10 14 --engines mrv portfolio --workers 1 2 4 8
+"""
+import sys
+import os
+import argparse
+import json
+import multiprocessing
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_scheduler_suite import generate_instance
+
+MAX_TEACHER_HOURS = 18
+
+
+def generate_school(grades, classes_per_grade, seed=0, max_teacher_hours=MAX_TEACHER_HOURS):
+    """
+    benchmark_scheduler_suite의 가상 고등학교 생성기로 문제를 만들되 교사 주당 시수를 고정
+    (교사 주당 시수가 클수록 교사 수가 줄어 어려워짐, 소프트 제약은 빼고 탐색만 비교)
+    """
+    instance = generate_instance(grades, classes_per_grade, seed, max_teacher_hours=max_teacher_hours)
+    problem = instance["problem"]
+    problem.constraints = []
+    return {
+        "classes": instance["classes"],
+        "teachers": instance["teachers"],
+        "rooms": sum(instance["rooms"].values()),
+        "blocks": instance["blocks"],
+        "problem": problem,
+    }
+
+
+def run_engine(engine, school, result_queue, workers=None):
+    """AutoScheduler의 탐색 부분만 실행 (DB 조회 단계 대신 생성한 문제 사용)"""
+    from app.services.scheduler import AutoScheduler, SchedulingError
+
+    scheduler = AutoScheduler(None, 0, 0, engine=engine, time_limit=school["time_limit"], workers=workers)
+    start = time.perf_counter()
+    try:
+        scheduler.solve_problem(school["problem"])
+        solved = True
+    except SchedulingError:
+        solved = False
+    elapsed = time.perf_counter() - start
+    result_queue.put({
+        "solved": solved,
+        "seconds": round(elapsed, 3),
+        "blocks_created": len(scheduler.created_blocks),
+        "nodes": scheduler.stats.get("nodes"),
+        "strategy": scheduler.stats.get("strategy"),
+        "error": None if solved else scheduler.stats.get("status"),
+    })
+
+
+def run_with_timeout(engine, school, timeout, workers=None):
+    context = multiprocessing.get_context("spawn")
+    result_queue = context.Queue()
+    process = context.Process(target=run_engine, args=(engine, school, result_queue, workers))
+    process.start()
+    # 엔진 자체 제한 시간 + 프로세스 시작/결과 전달 여유
+    process.join(timeout + 30)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        return {"solved": False, "seconds": timeout, "error": "timeout"}
+    if result_queue.empty():
+        return {"solved": False, "seconds": None, "error": f"exit code {process.exitcode}"}
+    return result_queue.get()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="자동 시간표 배정 엔진 벤치마크")
+    parser.add_argument("--grades", type=int, default=3)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 5, 10], help="학년당 학급 수 목록")
+    parser.add_argument("--engines", nargs="+", default=["legacy", "mrv"], help="legacy / mrv / portfolio")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4],
+                        help="portfolio 엔진 프로세스 수 목록 (CPU %d개)" % (os.cpu_count() or 1))
+    parser.add_argument("--timeout", type=float, default=60, help="엔진별 제한 시간 (초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--teacher-hours", type=int, default=MAX_TEACHER_HOURS, help="교사 한 명의 최대 주당 시수")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    results = []
+    for classes_per_grade in args.sizes:
+        school = generate_school(args.grades, classes_per_grade, args.seed, args.teacher_hours)
+        school["time_limit"] = args.timeout
+        print(f"[{args.grades}개 학년 x {classes_per_grade}반] 학급 {school['classes']}, 교사 {school['teachers']}, "
+              f"특별실 {school['rooms']}, 블록 {school['blocks']}, 교사 불가 시간 {len(school['problem'].time_offs)}")
+        for engine in args.engines:
+            baseline = None
+            for workers in (args.workers if engine == "portfolio" else [None]):
+                result = run_with_timeout(engine, school, args.timeout, workers)
+                status = "OK" if result["solved"] else f"FAIL ({result.get('error') or 'no solution'})"
+                nodes = f", nodes {result['nodes']}" if result.get("nodes") is not None else ""
+                label = engine if workers is None else f"{engine} x{workers}"
+                extra = ""
+                if workers is not None:
+                    # 같은 제한 시간 안에서 프로세스 1개 대비 (실패한 경우 제한 시간을 소요 시간으로 봄)
+                    seconds = result["seconds"] if result["solved"] else args.timeout
+                    if baseline is None:
+                        baseline = seconds
+                    result["speedup"] = round(baseline / seconds, 2) if seconds else None
+                    extra = f", speedup {result['speedup']}" + (f" ({result['strategy']})" if result.get("strategy") else "")
+                print(f"   {label:>13}: {status}, {result['seconds']}s{nodes}{extra}")
+                results.append({
+                    "classes_per_grade": classes_per_grade,
+                    "blocks": school["blocks"],
+                    "engine": engine,
+                    "workers": workers,
+                    **result,
+                })
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
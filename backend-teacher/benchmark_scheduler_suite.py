@@ -0,0 +1,398 @@
+"""
+자동 시간표 배정 벤치마크 스위트 (생성한 고등학교 인스턴스, JSON 리포트)
+
+DB 없이 실제 고등학교와 비슷한 문제를 만들어 AutoScheduler 엔진별로 풀고 결과를 기록합니다.
+- 학년 x 반, 학년별 교육과정 (1학년 공통과목, 2~3학년 공통 + 선택과목)
+- 교과(부서)별 교사, 교사마다 주당 최대 시수(max_hours_per_week)를 넘지 않도록 수업 배정
+- 특별실 (과학실, 음악실, 미술실, 컴퓨터실), 교사 불가 시간
+- 선택과목은 학급 없는 그룹(class_num=None)으로, 학생 선택 인원에 따라 분반 수 결정
+- 소프트 제약 (교사 일일 시수, 연속 수업, 과목 요일 분산)
+
+학급 수별로 --seeds개 인스턴스를 만들고, 엔진마다 풀이 시간, 탐색 노드 수, 성공률,
+소프트 제약 점수(최적화 전/후)를 측정합니다. 각 실행은 별도 프로세스에서 제한 시간과 함께 실행되며,
+결과 JSON의 summary를 --baseline으로 넘기면 이전 리포트(다른 커밋의 솔버)와 비교해 출력합니다.
+
+사용법:
+    python benchmark_scheduler_suite.py --sizes 4 8 12 --seeds 5 --engines mrv portfolio --output before.json
+    python benchmark_scheduler_suite.py --sizes 4 8 12 --seeds 5 --engines mrv portfolio --baseline before.json
+"""
+import sys
+import os
+import argparse
+import json
+import math
+import multiprocessing
+import platform
+import random
+import statistics
+import time
+from datetime import datetime
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.occupancy import group_resources
+from app.services.schedule_problem import SchedulingProblem
+from app.services.soft_constraints import parse_constraint
+from app.services.timetable_solver import SolverGroup
+
+DAYS = ["MON", "TUE", "WED", "THU", "FRI"]
+PERIODS = list(range(1, 8))
+
+# 교과(부서) -> 담당 과목
+DEPARTMENTS = {
+    "국어과": ["국어", "문학", "화법과 작문", "언어와 매체"],
+    "수학과": ["수학", "수학Ⅰ", "수학Ⅱ", "확률과 통계", "미적분"],
+    "영어과": ["영어", "영어Ⅰ", "영어Ⅱ", "영어 독해와 작문"],
+    "사회과": ["한국사", "통합사회", "경제", "사회·문화", "윤리와 사상", "한국지리", "세계사"],
+    "과학과": ["통합과학", "과학탐구실험", "물리학Ⅰ", "화학Ⅰ", "생명과학Ⅰ", "지구과학Ⅰ", "물리학Ⅱ", "화학Ⅱ", "생명과학Ⅱ"],
+    "예체능과": ["체육", "운동과 건강", "음악", "미술"],
+    "정보·진로": ["정보", "진로와 직업"],
+}
+SUBJECT_DEPARTMENT = {subject: dept for dept, subjects in DEPARTMENTS.items() for subject in subjects}
+
+# 학년별 공통 과목: (과목, 주당 시수, 특별실 종류)
+CORE_CURRICULUM = {
+    1: [
+        ("국어", 4, None), ("수학", 4, None), ("영어", 4, None), ("한국사", 3, None),
+        ("통합사회", 3, None), ("통합과학", 3, None), ("과학탐구실험", 2, "lab"), ("체육", 2, None),
+        ("음악", 2, "music"), ("미술", 2, "art"), ("정보", 1, "computer"), ("진로와 직업", 1, None),
+    ],
+    2: [
+        ("문학", 4, None), ("수학Ⅰ", 4, None), ("영어Ⅰ", 4, None), ("체육", 2, None),
+        ("음악", 1, "music"), ("진로와 직업", 1, None),
+    ],
+    3: [
+        ("화법과 작문", 4, None), ("확률과 통계", 4, None), ("영어Ⅱ", 4, None), ("운동과 건강", 2, None),
+        ("미술", 1, "art"),
+    ],
+}
+# 학년별 선택과목 (과목, 주당 시수, 특별실 종류)과 학생 한 명이 고르는 과목 수
+ELECTIVES = {
+    2: [
+        ("물리학Ⅰ", 3, "lab"), ("화학Ⅰ", 3, "lab"), ("생명과학Ⅰ", 3, "lab"), ("지구과학Ⅰ", 3, "lab"),
+        ("경제", 3, None), ("사회·문화", 3, None), ("윤리와 사상", 3, None), ("한국지리", 3, None),
+        ("수학Ⅱ", 3, None),
+    ],
+    3: [
+        ("물리학Ⅱ", 3, "lab"), ("화학Ⅱ", 3, "lab"), ("생명과학Ⅱ", 3, "lab"), ("미적분", 3, None),
+        ("세계사", 3, None), ("언어와 매체", 3, None), ("영어 독해와 작문", 3, None), ("정보", 2, "computer"),
+    ],
+}
+ELECTIVE_PICKS = 3
+STUDENTS_PER_CLASS = 28
+ELECTIVE_SECTION_SIZE = 25  # 선택과목 분반 최대 인원
+
+TEACHER_MAX_HOURS = [16, 17, 18, 18, 19, 20]  # 교사별 주당 최대 시수 후보
+ROOM_UTILIZATION = 0.6  # 특별실 하나가 주당 슬롯의 이 비율까지만 쓰이도록 개수 결정
+TIME_OFF_RATE = 0.2  # 불가 시간이 있는 교사 비율
+
+# 소프트 제약 (ScheduleConstraint.configuration, weight, target_type)
+SOFT_CONSTRAINTS = [
+    ("교사 일일 4시간 이하", '{"max_hours": 4}', 100, "GLOBAL"),
+    ("교사 연속 3시간 이하", '{"max_periods": 3}', 50, "GLOBAL"),
+    ("과목 하루 1회", '{"max_per_day": 1}', 30, "GLOBAL"),
+]
+
+
+def grade_courses(rng, grade, classes):
+    """학년의 (과목, 시수, 특별실, 학급 번호 또는 None) 목록 (선택과목은 선택 인원에 따른 분반)"""
+    courses = [(name, hours, room, class_num)
+               for name, hours, room in CORE_CURRICULUM[grade] for class_num in range(1, classes + 1)]
+    options = ELECTIVES.get(grade, [])
+    if options:
+        # 과목별 인기도에 따라 학생 선택을 나눈 뒤 분반 수 계산
+        popularity = [rng.uniform(0.5, 1.5) for _ in options]
+        picks = classes * STUDENTS_PER_CLASS * ELECTIVE_PICKS
+        for (name, hours, room), weight in zip(options, popularity):
+            students = picks * weight / sum(popularity)
+            for _ in range(max(1, math.ceil(students / ELECTIVE_SECTION_SIZE))):
+                courses.append((name, hours, room, None))
+    return courses
+
+
+def generate_instance(grades, classes_per_grade, seed=0, max_teacher_hours=None):
+    """
+    가상 고등학교 한 곳의 SchedulingProblem과 구성 정보 생성
+    max_teacher_hours를 주면 모든 교사의 주당 최대 시수를 그 값으로 고정 (없으면 TEACHER_MAX_HOURS 중 무작위)
+    """
+    rng = random.Random(seed)
+    subject_ids = {}
+    courses = []
+    for grade in range(1, grades + 1):
+        for name, hours, room, class_num in grade_courses(rng, min(grade, 3), classes_per_grade):
+            subject_ids.setdefault(name, len(subject_ids) + 1)
+            courses.append((grade, name, hours, room, class_num))
+
+    # 특별실: 종류별 총 사용 시수에 맞춰 개수 결정
+    slot_count = len(DAYS) * len(PERIODS)
+    room_hours = {}
+    for _, _, hours, room, _ in courses:
+        if room:
+            room_hours[room] = room_hours.get(room, 0) + hours
+    rooms = {}
+    next_room_id = 1
+    for room_type, hours in sorted(room_hours.items()):
+        count = math.ceil(hours / (slot_count * ROOM_UTILIZATION))
+        rooms[room_type] = list(range(next_room_id, next_room_id + count))
+        next_room_id += count
+    room_turn = {room_type: 0 for room_type in rooms}
+
+    # 교과별로 학년/과목/학급 순서대로 교사에게 최대 시수까지 배정 (넘으면 새 교사)
+    teachers = []  # {"id", "department", "max_hours_per_week", "hours"}
+    current = {}  # 교과 -> 지금 배정 중인 교사
+    groups = []
+    for dept in DEPARTMENTS:
+        for grade, name, hours, room, class_num in courses:
+            if SUBJECT_DEPARTMENT[name] != dept:
+                continue
+            teacher = current.get(dept)
+            if teacher is None or teacher["hours"] + hours > teacher["max_hours_per_week"]:
+                teacher = {
+                    "id": len(teachers) + 1,
+                    "department": dept,
+                    "max_hours_per_week": max_teacher_hours or rng.choice(TEACHER_MAX_HOURS),
+                    "hours": 0,
+                }
+                teachers.append(teacher)
+                current[dept] = teacher
+            teacher["hours"] += hours
+            room_id = None
+            if room:
+                room_id = rooms[room][room_turn[room] % len(rooms[room])]
+                room_turn[room] += 1
+            groups.append(SolverGroup(
+                id=len(groups) + 1,
+                teacher_id=teacher["id"],
+                grade=grade,
+                class_num=class_num,
+                room_id=room_id,
+                blocks_needed=hours,
+                subject_id=subject_ids[name],
+            ))
+
+    # 일부 교사는 2~3개 시간 불가 (연수, 출장 등)
+    time_offs = set()
+    for teacher in teachers:
+        if rng.random() < TIME_OFF_RATE:
+            for _ in range(rng.randint(2, 3)):
+                time_offs.add((teacher["id"], rng.choice(DAYS), rng.choice(PERIODS)))
+
+    constraints = [
+        parse_constraint(configuration, weight, target_type, id=i + 1, name=name)
+        for i, (name, configuration, weight, target_type) in enumerate(SOFT_CONSTRAINTS)
+    ]
+
+    return {
+        "grades": grades,
+        "classes_per_grade": classes_per_grade,
+        "seed": seed,
+        "classes": grades * classes_per_grade,
+        "teachers": len(teachers),
+        "departments": {dept: sum(1 for t in teachers if t["department"] == dept) for dept in DEPARTMENTS},
+        "teacher_load": round(sum(t["hours"] for t in teachers) / sum(t["max_hours_per_week"] for t in teachers), 3),
+        "rooms": {room_type: len(ids) for room_type, ids in rooms.items()},
+        "groups": len(groups),
+        "electives": sum(1 for g in groups if g.class_num is None),
+        "blocks": sum(g.blocks_needed for g in groups),
+        "time_offs": len(time_offs),
+        "problem": SchedulingProblem(
+            schedule_id=0, days=DAYS, periods=PERIODS, groups=groups, time_offs=sorted(time_offs),
+            constraints=constraints, credits={g.id: g.blocks_needed for g in groups},
+        ),
+    }
+
+
+def check_solution(problem, blocks):
+    """배정 결과의 하드 제약 위반 수 (교사/학급/특별실 중복, 불가 시간, 시수 누락)"""
+    occupancy = problem.build_occupancy()
+    by_id = {g.id: g for g in problem.groups}
+    violations = 0
+    placed = {}
+    for block in blocks:
+        group = by_id[block.group_id]
+        resources = group_resources(group.teacher_id, group.grade, group.class_num, block.room_id)
+        if not occupancy.is_free(resources, block.day, block.period):
+            violations += 1
+            continue
+        occupancy.occupy(resources, block.day, block.period)
+        placed[group.id] = placed.get(group.id, 0) + 1
+    violations += sum(abs(g.blocks_needed - placed.get(g.id, 0)) for g in problem.groups)
+    return violations
+
+
+def run_engine(engine, problem, time_limit, optimize_seconds, workers, result_queue):
+    """AutoScheduler의 탐색/최적화 부분만 실행 (DB 조회 단계 대신 생성한 문제 사용)"""
+    from app.services.scheduler import AutoScheduler, SchedulingError
+
+    scheduler = AutoScheduler(None, 0, 0, engine=engine, time_limit=time_limit, workers=workers,
+                              optimize_seconds=optimize_seconds)
+    start = time.perf_counter()
+    try:
+        blocks = scheduler.solve_problem(problem)
+        solved = True
+    except SchedulingError:
+        blocks = []
+        solved = False
+    elapsed = time.perf_counter() - start
+    result_queue.put({
+        "solved": solved,
+        "seconds": round(elapsed, 3),
+        # legacy 엔진은 SolveResult가 없으므로 전체 시간에서 최적화 시간을 빼서 계산
+        "solve_seconds": round(elapsed - scheduler.stats.get("optimize_seconds", 0), 3),
+        "optimize_seconds": scheduler.stats.get("optimize_seconds"),
+        "nodes": scheduler.stats.get("nodes"),
+        "backtracks": scheduler.stats.get("backtracks"),
+        "strategy": scheduler.stats.get("strategy"),
+        "initial_score": scheduler.stats.get("initial_score", scheduler.stats.get("score")),
+        "score": scheduler.stats.get("score"),
+        "score_breakdown": scheduler.stats.get("score_breakdown"),
+        "violations": check_solution(problem, blocks) if solved else None,
+        "error": None if solved else scheduler.stats.get("status"),
+    })
+
+
+def run_with_timeout(engine, problem, args):
+    context = multiprocessing.get_context("spawn")
+    result_queue = context.Queue()
+    process = context.Process(
+        target=run_engine,
+        args=(engine, problem, args.timeout, args.optimize_seconds,
+              args.workers if engine == "portfolio" else None, result_queue),
+    )
+    process.start()
+    # 엔진 자체 제한 시간 + 최적화 시간 + 프로세스 시작/결과 전달 여유
+    process.join(args.timeout + args.optimize_seconds + 30)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        return {"solved": False, "seconds": args.timeout, "error": "timeout"}
+    if result_queue.empty():
+        return {"solved": False, "seconds": None, "error": f"exit code {process.exitcode}"}
+    return result_queue.get()
+
+
+def summarize(results):
+    """(학급 수, 엔진)별 성공률과 풀이 시간/노드/점수 중앙값"""
+    summary = []
+    keys = []
+    for r in results:
+        key = (r["classes_per_grade"], r["engine"])
+        if key not in keys:
+            keys.append(key)
+    for classes_per_grade, engine in keys:
+        runs = [r for r in results if r["classes_per_grade"] == classes_per_grade and r["engine"] == engine]
+        solved = [r for r in runs if r["solved"]]
+
+        def median(field):
+            values = [r[field] for r in solved if r.get(field) is not None]
+            return round(statistics.median(values), 3) if values else None
+
+        summary.append({
+            "classes_per_grade": classes_per_grade,
+            "engine": engine,
+            "runs": len(runs),
+            "solved": len(solved),
+            "success_rate": round(len(solved) / len(runs), 3),
+            "median_seconds": median("seconds"),
+            "median_solve_seconds": median("solve_seconds"),
+            "median_nodes": median("nodes"),
+            "median_initial_score": median("initial_score"),
+            "median_score": median("score"),
+            "invalid": sum(1 for r in solved if r.get("violations")),
+        })
+    return summary
+
+
+def compare(summary, baseline_path):
+    """이전 리포트의 summary와 같은 (학급 수, 엔진) 항목끼리 비교"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(s["classes_per_grade"], s["engine"]): s for s in json.load(f)["summary"]}
+    comparison = []
+    for s in summary:
+        before = baseline.get((s["classes_per_grade"], s["engine"]))
+        if before is None:
+            continue
+        entry = {"classes_per_grade": s["classes_per_grade"], "engine": s["engine"]}
+        for field in ("success_rate", "median_solve_seconds", "median_nodes", "median_score"):
+            entry[field] = {"before": before.get(field), "after": s.get(field)}
+        comparison.append(entry)
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="생성한 고등학교 인스턴스로 자동 시간표 배정 엔진 벤치마크")
+    parser.add_argument("--grades", type=int, default=3)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 8, 12], help="학년당 학급 수 목록")
+    parser.add_argument("--seeds", type=int, default=3, help="학급 수마다 생성할 인스턴스 수")
+    parser.add_argument("--seed", type=int, default=0, help="첫 인스턴스 시드")
+    parser.add_argument("--engines", nargs="+", default=["mrv", "portfolio"], help="legacy / mrv / portfolio")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="portfolio 엔진 프로세스 수 (기본: CPU 수 %d)" % (os.cpu_count() or 1))
+    parser.add_argument("--timeout", type=float, default=30, help="실행별 탐색 제한 시간 (초)")
+    parser.add_argument("--optimize-seconds", type=float, default=2, help="배정 후 소프트 제약 최적화 시간 (초)")
+    parser.add_argument("--baseline", help="비교할 이전 리포트 JSON")
+    parser.add_argument("--output", default="scheduler_benchmark_report.json")
+    args = parser.parse_args()
+
+    instances = []
+    results = []
+    print(f"1. 인스턴스 생성 및 측정 ({len(args.sizes)}개 규모 x {args.seeds}개, 엔진 {', '.join(args.engines)})...")
+    for classes_per_grade in args.sizes:
+        for seed in range(args.seed, args.seed + args.seeds):
+            instance = generate_instance(args.grades, classes_per_grade, seed)
+            problem = instance.pop("problem")
+            instances.append(instance)
+            print(f"   [{args.grades}개 학년 x {classes_per_grade}반, seed {seed}] 교사 {instance['teachers']} "
+                  f"(시수 {instance['teacher_load']:.0%}), 특별실 {sum(instance['rooms'].values())}, "
+                  f"그룹 {instance['groups']} (선택 {instance['electives']}), 블록 {instance['blocks']}, "
+                  f"불가 시간 {instance['time_offs']}")
+            for engine in args.engines:
+                result = run_with_timeout(engine, problem, args)
+                status = "OK" if result["solved"] else f"FAIL ({result.get('error') or 'no solution'})"
+                nodes = f", nodes {result['nodes']}" if result.get("nodes") is not None else ""
+                score = f", score {result['initial_score']} -> {result['score']}" if result.get("score") is not None else ""
+                invalid = f", 위반 {result['violations']}" if result.get("violations") else ""
+                print(f"      {engine:>9}: {status}, {result['seconds']}s{nodes}{score}{invalid}")
+                results.append({"classes_per_grade": classes_per_grade, "seed": seed, "engine": engine, **result})
+
+    summary = summarize(results)
+    print("2. 요약")
+    for s in summary:
+        seconds = "-"
+        if s["median_solve_seconds"] is not None:
+            seconds = f"{s['median_solve_seconds']}s (최적화 포함 {s['median_seconds']}s)"
+        print(f"   {s['classes_per_grade']:>3}반 {s['engine']:>9}: 성공 {s['solved']}/{s['runs']}, "
+              f"풀이 중앙값 {seconds}, nodes {s['median_nodes']}, score {s['median_score']}")
+
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "parameters": {
+            "grades": args.grades, "sizes": args.sizes, "seeds": args.seeds, "seed": args.seed,
+            "engines": args.engines, "workers": args.workers, "timeout": args.timeout,
+            "optimize_seconds": args.optimize_seconds,
+        },
+        "instances": instances,
+        "results": results,
+        "summary": summary,
+    }
+    if args.baseline:
+        report["comparison"] = compare(summary, args.baseline)
+        print(f"3. 비교 ({args.baseline})")
+        for c in report["comparison"]:
+            changes = ", ".join(f"{field} {v['before']} -> {v['after']}"
+                                for field, v in c.items() if isinstance(v, dict))
+            print(f"   {c['classes_per_grade']:>3}반 {c['engine']:>9}: {changes}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"리포트 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
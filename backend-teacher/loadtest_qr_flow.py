@@ -0,0 +1,391 @@
+"""
+QR 출석 전체 흐름 부하 테스트 (/api/attendance/qr/scan)
+
+DATABASE_URL의 Postgres(운영 DB가 아닌 로컬/일회용 DB 권장)에 테스트용 정독실, 학생,
+위치 설정, 야자 명단을 만들고, QRCodeService로 서명한 토큰과 실제와 비슷한 GPS/Wi-Fi 데이터로
+19:00 야자 시작 직전 몰리는 스캔을 시간 비율을 줄여 재현합니다.
+앱을 프로세스 안에서(ASGI) 호출하거나 --base-url로 실행 중인 uvicorn에 요청을 보내고
+처리량, 응답 지연(p50/p95/p99), 스캔당 DB 쿼리 수, 오류율을 출력합니다.
+끝나면 테스트 데이터를 삭제합니다 (--keep이면 유지).
+
+사용법:
+    python loadtest_qr_flow.py --students 600 --rooms 3 --replay-seconds 30
+    python loadtest_qr_flow.py --base-url http://localhost:8000 --concurrency 200
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from math import cos, radians, sin
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from sqlalchemy import event, text
+from app.database import SessionLocal, engine
+from app.models.attendance import Attendance, LocationSetting, NightStudyRoster
+from app.models.existing_db import User
+from app.models.student import Student
+from app.services.qr_service import QRCodeService
+from app.services.room_policy_cache import get_room_policy_cache
+
+ROOM_PREFIX = "LOADTEST_QR_"
+EMAIL_DOMAIN = "loadtest-qr.local"
+
+# 19:00 야자 기준 시간 설정 (18:40부터 출석, 19:00 이후 지각, 19:10 마감)
+ATTENDANCE_START = "18:40"
+LATE_THRESHOLD = "19:00"
+ATTENDANCE_END = "19:10"
+BASE_LATITUDE = 37.5665
+BASE_LONGITUDE = 126.9780
+RADIUS_M = 30
+
+
+# ---------------------------------------------------------------------------
+# 테스트 데이터
+# ---------------------------------------------------------------------------
+
+def seed(num_students, num_rooms):
+    """정독실/학생/명단 생성, [(room_id, 정책 dict)]와 [(student_id, room_id)] 반환"""
+    db = SessionLocal()
+    try:
+        rooms = []
+        for i in range(num_rooms):
+            room_id = f"{ROOM_PREFIX}{i + 1:02d}"
+            # 정독실마다 교내 다른 위치 (약 100m 간격)
+            latitude = BASE_LATITUDE + i * 0.0009
+            bssids = [f"02:00:00:00:{i:02x}:{j:02x}" for j in range(3)]
+            db.add(LocationSetting(
+                room_id=room_id,
+                latitude=latitude,
+                longitude=BASE_LONGITUDE,
+                radius_m=RADIUS_M,
+                allowed_wifi_bssid=bssids,
+                attendance_start_time=ATTENDANCE_START,
+                attendance_end_time=ATTENDANCE_END,
+                late_threshold_time=LATE_THRESHOLD,
+                checkout_time="22:00",
+            ))
+            rooms.append((room_id, {"latitude": latitude, "longitude": BASE_LONGITUDE, "bssids": bssids}))
+            # 실행 중인 서버(--base-url)의 정책 캐시도 갱신되도록 알림
+            get_room_policy_cache().notify_change(db, room_id)
+        db.flush()
+
+        users = [
+            User(
+                email=f"student{i}@{EMAIL_DOMAIN}",
+                password_hash="loadtest",
+                name=f"부하테스트{i}",
+                user_type="student",
+            )
+            for i in range(num_students)
+        ]
+        db.add_all(users)
+        db.flush()
+
+        students = [
+            Student(
+                user_id=user.id,
+                student_number=f"LTQR{i:05d}",
+                grade=1 + i % 3,
+                class_number=1 + (i // 30) % 10,
+                attendance_number=1 + i % 30,
+            )
+            for i, user in enumerate(users)
+        ]
+        db.add_all(students)
+        db.flush()
+
+        assignments = []
+        for i, student in enumerate(students):
+            room_id = rooms[i % num_rooms][0]
+            db.add(NightStudyRoster(room_id=room_id, student_id=student.id))
+            assignments.append((student.id, room_id))
+        db.commit()
+        get_room_policy_cache().invalidate()
+        return rooms, assignments
+    finally:
+        db.close()
+
+
+def cleanup():
+    db = SessionLocal()
+    try:
+        room_ids = [r.room_id for r in db.query(LocationSetting.room_id).filter(
+            LocationSetting.room_id.like(f"{ROOM_PREFIX}%")
+        ).all()]
+        user_ids = [u.id for u in db.query(User.id).filter(User.email.like(f"%@{EMAIL_DOMAIN}")).all()]
+        student_ids = [s.id for s in db.query(Student.id).filter(Student.user_id.in_(user_ids)).all()] if user_ids else []
+
+        deleted = 0
+        if room_ids or student_ids:
+            deleted = db.query(Attendance).filter(
+                Attendance.room_id.in_(room_ids) | Attendance.student_id.in_(student_ids)
+            ).delete(synchronize_session=False)
+        if room_ids:
+            db.query(NightStudyRoster).filter(NightStudyRoster.room_id.in_(room_ids)).delete(synchronize_session=False)
+            db.query(LocationSetting).filter(LocationSetting.room_id.in_(room_ids)).delete(synchronize_session=False)
+        if student_ids:
+            db.query(Student).filter(Student.id.in_(student_ids)).delete(synchronize_session=False)
+        if user_ids:
+            db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+        db.commit()
+        get_room_policy_cache().invalidate()
+        return deleted, len(room_ids), len(student_ids)
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# 스캔 시나리오
+# ---------------------------------------------------------------------------
+
+def burst_arrivals(count, rng):
+    """
+    19:00 기준 도착 시각(초) 분포
+    대부분 18:52~19:00 사이에 몰리고(정점 18:58), 일부는 일찍 오거나 지각
+    """
+    arrivals = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.10:
+            offset = rng.uniform(-20 * 60, -8 * 60)  # 일찍 도착
+        elif roll < 0.92:
+            offset = min(rng.gauss(-2 * 60, 100), 0)  # 종 직전 몰림
+        else:
+            offset = rng.uniform(0, 9 * 60)  # 지각
+        arrivals.append(offset)
+    return sorted(arrivals)
+
+
+def location_payload(room, rng, fraudulent):
+    """정독실 반경 안의 GPS 좌표와 주변 AP 목록 (fraudulent면 위치/Wi-Fi 불일치)"""
+    meters_per_degree = 111_320
+    if fraudulent:
+        # 학교 밖 (약 500m)에서 다른 Wi-Fi로 스캔
+        distance, bssids = 500, ["0a:00:00:00:00:01", "0a:00:00:00:00:02"]
+    else:
+        distance = rng.uniform(0, RADIUS_M * 0.7)
+        bssids = rng.sample(room["bssids"], k=rng.randint(1, len(room["bssids"])))
+        bssids += [f"0e:00:00:00:{rng.randint(0, 255):02x}:{rng.randint(0, 255):02x}" for _ in range(rng.randint(2, 6))]
+    bearing = radians(rng.uniform(0, 360))
+    latitude = room["latitude"] + distance * cos(bearing) / meters_per_degree
+    longitude = room["longitude"] + distance * sin(bearing) / (
+        meters_per_degree * cos(radians(room["latitude"]))
+    )
+    return {
+        "gps": {"latitude": latitude, "longitude": longitude, "accuracy": round(rng.uniform(3, 15), 1)},
+        "wifi": {"bssids": bssids},
+    }
+
+
+def build_scenario(rooms, assignments, rescan_rate, fraud_rate, seed_value):
+    """[(도착 offset 초, student_id, room_id, fraudulent)]"""
+    rng = random.Random(seed_value)
+    scans = [(student_id, room_id) for student_id, room_id in assignments]
+    # 일부 학생은 다시 스캔 (응답이 늦거나 화면을 다시 누름)
+    scans += [rng.choice(assignments) for _ in range(int(len(assignments) * rescan_rate))]
+    rng.shuffle(scans)
+    arrivals = burst_arrivals(len(scans), rng)
+    return [
+        (offset, student_id, room_id, rng.random() < fraud_rate)
+        for offset, (student_id, room_id) in zip(arrivals, scans)
+    ]
+
+
+class TokenDisplay:
+    """정독실 키오스크 화면처럼 30초마다 새 토큰 (학생들은 같은 토큰을 스캔)"""
+
+    def __init__(self, refresh_seconds=30):
+        self.qr_service = QRCodeService()
+        self.refresh_seconds = refresh_seconds
+        self._tokens = {}
+
+    def token(self, room_id):
+        issued, token = self._tokens.get(room_id, (0, None))
+        if time.monotonic() - issued > self.refresh_seconds:
+            token = self.qr_service.generate_dynamic_token(room_id)["token"]
+            self._tokens[room_id] = (time.monotonic(), token)
+        return token
+
+
+# ---------------------------------------------------------------------------
+# 실행
+# ---------------------------------------------------------------------------
+
+class QueryCounter:
+    """프로세스 안 실행 시 앱이 보낸 SQL 수 (문장 종류별)"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.enabled = False
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled:
+            self.counts[statement.lstrip().split(None, 1)[0].upper()] += 1
+
+
+def db_transactions():
+    with engine.connect() as connection:
+        return connection.execute(
+            text("SELECT xact_commit + xact_rollback FROM pg_stat_database WHERE datname = current_database()")
+        ).scalar()
+
+
+async def replay(client, scenario, rooms, concurrency, replay_seconds):
+    """도착 시각을 replay_seconds 안으로 줄여서 스캔 요청 전송"""
+    policies = dict(rooms)
+    display = TokenDisplay()
+    rng = random.Random(7)
+    semaphore = asyncio.Semaphore(concurrency)
+    first, last = scenario[0][0], scenario[-1][0]
+    scale = replay_seconds / max(last - first, 1)
+    bell = datetime.now().replace(hour=19, minute=0, second=0, microsecond=0)
+    results = []
+
+    async def one(offset, student_id, room_id, fraudulent):
+        await asyncio.sleep((offset - first) * scale)
+        payload = {
+            "dynamic_token": display.token(room_id),
+            "student_id": student_id,
+            "timestamp": (bell + timedelta(seconds=offset)).isoformat(),
+            "location_data": location_payload(policies[room_id], rng, fraudulent),
+            "device_id": f"loadtest-device-{student_id}",
+        }
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/attendance/qr/scan", json=payload)
+                elapsed = time.perf_counter() - start
+                if response.status_code != 200:
+                    results.append((elapsed, f"http_{response.status_code}", fraudulent))
+                    return
+                body = response.json()
+                outcome = body.get("status") if body.get("success") else "rejected"
+                results.append((elapsed, outcome, fraudulent))
+            except Exception as e:
+                results.append((time.perf_counter() - start, f"error_{type(e).__name__}", fraudulent))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(*scan) for scan in scenario))
+    return time.perf_counter() - start, results
+
+
+def summarize(elapsed, results, queries=None, transactions=None):
+    latencies = sorted(r[0] for r in results)
+    outcomes = Counter(r[1] for r in results)
+    errors = sum(n for outcome, n in outcomes.items() if outcome.startswith(("http_", "error_")))
+    # 부정 스캔이 통과했거나 정상 스캔이 거부된 경우
+    misjudged = sum(
+        1 for _, outcome, fraudulent in results
+        if (fraudulent and outcome in ("present", "late")) or (not fraudulent and outcome == "rejected")
+    )
+    pct = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+    summary = {
+        "scans": len(results),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_scans_per_s": round(len(results) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(pct(0.50), 1), "p95": round(pct(0.95), 1),
+            "p99": round(pct(0.99), 1), "max": round(latencies[-1] * 1000, 1),
+        },
+        "outcomes": dict(outcomes),
+        "error_rate": round(errors / len(results), 4),
+        "misjudged": misjudged,
+    }
+    if queries is not None:
+        summary["db_queries_per_scan"] = round(sum(queries.values()) / len(results), 2)
+        summary["db_queries_by_type"] = dict(queries)
+    if transactions is not None:
+        # pg_stat_database 기준 (같은 DB의 다른 트랜잭션도 포함된 근사값)
+        summary["db_transactions_per_scan"] = round(transactions / len(results), 2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QR 출석 전체 흐름 부하 테스트")
+    parser.add_argument("--students", type=int, default=600)
+    parser.add_argument("--rooms", type=int, default=3)
+    parser.add_argument("--replay-seconds", type=float, default=30, help="19:00 전후 약 30분을 몇 초로 줄여 재현할지")
+    parser.add_argument("--concurrency", type=int, default=200, help="동시 요청 상한")
+    parser.add_argument("--rescan-rate", type=float, default=0.1, help="다시 스캔하는 학생 비율")
+    parser.add_argument("--fraud-rate", type=float, default=0.03, help="위치/Wi-Fi가 맞지 않는 스캔 비율")
+    parser.add_argument("--base-url", help="실행 중인 서버 주소 (없으면 프로세스 안에서 앱 호출)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--keep", action="store_true", help="테스트 데이터 유지")
+    args = parser.parse_args()
+
+    cleanup()
+    print(f"1. 테스트 데이터 생성: 정독실 {args.rooms}개, 학생 {args.students}명")
+    rooms, assignments = seed(args.students, args.rooms)
+    scenario = build_scenario(rooms, assignments, args.rescan_rate, args.fraud_rate, args.seed)
+    print(f"   스캔 {len(scenario)}건 (재스캔 {args.rescan_rate:.0%}, 부정 {args.fraud_rate:.0%}), "
+          f"{args.replay_seconds:.0f}초 동안 재현, 동시 요청 상한 {args.concurrency}")
+
+    counter = QueryCounter()
+    try:
+        if args.base_url:
+            print(f"2. {args.base_url} 에 요청...")
+            client_kwargs = {"base_url": args.base_url}
+        else:
+            print("2. 프로세스 안에서 앱 호출 (ASGI)...")
+            from app.main import app
+            event.listen(engine, "before_cursor_execute", counter)
+            client_kwargs = {"base_url": "http://loadtest", "transport": httpx.ASGITransport(app=app)}
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        before = db_transactions()
+
+        async def run():
+            async with httpx.AsyncClient(limits=limits, timeout=60, **client_kwargs) as client:
+                counter.enabled = True
+                try:
+                    return await replay(client, scenario, rooms, args.concurrency, args.replay_seconds)
+                finally:
+                    counter.enabled = False
+
+        elapsed, results = asyncio.run(run())
+        if not args.base_url:
+            # 버퍼에 남은 스캔까지 저장
+            from app.services.attendance_ingest_service import get_scan_buffer
+            get_scan_buffer().shutdown()
+            event.remove(engine, "before_cursor_execute", counter)
+        transactions = db_transactions() - before
+
+        summary = summarize(
+            elapsed, results,
+            queries=None if args.base_url else counter.counts,
+            transactions=transactions
+        )
+        print("3. 결과")
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump({"args": vars(args), **summary}, f, ensure_ascii=False, indent=2)
+            print(f"   저장: {args.output}")
+
+        # 재스캔이 중복 기록을 만들지 않았는지 확인
+        db = SessionLocal()
+        try:
+            count = db.query(Attendance).filter(Attendance.room_id.like(f"{ROOM_PREFIX}%")).count()
+            status = "OK" if count <= len(assignments) else "FAIL"
+            print(f"   {status}: 출석 기록 {count}건 (학생 {len(assignments)}명)")
+        finally:
+            db.close()
+    finally:
+        if args.keep:
+            print("4. 테스트 데이터 유지 (--keep)")
+        else:
+            deleted, room_count, student_count = cleanup()
+            print(f"4. 정리: 출석 {deleted}건, 정독실 {room_count}개, 학생 {student_count}명 삭제")
+
+
+if __name__ == "__main__":
+    main()
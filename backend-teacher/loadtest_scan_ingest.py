@@ -0,0 +1,155 @@
+"""
+QR 출석 스캔 저장 부하 테스트 (스캔별 upsert vs 일괄 저장 버퍼)
+
+야자 시작 시처럼 많은 학생이 동시에 스캔하는 상황을 만들어
+같은 upsert(ON CONFLICT)를 스캔마다 따로 commit할 때와 버퍼로 묶어 commit할 때의 처리량(scans/sec)과 응답 지연(p50/p95/max)을 비교합니다.
+DATABASE_URL의 DB에 기록을 만들고, 끝나면 테스트용 room_id 기록을 삭제합니다.
+
+사용법:
+    python loadtest_scan_ingest.py --students 300 --repeat 2 --concurrency 100
+"""
+import sys
+import os
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal
+from app.models.attendance import Attendance, AttendanceStatus
+from app.models.student import Student
+from app.services.attendance_service import AttendanceService
+from app.services.attendance_ingest_service import AttendanceScanBuffer
+
+ROOM_PER_SCAN = "LOADTEST_PER_SCAN"
+ROOM_BUFFERED = "LOADTEST_BUFFERED"
+
+
+def build_scans(students, room_id, repeat):
+    """학생마다 repeat번 스캔 (재스캔은 ON CONFLICT 갱신 경로를 탐)"""
+    scans = []
+    for _ in range(repeat):
+        for student_id, teacher_id in students:
+            scans.append(AttendanceService.build_qr_attendance_values(
+                student_id=student_id,
+                teacher_id=teacher_id,
+                room_id=room_id,
+                scanned_token="loadtest",
+                geo_data={"gps": {"latitude": 37.5, "longitude": 127.0}},
+                device_id=f"loadtest-{student_id}",
+                check_in_time=datetime.now(timezone.utc),
+                status=AttendanceStatus.PRESENT
+            ))
+    return scans
+
+
+def save_per_scan(values):
+    """스캔별 upsert: 스캔마다 세션을 열고 한 행만 upsert 후 commit (버퍼 없이 요청마다 저장하는 경우)"""
+    db = SessionLocal()
+    try:
+        return AttendanceService(db).upsert_qr_attendance_records([values])[0]
+    finally:
+        db.close()
+
+
+async def run_load(scans, concurrency, submit):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(values):
+        async with semaphore:
+            start = time.perf_counter()
+            await submit(values)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(values) for values in scans))
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def report(name, scans, elapsed, latencies, extra=""):
+    p = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+    print(
+        f"   [{name}] {len(scans)} scans in {elapsed:.2f}s -> {len(scans) / elapsed:.1f} scans/s | "
+        f"p50 {p(0.5) * 1000:.1f}ms | p95 {p(0.95) * 1000:.1f}ms | max {latencies[-1] * 1000:.1f}ms {extra}"
+    )
+
+
+def cleanup():
+    db = SessionLocal()
+    try:
+        deleted = db.query(Attendance).filter(
+            Attendance.room_id.in_([ROOM_PER_SCAN, ROOM_BUFFERED])
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QR 출석 스캔 저장 부하 테스트")
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=2, help="학생당 스캔 횟수")
+    parser.add_argument("--concurrency", type=int, default=100, help="동시 요청 수")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--flush-ms", type=int, default=50)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        students = [
+            (s.id, s.homeroom_teacher_id)
+            for s in db.query(Student).filter(Student.user_id.isnot(None)).limit(args.students).all()
+        ]
+    finally:
+        db.close()
+    if not students:
+        print("학생 데이터가 없습니다.")
+        return
+    print(f"1. 학생 {len(students)}명 x {args.repeat}회 스캔, 동시 요청 {args.concurrency}")
+    cleanup()
+
+    try:
+        print("2. 스캔별 upsert...")
+        scans = build_scans(students, ROOM_PER_SCAN, args.repeat)
+        executor = ThreadPoolExecutor(max_workers=args.concurrency)
+        loop = asyncio.new_event_loop()
+        elapsed, latencies = loop.run_until_complete(run_load(
+            scans, args.concurrency,
+            lambda values: loop.run_in_executor(executor, save_per_scan, values)
+        ))
+        executor.shutdown()
+        report("per-scan upsert", scans, elapsed, latencies)
+
+        print("3. 일괄 저장 버퍼...")
+        scans = build_scans(students, ROOM_BUFFERED, args.repeat)
+        buffer = AttendanceScanBuffer(batch_size=args.batch_size, flush_interval_ms=args.flush_ms)
+        elapsed, latencies = loop.run_until_complete(run_load(
+            scans, args.concurrency,
+            lambda values: asyncio.wrap_future(buffer.submit(values))
+        ))
+        buffer.shutdown()
+        loop.close()
+        report("buffered", scans, elapsed, latencies,
+               f"| batches {buffer.stats['batches']} (max {buffer.stats['max_batch']})")
+
+        # 재스캔이 중복 기록을 만들지 않았는지 확인
+        db = SessionLocal()
+        try:
+            for room_id in (ROOM_PER_SCAN, ROOM_BUFFERED):
+                count = db.query(Attendance).filter(Attendance.room_id == room_id).count()
+                status = "OK" if count == len(students) else "FAIL"
+                print(f"   {status}: {room_id} 기록 {count}건 (기대 {len(students)}건)")
+        finally:
+            db.close()
+    finally:
+        print(f"4. 정리: {cleanup()}건 삭제")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+출석 쿼리 인덱스 사용 확인 (EXPLAIN)
+
+AttendanceService의 조회/자동 처리 쿼리를 실제로 실행하면서 SQL을 수집하고,
+각 쿼리를 EXPLAIN (FORMAT JSON)으로 분석해 attendance 테이블을 순차 스캔하지 않고
+day 컬럼 복합 인덱스를 사용하는지 확인합니다.
+모든 작업은 하나의 트랜잭션 안에서 실행한 뒤 롤백하므로 DB에 흔적이 남지 않습니다.
+attendance를 조회하는 쿼리를 하나도 수집하지 못한 항목도 실패로 처리하며, 실패가 있으면 종료 코드 1을 반환합니다.
+
+주의: 테스트 데이터가 적어도 인덱스 경로를 볼 수 있도록 enable_seqscan = off로 실행하므로,
+이 검사는 각 쿼리에 쓸 수 있는 인덱스가 있다는 것만 보장합니다. 기본 설정의 플래너가
+실제 데이터 분포에서 그 인덱스를 고르는지는 운영 DB에서 EXPLAIN으로 따로 확인해야 합니다.
+
+사용법:
+    python verify_attendance_indexes.py
+"""
+import sys
+import os
+import json
+import re
+from datetime import datetime
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.database import engine
+from app.services.attendance_service import AttendanceService
+
+EXPECTED_INDEXES = {
+    "ix_attendance_room_day_status",
+    "ix_attendance_teacher_day",
+    "uq_attendance_student_day_room",
+    # 조회한 기록을 id로 갱신하는 경우
+    "attendance_pkey",
+    "ix_attendance_id",
+}
+# attendance 테이블을 다루는 모든 문장 (CTE 안의 UPDATE/INSERT 포함, attendance_xxx 같은 다른 이름 제외)
+ATTENDANCE_TABLE = re.compile(r"\battendance\b")
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def check_plan(connection, statement, parameters):
+    """(통과 여부, attendance 접근 방식 목록)"""
+    plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    accesses = []
+    for node in plan_nodes(plan[0]["Plan"]):
+        # UPDATE/INSERT 자체(ModifyTable)는 대상 행을 찾는 하위 스캔 노드로 판단
+        if node.get("Relation Name") != "attendance" or node["Node Type"] == "ModifyTable":
+            continue
+        if node["Node Type"] == "Bitmap Heap Scan":
+            # 비트맵 스캔은 하위 Bitmap Index Scan 노드에 인덱스 이름이 있음
+            for child in plan_nodes(node):
+                if child["Node Type"] == "Bitmap Index Scan":
+                    accesses.append((node["Node Type"], child.get("Index Name")))
+        else:
+            accesses.append((node["Node Type"], node.get("Index Name")))
+    ok = bool(accesses) and all(index in EXPECTED_INDEXES for _, index in accesses)
+    return ok, accesses
+
+
+def verify_attendance_indexes():
+    connection = engine.connect()
+    outer = connection.begin()
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if ATTENDANCE_TABLE.search(statement):
+            captured.append((statement, parameters))
+
+    try:
+        # 테스트 데이터가 적어도 플래너가 인덱스를 고를 수 있는지 확인하기 위해 순차 스캔 비활성화
+        # (인덱스를 쓸 수 있는지만 확인, 기본 설정에서 플래너가 고르는지는 보장하지 않음)
+        connection.execute(text("SET LOCAL enable_seqscan = off"))
+        # 서비스의 commit()은 savepoint만 해제하고, 마지막에 전체 롤백
+        db = Session(bind=connection, join_transaction_mode="create_savepoint")
+        service = AttendanceService(db)
+        today = datetime.utcnow().date()
+
+        event.listen(connection, "before_cursor_execute", capture)
+        cases = [
+            ("get_attendance_records", lambda: service.get_attendance_records(1, today.isoformat())),
+            ("get_monitoring_stats", lambda: service.get_monitoring_stats(teacher_id=1, target_date=today)),
+            ("process_auto_checkout", lambda: service.process_auto_checkout(["R01"])),
+            ("process_auto_absent", lambda: service.process_auto_absent(["R01"])),
+        ]
+
+        failures = 0
+        for name, run in cases:
+            captured.clear()
+            run()
+            statements = list(captured)
+            print(f"[{name}] {len(statements)} queries")
+            if not statements:
+                # 수집 조건이 쿼리를 놓치면 아무것도 검사하지 않고 통과하므로 실패로 처리
+                failures += 1
+                print("   FAIL: attendance 쿼리를 수집하지 못했습니다")
+            for statement, parameters in statements:
+                ok, accesses = check_plan(connection, statement, parameters)
+                failures += 0 if ok else 1
+                summary = ", ".join(f"{node_type}({index or '-'})" for node_type, index in accesses)
+                print(f"   {'OK' if ok else 'FAIL'}: {summary}")
+                if not ok:
+                    print(f"      {statement.splitlines()[0][:120]}")
+        event.remove(connection, "before_cursor_execute", capture)
+
+        if failures:
+            print(f"FAILURE: {failures}개 쿼리가 인덱스를 사용하지 않습니다.")
+        else:
+            print("SUCCESS: 모든 출석 쿼리가 day 복합 인덱스를 사용합니다.")
+        return failures
+    finally:
+        outer.rollback()
+        connection.close()
+
+
+if __name__ == "__main__":
+    # 배포/CI에서 실패를 감지할 수 있도록 인덱스를 쓰지 않는 쿼리가 있으면 종료 코드 1
+    if verify_attendance_indexes():
+        sys.exit(1)